@@ -88,11 +88,11 @@ n.make_nexus(interleave=True, charblock=True)
 n.write_to_file(filename="output.nex", interleave=True, charblock=True)
 
 """
-from nexus.reader import NexusReader
+from nexus.reader import NexusReader, TreeStream
 from nexus.writer import NexusWriter
 from nexus import handlers
 from nexus.exceptions import NexusFormatException
 from nexus import tools
 
 __version__ = "2.1.1.dev0"
-__all__ = ["NexusReader", "NexusWriter", "NexusFormatException", "handlers", "tools"]
+__all__ = ["NexusReader", "TreeStream", "NexusWriter", "NexusFormatException", "handlers", "tools"]
@@ -32,6 +32,37 @@ def list_of_ranges(dstring):
     return sorted(out)
 
 
+def burnin(string):
+    """
+    Converts a number of trees - or a fraction of trees, if it contains a "." - to discard as \
+    burn-in.
+
+    :return: `int` or `float`
+    """
+    try:
+        res = float(string) if '.' in string else int(string)
+    except ValueError:
+        raise argparse.ArgumentTypeError("%r is not a number" % string)
+    if res < 0:
+        raise argparse.ArgumentTypeError("burn-in must not be negative")
+    return res
+
+
+def generation_range(string):
+    """
+    Converts a range of MCMC generations "START-END" (or "START:END"), where either bound may
+    be omitted, e.g. "1000000-".
+
+    :return: `tuple` `(start, end)` of `int`s or `None`.
+    """
+    try:
+        start, end = [
+            int(bound) if bound.strip() else None for bound in string.replace(':', '-').split('-')]
+    except ValueError:
+        raise argparse.ArgumentTypeError("%r is not a range of generations" % string)
+    return start, end
+
+
 def path_or_stdin(string):
     return None if string == '-' else PathType(type='file')(string)
 
@@ -55,13 +86,13 @@ def add_output(parser):
              "To prevent log messages messing up the output, set '--log-level=WARN'.")
 
 
-def get_reader(args, many=False, required_blocks=None):
+def get_reader(args, many=False, required_blocks=None, skip=None):
     res = []
     for f in (args.filename if many else [args.filename]):
         if f is None:
             res.append(NexusReader.from_string(sys.stdin.read()))
         else:
-            res.append(NexusReader.from_file(f))
+            res.append(NexusReader.from_file(f, skip=skip))
     if required_blocks:
         for nex in res:
             for block in required_blocks:
@@ -74,9 +105,9 @@ def get_reader(args, many=False, required_blocks=None):
     return res if many else res[0]
 
 
-def write_output(writer, args):
+def write_output(writer, args, **kw):
     if args.output:
-        writer.write_to_file(args.output)
+        writer.write_to_file(args.output, **kw)
         print('Output written to {0}'.format(args.output))
     else:
-        print(writer.write())
+        print(writer.write(**kw))
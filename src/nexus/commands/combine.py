@@ -1,14 +1,47 @@
 """
 combines a series of nexuses into one nexus.
 """
+import sys
+
+from clldutils.clilib import ParserError
+
 from nexus.tools import combine_nexuses
-from nexus.cli_util import add_nexus, get_reader, add_output, write_output
+from nexus.tools.combine_nexuses import combine_tree_files
+from nexus.cli_util import add_nexus, get_reader, add_output, write_output, burnin
 
 
 def register(parser):
     add_output(parser)
     add_nexus(parser, many=True)
+    parser.add_argument(
+        "--trees",
+        action="store_true",
+        default=False,
+        help="Stream the trees of the tree files - e.g. of independent MCMC runs - into one "
+             "translated trees block, without reading the files into memory")
+    parser.add_argument(
+        "--burnin",
+        type=burnin,
+        default=0,
+        help="Number of trees - or fraction of trees, e.g. '0.25' - to discard as burn-in from "
+             "each file (requires --trees)")
+    parser.add_argument(
+        "-r", "--resample",
+        type=int,
+        default=1,
+        help="Resample (i.e. thin) the trees of each file every Nth tree (requires --trees)")
 
 
 def run(args):
+    if args.trees:
+        if None in args.filename:
+            raise ParserError('--trees requires tree files, not stdin')
+        ntrees = combine_tree_files(
+            args.filename,
+            args.output or sys.stdout,
+            burnin=args.burnin,
+            resample=args.resample)
+        if args.output:
+            print('{0} trees written to {1}'.format(ntrees, args.output))
+        return
     write_output(combine_nexuses(get_reader(args, many=True)), args)
@@ -0,0 +1,27 @@
+"""
+Repairs the trees blocks of a nexus file from a crashed run, i.e. drops truncated trees and adds
+a missing `end;`.
+
+The file is streamed, i.e. not read into memory.
+"""
+import sys
+
+from nexus.tools.repair import iter_repaired_lines, repair_trees
+from nexus.cli_util import add_nexus, add_output
+
+
+def register(parser):
+    add_output(parser)
+    add_nexus(parser)
+
+
+def run(args):
+    if args.filename is None:
+        dropped = []
+        sys.stdout.writelines(iter_repaired_lines(sys.stdin, dropped))
+    else:
+        dropped = repair_trees(args.filename, args.output or sys.stdout)
+    for lineno, problem in dropped:
+        args.log.warning('Dropped line {0}: {1}'.format(lineno, problem))
+    if args.output:
+        print('Output written to {0}'.format(args.output))
@@ -1,14 +1,38 @@
 """
 Performs some functions on trees
 """
-from random import sample
-
-from nexus.cli_util import add_nexus, get_reader, add_output, write_output, list_of_ranges
+import pathlib
+
+from clldutils.clilib import ParserError
+
+from nexus.reader import NexusReader, TreeStream
+from nexus.handlers import GenericHandler
+from nexus.writer import NexusWriter
+from nexus.exceptions import NexusFormatException
+from nexus.util import map_chunks
+from nexus.tools.consensus import consensus
+from nexus.tools.mcc import mcc_tree
+from nexus.tools.convergence import asdsf
+from nexus.tools.heights import summarise_heights
+from nexus.tools.ltt import ltt_curves
+from nexus.tools.shards import shard_trees
+from nexus.tools.append import append_trees
+from nexus.tools.annotate import annotate_tree
+from nexus.tools.sampling import (
+    delete_trees, skip_burnin, filter_generations, thin, reservoir_sample,
+)
+from nexus.cli_util import (
+    add_nexus, get_reader, add_output, write_output, list_of_ranges, burnin, generation_range,
+)
 
 
 def register(parser):
     add_output(parser)
     add_nexus(parser)
+    parser.add_argument(
+        "runs",
+        nargs='*',
+        help="Paths to nexus files of further runs, to compare with --asdsf")
     parser.add_argument(
         "-d", "--deltree",
         default=[],
@@ -19,7 +43,7 @@ def register(parser):
         "-r", "--resample",
         type=int,
         default=0,
-        help="Resample the trees every Nth tree")
+        help="Resample (i.e. thin) the trees every Nth tree")
     parser.add_argument(
         "-n", "--random",
         type=int,
@@ -35,29 +59,305 @@ def register(parser):
         action="store_true",
         default=False,
         help="Remove taxa translation block from the trees")
+    parser.add_argument(
+        "--translate",
+        action="store_true",
+        default=False,
+        help="Replace taxon names in the trees with numeric IDs from a translate block")
+    parser.add_argument(
+        "--prune",
+        type=lambda s: [t.strip() for t in s.split(',') if t.strip()],
+        default=[],
+        help="Remove the comma-separated taxa from the trees and the translate block")
+    parser.add_argument(
+        "--restrict",
+        type=lambda s: [t.strip() for t in s.split(',') if t.strip()],
+        default=[],
+        help="Remove all but the comma-separated taxa from the trees and the translate block")
+    parser.add_argument(
+        "-j", "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes used to remove comments, detranslate and prune trees "
+             "and count splits")
+    parser.add_argument(
+        "--mcc",
+        action="store_true",
+        default=False,
+        help="Only keep the maximum clade credibility tree")
+    parser.add_argument(
+        "--consensus",
+        choices=['majority', 'greedy'],
+        nargs='?',
+        const='majority',
+        default=None,
+        help="Output the majority-rule (default) or greedy consensus tree of the trees")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.5,
+        help="Frequency which splits in the majority-rule consensus tree must exceed - and "
+             "minimal frequency of clades listed with --summary")
+    parser.add_argument(
+        "--unrooted",
+        action="store_true",
+        default=False,
+        help="Treat the trees as unrooted when computing the consensus tree")
+    parser.add_argument(
+        "--annotate",
+        metavar="TARGET",
+        default=None,
+        help="Annotate the (first) tree in the nexus or newick file TARGET with the posterior "
+             "probability and the heights of its clades in the trees. TARGET is restricted to "
+             "the taxa of the trees.")
+    parser.add_argument(
+        "--heights",
+        choices=['keep', 'mean', 'median'],
+        default='keep',
+        help="Branch lengths of the annotated tree: keep the lengths of TARGET or use the "
+             "mean or median clade heights")
+    parser.add_argument(
+        "--summary",
+        action="store_true",
+        default=False,
+        help="Print mean, median and 95%% HPD interval of root height, tree length and the "
+             "heights of clades")
+    parser.add_argument(
+        "--ltt",
+        metavar="NPOINTS",
+        type=int,
+        nargs='?',
+        const=100,
+        default=None,
+        help="Print mean and 95%% HPD interval of the number of lineages at NPOINTS (default: "
+             "100) heights between 0 and the maximal root height")
+    parser.add_argument(
+        "--split",
+        metavar="N",
+        type=int,
+        default=None,
+        help="Split the trees round-robin into N files FILENAME_1, ..., FILENAME_N in the "
+             "directory of FILENAME - or in the directory OUTDIR, if specified. The trees are "
+             "copied as is, thus --split cannot be combined with options to select or modify "
+             "trees.")
+    parser.add_argument(
+        "--outdir",
+        default=None,
+        help="Directory for the files written with --split - created if it does not exist")
+    parser.add_argument(
+        "--contiguous",
+        action="store_true",
+        default=False,
+        help="Split the trees into contiguous ranges of trees, rather than round-robin")
+    parser.add_argument(
+        "--append",
+        metavar="TARGET",
+        default=None,
+        help="Append the (resulting) trees to the trees block of the nexus file TARGET, rather "
+             "than writing them to OUTPUT")
+    parser.add_argument(
+        "--asdsf",
+        action="store_true",
+        default=False,
+        help="Print the average standard deviation of split frequencies of the trees in "
+             "FILENAME and RUNS")
+    parser.add_argument(
+        "--burnin",
+        type=burnin,
+        default=0,
+        help="Number of trees - or fraction of trees, e.g. '0.25' - to discard as burn-in. "
+             "Trees are deleted, discarded as burn-in, filtered by state, resampled and "
+             "sampled randomly - in this order - while streaming the trees from the file.")
+    parser.add_argument(
+        "--burnin-state",
+        type=int,
+        default=None,
+        help="Discard trees sampled before MCMC generation (aka state) BURNIN_STATE, as "
+             "encoded in tree names like 'STATE_1000' or 'rep.1000'")
+    parser.add_argument(
+        "--states",
+        type=generation_range,
+        default=None,
+        help="Only keep trees sampled in a range of MCMC generations, e.g. '1000-5000' or "
+             "'1000-'")
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=None,
+        help="Compute ASDSF after each WINDOW trees")
 
 
 def run(args):
-    nexus = get_reader(args, required_blocks=['trees'])
-    args.log.info("{0} trees found with {1} translated taxa".format(
-        nexus.trees.ntrees, len(nexus.trees.translators)))
+    if args.asdsf:
+        # The runs are streamed, rather than read with `NexusReader`.
+        if args.filename is None or not args.runs:
+            raise ParserError('--asdsf requires at least two tree files')
+        run_asdsf(
+            [args.filename] + args.runs,
+            args.log,
+            burnin=args.burnin,
+            window=args.window,
+            workers=args.workers)
+        return
+    if args.runs:
+        raise ParserError('Multiple files are only supported with --asdsf')
+    if args.split:
+        # The trees are streamed directly from the input to the shards.
+        if args.filename is None:
+            raise ParserError('--split requires a tree file')
+        others = [opt for opt, value in split_conflicts(args) if value]
+        if others:
+            raise ParserError('--split cannot be combined with {0}'.format(', '.join(others)))
+        for path in shard_trees(
+                args.filename, args.split, outdir=args.outdir, contiguous=args.contiguous):
+            print('Output written to {0}'.format(path))
+        return
+
+    subset = args.deltree or args.burnin or args.resample or args.random or \
+        args.burnin_state is not None or args.states
+    if args.filename and subset:
+        nexus = run_stream(args)
+    else:
+        nexus = get_reader(args, required_blocks=['trees'])
+        args.log.info("{0} trees found with {1} translated taxa".format(
+            nexus.trees.ntrees, len(nexus.trees.translators)))
 
-    if args.deltree:
-        nexus = run_deltree(args.deltree, nexus, args.log)
+        if args.deltree:
+            nexus = run_deltree(args.deltree, nexus, args.log)
 
-    if args.resample:
-        nexus = run_resample(args.resample, nexus, args.log)
+        if args.burnin:
+            nexus = run_burnin(args.burnin, nexus, args.log)
 
-    if args.random:
-        nexus = run_random(args.random, nexus, args.log)
+        if args.burnin_state is not None or args.states:
+            nexus = run_generations(*get_generation_range(args), nexus, args.log)
+
+        if args.resample:
+            nexus = run_resample(args.resample, nexus, args.log)
+
+        if args.random:
+            nexus = run_random(args.random, nexus, args.log)
+
+    try:
+        if args.prune:
+            args.log.info("Pruning %d taxa" % len(args.prune))
+            nexus.trees.prune(args.prune, workers=args.workers)
+
+        if args.restrict:
+            args.log.info("Restricting trees to %d taxa" % len(args.restrict))
+            nexus.trees.restrict_to(args.restrict, workers=args.workers)
+    except (NexusFormatException, ValueError) as e:
+        raise ParserError(str(e))
 
     if args.removecomments:
-        nexus = run_removecomments(nexus, args.log)
+        nexus = run_removecomments(nexus, args.log, workers=args.workers)
 
     if args.detranslate:
-        nexus.trees.detranslate()
+        nexus.trees.detranslate(workers=args.workers)
 
-    write_output(nexus, args)
+    if args.summary:
+        run_summary(nexus, args.log, min_frequency=args.threshold, workers=args.workers)
+        return
+
+    if args.ltt:
+        run_ltt(nexus, args.log, npoints=args.ltt, workers=args.workers)
+        return
+
+    if args.annotate:
+        nexus = run_annotate(
+            args.annotate, nexus, args.log, heights=args.heights, workers=args.workers)
+
+    if args.mcc:
+        nexus = run_mcc(nexus, args.log, workers=args.workers)
+
+    if args.consensus:
+        nexus = run_consensus(
+            nexus,
+            args.log,
+            threshold=args.threshold,
+            greedy=args.consensus == 'greedy',
+            rooted=not args.unrooted,
+            workers=args.workers)
+
+    if args.append:
+        run_append(args.append, nexus, args.log)
+        return
+
+    if args.translate and not isinstance(nexus, NexusWriter):
+        nexus.trees.translate()
+
+    # Blocks we did not touch are copied from the input file:
+    write_output(nexus, args, verbatim=True, translate=args.translate)
+
+
+def split_conflicts(args):
+    """
+    Lists the options which cannot be combined with --split, because the trees are copied as is.
+    """
+    return [
+        ('--output', args.output),
+        ('--deltree', args.deltree),
+        ('--burnin', args.burnin),
+        ('--burnin-state', args.burnin_state is not None),
+        ('--states', args.states),
+        ('--resample', args.resample),
+        ('--random', args.random),
+        ('--removecomments', args.removecomments),
+        ('--detranslate', args.detranslate),
+        ('--translate', args.translate),
+        ('--prune', args.prune),
+        ('--restrict', args.restrict),
+        ('--summary', args.summary),
+        ('--ltt', args.ltt),
+        ('--annotate', args.annotate),
+        ('--mcc', args.mcc),
+        ('--consensus', args.consensus),
+        ('--append', args.append),
+    ]
+
+
+def get_generation_range(args):
+    """
+    Combines --burnin-state and --states into one range of generations.
+    """
+    start, end = args.states or (None, None)
+    if args.burnin_state is not None:
+        start = args.burnin_state if start is None else max(start, args.burnin_state)
+    return start, end
+
+
+def run_stream(args):
+    """
+    Reads a nexus file, applying the subsetting options while streaming the trees, so that
+    only the retained trees are kept in memory.
+
+    :return: A NexusReader instance with the retained trees.
+    """
+    nexus = get_reader(args, required_blocks=['trees'], skip=['trees'])
+    stream = TreeStream(args.filename)
+    trees = iter(stream)
+    if args.deltree:
+        trees = delete_trees(trees, set(args.deltree))
+    if args.burnin:
+        ntrees = None
+        if isinstance(args.burnin, float) and args.burnin < 1:
+            # The burn-in fraction refers to the trees remaining after deletion.
+            ntrees = stream.ntrees
+            ntrees -= len([i for i in set(args.deltree) if 1 <= i <= ntrees])
+        trees = skip_burnin(trees, args.burnin, ntrees=ntrees)
+    if args.burnin_state is not None or args.states:
+        trees = filter_generations(trees, *get_generation_range(args))
+    if args.resample:
+        trees = thin(trees, args.resample)
+    if args.random:
+        trees = reservoir_sample(trees, args.random)
+
+    nexus.trees.trees = list(trees)
+    nexus.trees.translators = stream.translators
+    nexus.trees.attributes = stream.attributes
+    nexus.trees.was_translated = stream.was_translated
+    args.log.info("{0} trees retained with {1} translated taxa".format(
+        nexus.trees.ntrees, len(nexus.trees.translators)))
+    return nexus
 
 
 def run_deltree(delitems, nexus_obj, log):
@@ -72,15 +372,50 @@ def run_deltree(delitems, nexus_obj, log):
 
     :return: A NexusReader instance with the given trees removed.
     """
-    new = []
     log.info('Deleting: %d trees' % len(delitems))
+    nexus_obj.trees.trees = list(delete_trees(nexus_obj.trees.trees, set(delitems)))
+    return nexus_obj
 
-    for index, tree in enumerate(nexus_obj.trees, 1):
-        if index in delitems:
-            log.info('Deleting tree %d' % index)
-        else:
-            new.append(tree)
-    nexus_obj.trees.trees = new
+
+def run_burnin(burnin, nexus_obj, log):
+    """
+    Discards the burn-in from the trees in a nexus
+
+    :param burnin: Number - or fraction, if `burnin` is a float < 1 - of trees to discard
+    :type burnin: Integer or Float
+
+    :param nexus_obj: A `NexusReader` instance
+    :type nexus_obj: NexusReader
+
+    :return: A NexusReader instance with the burn-in removed.
+    """
+    ntrees = nexus_obj.trees.ntrees
+    nexus_obj.trees.trees = list(skip_burnin(nexus_obj.trees.trees, burnin, ntrees=ntrees))
+    log.info("Discarded %d trees as burn-in" % (ntrees - nexus_obj.trees.ntrees))
+    return nexus_obj
+
+
+def run_generations(start, end, nexus_obj, log):
+    """
+    Filters the trees in a nexus by MCMC generation
+
+    :param start: Minimal generation, or None
+    :type start: Integer
+
+    :param end: Maximal generation, or None
+    :type end: Integer
+
+    :param nexus_obj: A `NexusReader` instance
+    :type nexus_obj: NexusReader
+
+    :return: A NexusReader instance with the trees of other generations removed.
+    """
+    ntrees = nexus_obj.trees.ntrees
+    nexus_obj.trees.trees = list(filter_generations(nexus_obj.trees.trees, start, end))
+    log.info("Discarded %d trees outside of generations %s-%s" % (
+        ntrees - nexus_obj.trees.ntrees,
+        '' if start is None else start,
+        '' if end is None else end))
     return nexus_obj
 
 
@@ -96,33 +431,32 @@ def run_resample(resample, nexus_obj, log):
 
     :return: A NexusReader instance with the given trees removed.
     """
-    new = []
     log.info('Resampling ever %d trees' % resample)
+    ntrees = nexus_obj.trees.ntrees
+    nexus_obj.trees.trees = list(thin(nexus_obj.trees.trees, resample))
+    log.info("Ignored %d trees" % (ntrees - nexus_obj.trees.ntrees))
+    return nexus_obj
 
-    ignore_count = 0
-    for index, tree in enumerate(nexus_obj.trees, 1):
-        if index % resample == 0:
-            new.append(tree)
-        else:
-            ignore_count += 1
 
-    log.info("Ignored %d trees" % ignore_count)
-    nexus_obj.trees.trees = new
-    return nexus_obj
+def _remove_comments(trees):
+    return [GenericHandler.remove_comments(tree) for tree in trees]
 
 
-def run_removecomments(nexus_obj, log):
+def run_removecomments(nexus_obj, log, workers=1):
     """
     Removes comments from the trees in a nexus
 
     :param nexus_obj: A `NexusReader` instance
     :type nexus_obj: NexusReader
 
+    :param workers: Number of worker processes
+    :type workers: Integer
+
     :return: A NexusReader instance with the comments removed.
     """
     new = []
-    for tree in nexus_obj.trees:
-        new.append(nexus_obj.trees.remove_comments(tree))
+    for chunk in map_chunks(_remove_comments, nexus_obj.trees.trees, workers=workers):
+        new.extend(chunk)
 
     log.info("Removed comments")
     nexus_obj.trees.trees = new
@@ -143,11 +477,154 @@ def run_random(num_trees, nexus_obj, log):
 
     :raises ValueError: if num_trees is larger than population
     """
-    if num_trees > nexus_obj.trees.ntrees:
-        raise ValueError("Treefile only has %d trees in it." % nexus_obj.trees.ntrees)
-    elif num_trees == nexus_obj.trees.ntrees:  # pragma: no cover
-        return nexus_obj  # um. ok.
-    else:
-        log.info("%d trees read. Sampling %d" % (nexus_obj.trees.ntrees, num_trees))
-        nexus_obj.trees.trees = sample(nexus_obj.trees.trees, num_trees)
+    log.info("%d trees read. Sampling %d" % (nexus_obj.trees.ntrees, num_trees))
+    nexus_obj.trees.trees = list(reservoir_sample(nexus_obj.trees.trees, num_trees))
     return nexus_obj
+
+
+def run_mcc(nexus_obj, log, workers=1):
+    """
+    Selects the maximum clade credibility tree of the trees in a nexus
+
+    :param nexus_obj: A `NexusReader` instance
+    :type nexus_obj: NexusReader
+
+    :return: A NexusReader instance with only the MCC tree.
+    """
+    res = mcc_tree(nexus_obj.trees, workers=workers)
+    if res:
+        index, tree, score = res
+        log.info("Tree %d has maximal log clade credibility %f" % (index + 1, score))
+        nexus_obj.trees.trees = [tree]
+    return nexus_obj
+
+
+def run_consensus(nexus_obj, log, threshold=0.5, greedy=False, rooted=True, workers=1):
+    """
+    Computes the consensus tree of the trees in a nexus
+
+    :param nexus_obj: A `NexusReader` instance
+    :type nexus_obj: NexusReader
+
+    :param threshold: Frequency which splits in the majority-rule consensus tree must exceed
+    :type threshold: Float
+
+    :param greedy: Compute a greedy consensus tree
+    :type greedy: Boolean
+
+    :return: A NexusWriter instance with the consensus tree.
+    """
+    log.info("Computing %s consensus tree of %d trees" % (
+        'greedy' if greedy else 'majority-rule', nexus_obj.trees.ntrees))
+    tree = consensus(
+        nexus_obj.trees, threshold=threshold, greedy=greedy, rooted=rooted, workers=workers)
+    res = NexusWriter()
+    res.trees.append('tree %s = %s' % ('greedy' if greedy else 'consensus', tree.to_newick()))
+    return res
+
+
+def run_annotate(target, nexus_obj, log, heights='keep', workers=1):
+    """
+    Annotates a target tree with the clade support and clade heights in the trees of a nexus
+
+    :param target: Path of a nexus or newick file with the target tree
+    :type target: String
+
+    :param nexus_obj: A `NexusReader` instance
+    :type nexus_obj: NexusReader
+
+    :return: A NexusWriter instance with the annotated tree.
+    """
+    text = pathlib.Path(target).read_text(encoding='utf8')
+    if text.lstrip().upper().startswith('#NEXUS'):
+        trees = NexusReader.from_string(text).trees
+        if not trees or not trees.ntrees:
+            raise ParserError('No tree found in %s' % target)
+        trees.detranslate()
+        newick = trees[0].newick_string
+    else:
+        newick = text.strip()
+    log.info("Annotating target tree with %d trees" % nexus_obj.trees.ntrees)
+    tree = annotate_tree(newick, nexus_obj.trees, heights=heights, workers=workers)
+    res = NexusWriter()
+    res.trees.append('tree annotated = [&R] %s' % tree.to_newick())
+    return res
+
+
+def run_append(target, nexus_obj, log):
+    """
+    Appends the trees of a nexus to the trees block of the nexus file `target`
+
+    :param target: Path of the nexus file
+    :type target: String
+
+    :param nexus_obj: A `NexusReader` or `NexusWriter` instance
+    """
+    if isinstance(nexus_obj, NexusWriter):
+        trees = nexus_obj.trees
+    else:
+        # Taxon names are translated to the IDs of the target's translate block.
+        nexus_obj.trees.detranslate()
+        trees = nexus_obj.trees.trees
+    log.info("Appending %d trees to %s" % (len(trees), target))
+    print('{0} trees appended to {1}'.format(append_trees(target, trees), target))
+
+
+def run_summary(nexus_obj, log, min_frequency=0.5, workers=1):
+    """
+    Prints summaries of the root heights, tree lengths and clade heights of the trees
+
+    :param nexus_obj: A `NexusReader` instance
+    :type nexus_obj: NexusReader
+
+    :param min_frequency: Minimal frequency of clades to list
+    :type min_frequency: Float
+    """
+    log.info("Summarising heights of %d trees" % nexus_obj.trees.ntrees)
+    summary = summarise_heights(nexus_obj.trees, workers=workers)
+    print('clade\tfrequency\tmean\tmedian\thpd95_lower\thpd95_upper')
+
+    def row(name, frequency, reservoir):
+        print('%s\t%.4f\t%s' % (name, frequency, '\t'.join(
+            '%.6g' % v for v in (reservoir.mean, reservoir.median) + reservoir.hpd())))
+
+    row('root_height', 1.0, summary.root_height)
+    row('tree_length', 1.0, summary.tree_length)
+    for split, frequency, reservoir in summary.iter_clades(min_frequency=min_frequency):
+        row(','.join(summary.split_taxa(split)), frequency, reservoir)
+
+
+def run_ltt(nexus_obj, log, npoints=100, workers=1):
+    """
+    Prints lineages-through-time curves summarised over the trees
+
+    :param nexus_obj: A `NexusReader` instance
+    :type nexus_obj: NexusReader
+
+    :param npoints: Number of heights at which to count lineages
+    :type npoints: Integer
+    """
+    log.info("Computing LTT curves of %d trees" % nexus_obj.trees.ntrees)
+    print('height\tmean\thpd95_lower\thpd95_upper')
+    for height, mean, lower, upper in ltt_curves(
+            nexus_obj.trees, npoints=npoints, workers=workers):
+        print('%.6g\t%.4f\t%s\t%s' % (height, mean, lower, upper))
+
+
+def run_asdsf(filenames, log, burnin=0, window=None, workers=1):
+    """
+    Prints the average standard deviation of split frequencies of independent runs
+
+    :param filenames: Paths of the tree files of the runs
+    :type filenames: List
+
+    :param burnin: Number or fraction of trees to discard as burn-in
+    :type burnin: Integer or Float
+
+    :param window: Compute ASDSF after each `window` trees
+    :type window: Integer
+    """
+    log.info("Computing ASDSF of %d runs" % len(filenames))
+    print('ntrees\tasdsf')
+    for ntrees, value in asdsf(filenames, burnin=burnin, window=window, workers=workers):
+        print('%d\t%.6f' % (ntrees, value))
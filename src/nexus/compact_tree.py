@@ -0,0 +1,384 @@
+"""
+A compact, array-based representation of (newick) trees.
+
+Nodes are identified by their index in preorder, i.e. the root has index 0 and parents always
+precede their descendants. Thus, iterating over `reversed(range(len(tree)))` visits all children
+before their parents.
+"""
+import re
+import math
+import array
+
+import newick
+
+from nexus.exceptions import NexusFormatException
+
+TOKEN_PATTERN = re.compile(r"""
+    \[[^\]]*\]                # comment
+    |
+    [(),:;]                   # punctuation
+    |
+    '(?:[^']|'')*'            # quoted label, with '' escaping a quote
+    |
+    [^\s()\[\]',:;]+          # unquoted label or branch length
+""", re.VERBOSE)
+UNQUOTED_LABEL_PATTERN = re.compile(r"""^[^\s()\[\]',:;]+$""")
+SUMMED_LENGTH_DIGITS = 12
+
+
+def quote(label):
+    """
+    Quotes a label for use in newick, if necessary.
+
+    >>> quote('A_b')
+    'A_b'
+    >>> quote("A b's")
+    "'A b''s'"
+    """
+    if UNQUOTED_LABEL_PATTERN.match(label):
+        return label
+    return "'%s'" % label.replace("'", "''")
+
+
+def relabel_tips(newick_string, relabel):
+    """
+    Replaces the tip labels of a newick tree in one pass, keeping everything else - comments,
+    internal node labels, branch lengths and whitespace - unchanged.
+
+    >>> relabel_tips("(('a b':1,B)x,C[&c]);", {'a b': '1', 'C': '3'}.get)
+    "((1:1,B)x,3[&c]);"
+
+    :param relabel: Callable accepting an (unquoted) tip label and returning the new label - or \
+    `None` to keep the label. New labels are quoted if necessary.
+    """
+    # A label is a tip label if it directly follows "(" or "," - ignoring comments:
+    state = {'tip': True}
+
+    def repl(match):
+        token = match.group(0)
+        char = token[0]
+        if char == '[':
+            return token
+        if char in '(,':
+            state['tip'] = True
+            return token
+        if state['tip'] and char not in '):;':
+            state['tip'] = False
+            new = relabel(token[1:-1].replace("''", "'") if char == "'" else token)
+            return token if new is None else quote(new)
+        state['tip'] = False
+        return token
+
+    return TOKEN_PATTERN.sub(repl, newick_string)
+
+
+class CompactTree(object):
+    """
+    A tree stored as arrays indexed by node.
+
+    :ivar parents: `array` of parent indices, `-1` for the root.
+    :ivar lengths: `array` of branch lengths (`float`), `nan` for missing branch lengths.
+    :ivar tips: `array` of indices into `taxa` for tips, `-1` for internal (or unlabeled) nodes.
+    :ivar labels: `list` of labels of internal nodes, `None` for tips and unlabeled nodes.
+    :ivar comments: `list` of node comments (without the brackets), or `None`.
+    :ivar taxon_index: `dict` mapping tip labels to taxon indices - typically shared by all \
+    trees of a trees block.
+    :ivar length_tokens: `list` of the branch lengths as read from newick, `None` for missing \
+    or computed lengths - or `None`, if the tokens have not been kept.
+    """
+    __slots__ = (
+        'parents', 'lengths', 'tips', 'labels', 'comments', 'taxon_index', 'length_tokens',
+        '_child_offsets', '_children')
+
+    def __init__(self, parents, lengths, tips, labels, comments, taxon_index, length_tokens=None):
+        self.parents = parents
+        self.lengths = lengths
+        self.tips = tips
+        self.labels = labels
+        self.comments = comments
+        self.taxon_index = taxon_index
+        self.length_tokens = length_tokens
+        self._child_offsets = None
+        self._children = None
+
+    def _index_children(self):
+        # Children are stored in "compressed sparse row" format: The children of node `i` are
+        # `_children[_child_offsets[i]:_child_offsets[i + 1]]`.
+        counts = array.array('l', [0] * (len(self.parents) + 1))
+        for parent in self.parents[1:]:
+            counts[parent + 1] += 1
+        for i in range(1, len(counts)):
+            counts[i] += counts[i - 1]
+        children = array.array('l', [0] * (len(self.parents) - 1))
+        fill = array.array('l', counts)
+        for node, parent in enumerate(self.parents[1:], start=1):
+            children[fill[parent]] = node
+            fill[parent] += 1
+        self._child_offsets, self._children = counts, children
+
+    def __len__(self):
+        return len(self.parents)
+
+    def __repr__(self):
+        return '<CompactTree: %d nodes, %d tips>' % (len(self), self.ntips)
+
+    @property
+    def ntips(self):
+        return sum(1 for _ in self.iter_tips())
+
+    @property
+    def taxa(self):
+        """
+        List of tip labels, indexed by taxon index.
+        """
+        res = [None] * len(self.taxon_index)
+        for label, index in self.taxon_index.items():
+            res[index] = label
+        return res
+
+    def children(self, node):
+        if self._child_offsets is None:
+            self._index_children()
+        return self._children[self._child_offsets[node]:self._child_offsets[node + 1]]
+
+    def is_tip(self, node):
+        # In preorder, a node is a tip if the next node is not its child.
+        return node + 1 == len(self.parents) or self.parents[node + 1] != node
+
+    def iter_tips(self):
+        """
+        Yields the node indices of all tips in preorder.
+        """
+        parents, n = self.parents, len(self.parents)
+        for node in range(n):
+            if node + 1 == n or parents[node + 1] != node:
+                yield node
+
+    @classmethod
+    def from_newick(cls, newick_string, taxon_index=None, extend=True, keep_tokens=False):
+        """
+        Parses a newick string in one pass.
+
+        :param newick_string: A newick tree, optionally prefixed with comments, e.g. `[&R] (a,b);`
+        :param taxon_index: `dict` mapping tip labels to taxon indices. If `None`, taxa are \
+        indexed in order of appearance.
+        :param extend: Flag signaling whether to add unknown tip labels to `taxon_index` - or \
+        to raise a `NexusFormatException`.
+        :param keep_tokens: Flag signaling whether to keep the branch lengths as read, to write \
+        them unchanged with `to_newick`.
+        """
+        taxon_index = {} if taxon_index is None else taxon_index
+        parents, lengths, labels, comments = [-1], [math.nan], [None], [None]
+        tokens = [None]
+        current, expect_length = 0, False
+
+        for token in TOKEN_PATTERN.findall(newick_string):
+            char = token[0]
+            if char == '(' or char == ',':
+                if char == ',':
+                    if current == 0:
+                        raise NexusFormatException("Unbalanced tree: %s" % newick_string)
+                    current = parents[current]
+                parents.append(current)
+                lengths.append(math.nan)
+                labels.append(None)
+                comments.append(None)
+                tokens.append(None)
+                current = len(parents) - 1
+                expect_length = False
+            elif char == ')':
+                if current == 0:
+                    raise NexusFormatException("Unbalanced tree: %s" % newick_string)
+                current = parents[current]
+                expect_length = False
+            elif char == ':':
+                expect_length = True
+            elif char == '[':
+                comment = token[1:-1]
+                comments[current] = comment if comments[current] is None \
+                    else comments[current] + '][' + comment
+            elif char == ';':
+                break
+            elif expect_length:
+                try:
+                    lengths[current] = float(token)
+                except ValueError:
+                    raise NexusFormatException("Invalid branch length: %s" % token)
+                tokens[current] = token
+                expect_length = False
+            elif char == "'":
+                labels[current] = token[1:-1].replace("''", "'")
+            else:
+                labels[current] = token
+
+        if current != 0:
+            raise NexusFormatException("Unbalanced tree: %s" % newick_string)
+
+        tips = array.array('l', [-1] * len(parents))
+        res = cls(
+            array.array('l', parents),
+            array.array('d', lengths),
+            tips,
+            labels,
+            comments,
+            taxon_index,
+            tokens if keep_tokens else None)
+        for node in res.iter_tips():
+            label = labels[node]
+            if label is None:
+                continue
+            labels[node] = None
+            if label not in taxon_index:
+                if not extend:
+                    raise NexusFormatException("Unknown taxon %s" % label)
+                taxon_index[label] = len(taxon_index)
+            tips[node] = taxon_index[label]
+        return res
+
+    @classmethod
+    def from_node(cls, node, taxon_index=None):
+        """
+        Converts a `newick.Node` into a `CompactTree`.
+        """
+        return cls.from_newick(node.newick + ';', taxon_index=taxon_index)
+
+    def prune(self, taxa):
+        """
+        Removes tips from the tree.
+
+        Internal nodes which are left with a single child are collapsed, i.e. the child takes
+        their place and the branch lengths are summed. If the root is left with a single child,
+        the child becomes the new root.
+
+        Summed branch lengths are rounded to `SUMMED_LENGTH_DIGITS` significant digits, to not
+        add floating point noise like `0.30000000000000004` - other branch lengths (and their
+        tokens) are kept unchanged.
+
+        :param taxa: Container of the taxon indices of the tips to remove.
+        :return: A new `CompactTree`, sharing `taxon_index` with this tree.
+        :raises ValueError: If all tips would be removed.
+        """
+        n = len(self)
+        # Count the remaining children of each node, bottom-up:
+        kept = [0] * n
+        for node in range(n - 1, -1, -1):
+            if self.is_tip(node):
+                keep = self.tips[node] not in taxa
+            else:
+                keep = kept[node] > 0
+            if keep and node:
+                kept[self.parents[node]] += 1
+            elif not keep:
+                kept[node] = -1
+        if kept[0] < 0:
+            raise ValueError('Cannot prune all tips from a tree')
+
+        parents, lengths, tips, labels, comments = [], [], [], [], []
+        old_tokens, tokens = self.length_tokens, []
+        # For each retained old node, the new index of the node - or of its closest retained
+        # ancestor, if the node has been collapsed - and the length to add to its children
+        # (`None` if no node has been collapsed below the closest retained ancestor):
+        target, extra = [-1] * n, [None] * n
+        for node in range(n):
+            if kept[node] < 0:
+                continue
+            parent = self.parents[node]
+            new_parent = target[parent] if node else -1
+            add = extra[parent] if node else None
+            if kept[node] == 1:  # A unary node is collapsed.
+                target[node] = new_parent
+                if node:
+                    extra[node] = (add or 0.0) + self.lengths[node]
+                continue
+            token = None
+            if new_parent == -1:
+                # The node is the (possibly new) root, keeping the length of the old root:
+                length = self.lengths[0]
+                token = old_tokens[0] if old_tokens else None
+            elif add is None:
+                length = self.lengths[node]
+                token = old_tokens[node] if old_tokens else None
+            else:
+                length = round_length(self.lengths[node] + add)
+            target[node] = len(parents)
+            parents.append(new_parent)
+            lengths.append(length)
+            tokens.append(token)
+            tips.append(self.tips[node])
+            labels.append(self.labels[node])
+            comments.append(self.comments[node])
+        return self.__class__(
+            array.array('l', parents),
+            array.array('d', lengths),
+            array.array('l', tips),
+            labels,
+            comments,
+            self.taxon_index,
+            tokens if old_tokens else None)
+
+    def to_newick(self, lengths=True, comments=True, taxa=None):
+        """
+        Serializes the tree as newick string.
+
+        :param lengths: Flag signaling whether to include branch lengths.
+        :param comments: Flag signaling whether to include node comments.
+        :param taxa: Optional list of tip labels, indexed by taxon index, to use instead of \
+        the labels from `taxon_index`.
+        """
+        taxa = taxa or self.taxa
+        tokens = self.length_tokens
+
+        def node_suffix(node):
+            tip = self.tips[node]
+            label = taxa[tip] if tip >= 0 else self.labels[node]
+            res = quote(label) if label is not None else ''
+            if comments and self.comments[node] is not None:
+                res += '[%s]' % self.comments[node]
+            if lengths and not math.isnan(self.lengths[node]):
+                res += ':%s' % (
+                    tokens[node] if tokens and tokens[node] is not None
+                    else format_length(self.lengths[node]))
+            return res
+
+        # We serialize nodes bottom-up, such that each subtree is serialized only once.
+        subtrees = [None] * len(self)
+        for node in reversed(range(len(self))):
+            children = self.children(node)
+            if children:
+                subtrees[node] = '(%s)%s' % (
+                    ','.join(subtrees[child] for child in children), node_suffix(node))
+                for child in children:
+                    subtrees[child] = None
+            else:
+                subtrees[node] = node_suffix(node)
+        return subtrees[0] + ';'
+
+    def to_node(self):
+        """
+        Converts the tree into a `newick.Node`.
+        """
+        return newick.loads(self.to_newick())[0]
+
+
+def round_length(length):
+    """
+    Rounds a computed branch length to `SUMMED_LENGTH_DIGITS` significant digits.
+
+    >>> round_length(0.1 + 0.2)
+    0.3
+    """
+    return float('%.*g' % (SUMMED_LENGTH_DIGITS, length))
+
+
+def format_length(length):
+    """
+    Formats a branch length, using integers where possible.
+
+    >>> format_length(1.0)
+    '1'
+    >>> format_length(0.25)
+    '0.25'
+    """
+    if length.is_integer():
+        return str(int(length))
+    return repr(length)
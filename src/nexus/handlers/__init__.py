@@ -9,6 +9,36 @@ MESQUITE_LINK_PATTERN = re.compile(
 )
 BEGIN_PATTERN = re.compile(r"""begin (\w+)(\s*|\[.*\]);""", re.IGNORECASE)
 END_PATTERN = re.compile(r"""end\s*;""", re.IGNORECASE)
+LINEBREAK_PATTERN = re.compile(r"""\r\n|\r|\n""")
+
+
+class TrackedAttribute(object):
+    """
+    Descriptor for handler state which may be changed by client code.
+
+    Any access to the attribute flags the handler as (potentially) modified, so that the block
+    is regenerated - rather than copied verbatim from its source - when written.
+
+    :param load: Optional callable, computing the value from the handler if it hasn't been set.
+    """
+    def __init__(self, name, load=None):
+        self.name = name
+        self.load = load
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        instance._modified = True
+        if self.load and self.name not in instance.__dict__:
+            instance.__dict__[self.name] = self.load(instance)
+        try:
+            return instance.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name)
+
+    def __set__(self, instance, value):
+        instance._modified = True
+        instance.__dict__[self.name] = value
 
 
 class GenericHandler(object):
@@ -23,17 +53,53 @@ class GenericHandler(object):
         2. iter_lines(self) - a function for returning the block to a text
             representation (used to regenerate a nexus file).
         3. block - a list of raw strings in this block
+
+    Blocks without a specific handler may be read lazily (see `NexusReader.from_file`), i.e.
+    `block` is only read from the source when it is accessed.
+
+    Handlers read by `NexusReader` remember the span of the source they were read from. As long
+    as none of the (tracked) attributes is accessed, `write(verbatim=True)` copies this span.
     """
+    block = TrackedAttribute('block', load=lambda handler: handler._read_block())
+    _source = None
+    _modified = True
+
     def __init__(self, name=None, data=None):
         """Initialise datastore in <block> under <keyname>"""
         self.name = name
-        self.block = data or []
-        self.comments = []
+        if data is not None:
+            self.block = data
+
+    def _read_block(self):
+        if self._source is None:
+            return []
+        text = self._source.read()
+        if text is None:
+            raise IOError("Source of block %s has changed" % self.name)
+        lines = [line.strip() for line in LINEBREAK_PATTERN.split(text)]
+        return [
+            line for line in lines
+            if line and not (line.startswith('[') and line.endswith(']'))]
+
+    @property
+    def comments(self):
+        return [
+            line for line in self.block
+            if line.strip().startswith("[") and line.strip().endswith("]")]
+
+    def set_source(self, source):
+        """
+        Attach the source of the (freshly parsed) block, e.g. a `nexus.util.SourceSpan`.
+        """
+        self._source = source
+        self._modified = False
 
-        # save comments
-        for line in self.block:
-            if line.strip().startswith("[") and line.strip().endswith("]"):
-                self.comments.append(line)
+    @property
+    def modified(self):
+        """
+        Flag signaling whether the block may have been changed since it was read.
+        """
+        return self._modified
 
     def iter_lines(self):
         for i, line in enumerate(self.block):
@@ -42,10 +108,20 @@ class GenericHandler(object):
                 continue
             yield line
 
-    def write(self):
+    def write(self, verbatim=False):
         """
         Generates a string containing a nexus block.
+
+        :param verbatim: If `True`, an unmodified block is copied verbatim from its source.
         """
+        if verbatim and not self._modified:
+            text = self._source.read()
+            if text is not None:
+                text = text if text.endswith('\n') else text + '\n'
+                # "end" is optional in the source, but we always write it:
+                if not END_PATTERN.search(text.rstrip().rsplit('\n', maxsplit=1)[-1]):
+                    text += 'end;\n'
+                return text
         return "".join(
             ['begin {0};\n'.format(self.name)] +  # noqa: W504
             [line + '\n' for line in self.iter_lines()] +  # noqa: W504
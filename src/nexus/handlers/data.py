@@ -2,7 +2,7 @@ import re
 import warnings
 import collections
 
-from nexus.handlers import GenericHandler
+from nexus.handlers import GenericHandler, TrackedAttribute
 from nexus.handlers import QUOTED_PATTERN, WHITESPACE_PATTERN, BEGIN_PATTERN, END_PATTERN
 
 NTAX_PATTERN = re.compile(r"""ntax=(\d+)""", re.IGNORECASE)
@@ -27,6 +27,10 @@ def iter_block(lines):
 
 class DataHandler(GenericHandler):
     """Handler for data matrices"""
+    matrix = TrackedAttribute('matrix')
+    charlabels = TrackedAttribute('charlabels')
+    attributes = TrackedAttribute('attributes')
+    format = TrackedAttribute('format')
 
     _character_block_pattern = re.compile(
         r"""charstatelabels(.*?);""",
@@ -1,7 +1,7 @@
 import re
 
 from nexus.exceptions import NexusFormatException
-from nexus.handlers import GenericHandler
+from nexus.handlers import GenericHandler, TrackedAttribute
 from nexus.handlers import QUOTED_PATTERN, END_PATTERN
 
 TAXON_PLACEHOLDER = re.compile(r"""^\[.*\]\s+""")
@@ -10,6 +10,10 @@ TAXON_ANNOTATION = re.compile(r"""(.*)(\[.*\])$""")
 
 class TaxaHandler(GenericHandler):
     """Handler for `taxa` blocks"""
+    taxa = TrackedAttribute('taxa')
+    attributes = TrackedAttribute('attributes')
+    annotations = TrackedAttribute('annotations')
+
     is_dimensions = re.compile(r"""dimensions\s*ntax\s*=\s*(\d+)""", re.IGNORECASE)
     is_taxlabel_block = re.compile(r"""\btaxlabels\b""", re.IGNORECASE)
 
@@ -1,18 +1,50 @@
 import re
+import functools
 
-from clldutils.text import strip_brackets, split_text_with_context
 import newick
 
-from nexus.handlers import GenericHandler
+from nexus.handlers import GenericHandler, TrackedAttribute
 from nexus.exceptions import NexusFormatException
+from nexus.util import map_chunks
+from nexus.compact_tree import CompactTree, relabel_tips, quote
+
+NEWICK_PREFIX_PATTERN = re.compile(r"""(?:[^(\[]|\[[^\]]*\])*""")
+COMMENT_PATTERN = re.compile(r"""\[[^\]]*\]""")
+# MCMC generation numbers as encoded in tree names by BEAST (`STATE_1000`), MrBayes (`rep.1000`
+# or `gen.1000`) and others (`tree.1000.xxx`):
+GENERATION_PATTERN = re.compile(r"""(?:STATE_|rep\.|gen\.|tree\.)(?P<generation>[0-9]+)""", re.I)
+TREE_NAME_PATTERN = re.compile(r"""tree\s+(?P<name>[^=]+)\s*=""", re.I)
 
 
 class Tree(str):
     @property
     def name(self):
-        m = re.search(r'tree\s+(?P<name>[^=]+)\s*=', strip_brackets(self, {'[': ']'}))
-        if m:
-            return m.group('name').strip()
+        """
+        The tree name - without quotes, if it is quoted, e.g. `'tree.100'`.
+
+        Note: The name is cached on the `Tree` instance.
+        """
+        if '_name' not in self.__dict__:
+            # The name is part of the prefix preceding the newick representation:
+            prefix = COMMENT_PATTERN.sub('', NEWICK_PREFIX_PATTERN.match(self).group(0))
+            m = TREE_NAME_PATTERN.search(prefix)
+            name = m.group('name').strip() if m else None
+            if name and len(name) > 1 and name[0] == name[-1] and name[0] in '\'"':
+                name = name[1:-1].replace(name[0] * 2, name[0])
+            self.__dict__['_name'] = name
+        return self.__dict__['_name']
+
+    @property
+    def generation(self):
+        """
+        The MCMC generation (aka state) encoded in the tree name, e.g. `STATE_1000` or `rep.1000`.
+
+        :return: `int` or `None`, if the name does not encode a generation.
+        """
+        if '_generation' not in self.__dict__:
+            m = GENERATION_PATTERN.search(self.name or '')
+            self.__dict__['_generation'] = int(m.group('generation')) if m else None
+        return self.__dict__['_generation']
 
     @property
     def rooted(self):
@@ -29,7 +61,7 @@ class Tree(str):
     @property
     def newick_string(self):
         # Find the string up to the first "(" which is not inside a comment ...
-        prefix = split_text_with_context(self, separators='(', brackets={'[': ']'})[0]
+        prefix = NEWICK_PREFIX_PATTERN.match(self).group(0)
         # ... the remainder of the line should be the newick representation of the tree:
         return self[len(prefix):].strip()
 
@@ -37,9 +69,85 @@ class Tree(str):
     def newick_tree(self):
         return newick.loads(self.newick_string)[0]
 
+    @property
+    def compact_tree(self):
+        """
+        The tree as `CompactTree`, with taxa indexed in order of appearance.
+
+        Note: The `CompactTree` is cached on the `Tree` instance.
+        """
+        if '_compact_tree' not in self.__dict__:
+            self.__dict__['_compact_tree'] = CompactTree.from_newick(self.newick_string)
+        return self.__dict__['_compact_tree']
+
+
+class TreeBlockParser(object):
+    """
+    Parses the lines of a trees block one at a time.
+
+    :ivar translators: `dict` mapping taxon IDs to taxa, as read from the translate block - or \
+    computed from the first tree, if the block has no translate block.
+    :ivar attributes: `list` of Mesquite attribute lines.
+    :ivar was_translated: Flag signaling whether the block has a translate block.
+    """
+    translate_start = re.compile(r"""^translate$""", re.IGNORECASE)
+    translation_pattern = re.compile(r"""(\d+)\s('(?:[^']|'')*'|['"\w\d\.\_\-]+)[,;]?""")
+
+    def __init__(self):
+        self.translators = {}
+        self.attributes = []
+        self.was_translated = False
+        self._lost_in_translation = False
+        self._ntrees = 0
+
+    def feed(self, line):
+        """
+        :return: A `Tree` if the line contains a tree, else `None`.
+        """
+        # look for translation start, and turn on lost_in_translation
+        if self.translate_start.match(line):
+            self._lost_in_translation = True
+            self.was_translated = True
+        elif GenericHandler.is_mesquite_attribute(line):
+            self.attributes.append(line)
+
+        # if we're in a translate block
+        elif self._lost_in_translation:
+            if self.translation_pattern.match(line):
+                taxon_id, taxon = self.translation_pattern.findall(line)[0]
+                if len(taxon) > 1 and taxon[0] == taxon[-1] == "'":
+                    taxon = taxon[1:-1].replace("''", "'")
+                taxon = taxon.strip("'")
+                if taxon_id in self.translators:
+                    raise NexusFormatException(
+                        "Duplicate Taxa ID %s in translate block" % taxon_id
+                    )
+                if taxon in self.translators.values():
+                    raise NexusFormatException(
+                        "Duplicate Taxon %s in translate block" % taxon
+                    )
+                self.translators[taxon_id] = taxon
+            if line.endswith(';'):
+                self._lost_in_translation = False
+
+        elif TreeHandler.is_tree.search(line):
+            tree = Tree(line)
+            self._ntrees += 1
+            # get taxa if not translated.
+            if self._ntrees == 1 and not self.translators:
+                taxa = re.findall(r"""[(),](\w+)[:),]""", tree)
+                for taxon_id, t in enumerate(taxa, 1):
+                    self.translators[taxon_id] = t
+            return tree
+
 
 class TreeHandler(GenericHandler):
     """Handler for `trees` blocks"""
+    trees = TrackedAttribute('trees')
+    translators = TrackedAttribute('translators')
+    attributes = TrackedAttribute('attributes')
+    was_translated = TrackedAttribute('was_translated')
+
     is_tree = re.compile(r"""tree\s+.*=.*;""", re.IGNORECASE)
 
     translate_regex = re.compile(r"""
@@ -53,55 +161,25 @@ class TreeHandler(GenericHandler):
 
     def __init__(self, **kw):
         super(TreeHandler, self).__init__(**kw)
-        # does the treefile have a translate block?
-        self.was_translated = False
         # has detranslate been called?
         self._been_detranslated = False
-        self.translators = {}
-        self.attributes = []
-        self.trees = []
-
-        translate_start = re.compile(r"""^translate$""", re.IGNORECASE)
-        translation_pattern = re.compile(r"""(\d+)\s(['"\w\d\.\_\-]+)[,;]?""")
-
-        lost_in_translation = False
-        for line in self.block:
-            # look for translation start, and turn on lost_in_translation
-            if translate_start.match(line):
-                lost_in_translation = True
-                self.was_translated = True
-            elif self.is_mesquite_attribute(line):
-                self.attributes.append(line)
-
-            # if we're in a translate block
-            elif lost_in_translation:
-                if translation_pattern.match(line):
-                    taxon_id, taxon = translation_pattern.findall(line)[0]
-                    taxon = taxon.strip("'")
-                    if taxon_id in self.translators:
-                        raise NexusFormatException(
-                            "Duplicate Taxa ID %s in translate block" % taxon_id
-                        )
-                    if taxon in self.translators.values():
-                        raise NexusFormatException(
-                            "Duplicate Taxon %s in translate block" % taxon
-                        )
-                    self.translators[taxon_id] = taxon
-                if line.endswith(';'):
-                    lost_in_translation = False
-
-            elif self.is_tree.search(line):
-                self.trees.append(Tree(line))
-
-        # get taxa if not translated.
-        if (not self.translators) and self.trees:
-            taxa = re.findall(r"""[(),](\w+)[:),]""", self.trees[0])
-            for taxon_id, t in enumerate(taxa, 1):
-                self.translators[taxon_id] = t
+        parser = TreeBlockParser()
+        self.trees = [tree for tree in map(parser.feed, self.block) if tree is not None]
+        # does the treefile have a translate block?
+        self.was_translated = parser.was_translated
+        self.translators = parser.translators
+        self.attributes = parser.attributes
 
     def __getitem__(self, index):
         return self.trees[index]
 
+    @property
+    def generations(self):
+        """
+        List of the MCMC generations of the trees, see `Tree.generation`.
+        """
+        return [tree.generation for tree in self.trees]
+
     @property
     def taxa(self):
         return self.translators.values()
@@ -110,17 +188,154 @@ class TreeHandler(GenericHandler):
     def ntrees(self):
         return len(self.trees)
 
-    def detranslate(self):
-        """Detranslates all trees in the file"""
+    @property
+    def taxon_index(self):
+        """
+        Mapping of the tip labels used in the trees to taxon indices, i.e. to positions in the
+        translate block ordered by taxon ID.
+
+        Note: Taxa are ordered explicitly - rather than relying on the order of `translators` -
+        because indices determine the bits of splits and the rows of matrices.
+        """
+        items = sorted(self.translators.items(), key=lambda item: int(item[0]))
+        if self.was_translated and not self._been_detranslated:
+            return {str(k): i for i, (k, _) in enumerate(items)}
+        return {str(v): i for i, (_, v) in enumerate(items)}
+
+    def iter_compact_trees(self, taxon_index=None):
+        """
+        Yields the trees as `CompactTree`s, sharing one taxon index.
+
+        :param taxon_index: Mapping of tip labels to taxon indices - defaults to `taxon_index`.
+        """
+        taxon_index = self.taxon_index if taxon_index is None else taxon_index
+        for tree in self.trees:
+            yield CompactTree.from_newick(Tree(tree).newick_string, taxon_index)
+
+    def prune(self, taxa, workers=1):
+        """
+        Removes taxa from all trees and from the translate block.
+
+        Trees are pruned as `CompactTree`s, see `CompactTree.prune`.
+
+        :param taxa: Names (or - for translated trees - IDs) of the taxa to remove.
+        :param workers: Number of worker processes to prune chunks of trees in parallel.
+        :raises NexusFormatException: If taxa are not found in the trees.
+        """
+        self._prune(taxa, keep=False, workers=workers)
+
+    def restrict_to(self, taxa, workers=1):
+        """
+        Removes all taxa but `taxa` from all trees and from the translate block, i.e. replaces
+        the trees with the subtrees induced by `taxa`.
+
+        :param taxa: Names (or - for translated trees - IDs) of the taxa to keep.
+        :param workers: Number of worker processes to prune chunks of trees in parallel.
+        :raises NexusFormatException: If taxa are not found in the trees.
+        :raises ValueError: If a tree contains none of the taxa.
+        """
+        self._prune(taxa, keep=True, workers=workers)
+
+    def _check_taxa(self, taxa):
+        """
+        Makes sure all `taxa` are names or IDs of the translate block or tip labels of the trees.
+
+        :raises NexusFormatException: Listing the unknown taxa.
+        """
+        unknown = set(taxa) - set(self.translators.values())
+        if self.was_translated and not self._been_detranslated:
+            unknown -= {str(k) for k in self.translators}
+        if unknown:
+            # Only scan the trees - e.g. untranslated trees, for which taxa are guessed from the
+            # first tree - if necessary, and only until all taxa are found.
+            for tree in self.trees:
+                prefix = NEWICK_PREFIX_PATTERN.match(tree).group(0)
+                relabel_tips(tree[len(prefix):], unknown.discard)
+                if not unknown:
+                    break
+        if unknown:
+            raise NexusFormatException('Taxa %s not found in the trees' % ', '.join(
+                sorted(unknown)))
+
+    def _prune(self, taxa, keep, workers):
+        taxa = set(str(taxon) for taxon in taxa)
+        self._check_taxa(taxa)
+        if self.was_translated and not self._been_detranslated:
+            labels = {
+                str(k) for k, v in self.translators.items() if str(k) in taxa or v in taxa}
+        else:
+            labels = taxa
+        self.trees = [
+            Tree(tree) for chunk in map_chunks(
+                functools.partial(_prune_trees, labels=labels, keep=keep),
+                self.trees,
+                workers=workers)
+            for tree in chunk]
+        self.translators = {
+            k: v for k, v in self.translators.items()
+            if (str(k) in labels or v in taxa) == keep}
+
+    def detranslate(self, workers=1):
+        """
+        Detranslates all trees in the file
+
+        :param workers: Number of worker processes to detranslate chunks of trees in parallel.
+        """
         if self._been_detranslated:
             return
-        for idx, tree in enumerate(self.trees):
-            self.trees[idx] = Tree(self._detranslate_tree(tree, self.translators))
+        self.trees = [
+            Tree(tree) for chunk in map_chunks(
+                functools.partial(_detranslate_trees, translatetable=self.translators),
+                self.trees,
+                workers=workers)
+            for tree in chunk]
         self._been_detranslated = True
 
+    def translate(self):
+        """
+        Translates all trees, i.e. replaces taxon names with numeric IDs and adds a translate
+        block - the reverse of `detranslate`.
+
+        If the trees have been detranslated, the IDs of the translate block are retained. Other
+        taxa - i.e. all taxa of an untranslated block - are numbered in order of appearance.
+        """
+        if self.was_translated and not self._been_detranslated:
+            return
+        table = {}
+        if self.was_translated:
+            table = {name: str(k) for k, name in self.translators.items()}
+        self.trees = [Tree(self._translate_tree(tree, table)) for tree in self.trees]
+        self.translators = {taxon_id: name for name, taxon_id in table.items()}
+        self.was_translated = True
+        self._been_detranslated = False
+
+    @staticmethod
+    def _translate_tree(tree, translatetable):
+        """
+        Replaces taxon names in `tree` with IDs from `translatetable`, in a single pass.
+
+        Only tip labels are translated, see `nexus.compact_tree.relabel_tips`.
+
+        :param translatetable: Mapping of taxa names -> taxa id. Taxa not in the table are \
+        added, with the next free numeric ID.
+        :return: String of translated tree
+        """
+        next_id = []
+
+        def relabel(taxon):
+            if taxon not in translatetable:
+                if not next_id:
+                    next_id.append(max((int(i) for i in translatetable.values()), default=0) + 1)
+                translatetable[taxon] = str(next_id[0])
+                next_id[0] += 1
+            return translatetable[taxon]
+
+        prefix = NEWICK_PREFIX_PATTERN.match(tree).group(0)
+        return prefix + relabel_tips(tree[len(prefix):], relabel)
+
     @staticmethod
     def _findall_chunks(tree):
-        """Helper function to find groups used by detranslate."""
+        """Helper function to find the taxon chunks in a tree."""
         matches = []
         index = 0
         while True:
@@ -134,7 +349,8 @@ class TreeHandler(GenericHandler):
             index = match.end()
         return matches
 
-    def _detranslate_tree(self, tree, translatetable):
+    @staticmethod
+    def _detranslate_tree(tree, translatetable):
         """
         Takes a `tree` and expands the short format tree with translated
         taxa labels from `translatetable` into a full format tree.
@@ -147,27 +363,15 @@ class TreeHandler(GenericHandler):
 
         :return: String of detranslated tree
         """
-        for found in self._findall_chunks(tree):
-            if found['taxon'] in translatetable:
-                taxon = translatetable[found['taxon']]
-                if found['comment'] and found['branch']:
-                    # comment and branch
-                    sub = "%s:%s%s" % \
-                        (taxon, found['comment'], found['branch'])
-                elif found['comment']:
-                    # comment only
-                    sub = "%s%s" % (taxon, found['comment'])
-                elif found['branch']:
-                    # branch only
-                    sub = "%s:%s" % (taxon, found['branch'])
-                else:
-                    # taxon only
-                    sub = taxon
-                sub = "%s%s%s" % (found['start'], sub, found['end'])
-                tree = tree.replace(found['match'], sub)
-        return tree
+        # We replace taxa-ids in one pass over the tree, rather than rescanning the tree for
+        # each taxon.
+        prefix = NEWICK_PREFIX_PATTERN.match(tree).group(0)
+        return prefix + relabel_tips(tree[len(prefix):], translatetable.get)
 
-    def iter_lines(self):
+    def iter_header_lines(self):
+        """
+        Yields the lines of the block preceding the trees, i.e. attributes and translate block.
+        """
         for attr in self.attributes:
             yield "\t" + attr
         if self.was_translated and not self._been_detranslated:
@@ -175,8 +379,39 @@ class TreeHandler(GenericHandler):
             translator_keys = [int(k) for k in self.translators.keys()]
             for i, index in enumerate(sorted(translator_keys), start=1):
                 yield "\t%d %s%s" % (
-                    index, self.translators[str(index)], '' if i == len(translator_keys) else ',')
+                    index,
+                    quote(self.translators[str(index)]),
+                    '' if i == len(translator_keys) else ',')
             # work around bug https://github.com/CompEvol/beast2/issues/713
             yield ';'
+
+    def iter_lines(self):
+        for line in self.iter_header_lines():
+            yield line
         for tree in self.trees:
             yield "\t" + tree
+
+
+def _detranslate_trees(trees, translatetable):
+    return [TreeHandler._detranslate_tree(tree, translatetable) for tree in trees]
+
+
+def _prune_trees(trees, labels, keep=False):
+    # The trees of a chunk share a taxon index, so we only need to check each tip label once,
+    # when it is added to the index:
+    taxon_index, remove = {}, set()
+    res = []
+    for tree in trees:
+        prefix = NEWICK_PREFIX_PATTERN.match(tree).group(0)
+        ntaxa = len(taxon_index)
+        compact = CompactTree.from_newick(tree[len(prefix):], taxon_index, keep_tokens=True)
+        if len(taxon_index) > ntaxa:
+            remove.update(
+                index for label, index in taxon_index.items()
+                if index >= ntaxa and (label in labels) != keep)
+        try:
+            compact = compact.prune(remove)
+        except ValueError:
+            raise ValueError('No taxa left in %s' % prefix.split('=')[0].strip())
+        res.append(prefix + compact.to_newick())
+    return res
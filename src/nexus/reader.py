@@ -2,7 +2,8 @@
 Tools for reading a nexus file
 """
 import io
-import gzip
+import codecs
+import re
 import pathlib
 import warnings
 
@@ -10,8 +11,12 @@ from nexus.handlers import GenericHandler
 from nexus.handlers import BEGIN_PATTERN, END_PATTERN
 from nexus.handlers.taxa import TaxaHandler
 from nexus.handlers.data import CharacterHandler, DataHandler
-from nexus.handlers.tree import TreeHandler
+from nexus.handlers.tree import TreeHandler, TreeBlockParser
 from nexus.exceptions import NexusFormatException
+from nexus.util import open_binary, SourceSpan
+
+LONE_CR = re.compile('(\r)(?!\n)')
+LONE_CR_BYTES = re.compile(b'(\r)(?!\n)')
 
 HANDLERS = {
     'data': DataHandler,
@@ -42,16 +47,23 @@ class NexusReader(object):
             self._set_blocks(NexusReader._blocks_from_file(filename))
 
     @classmethod
-    def from_file(cls, filename, encoding='utf-8-sig'):
+    def from_file(cls, filename, encoding='utf-8-sig', skip=None, lazy=False):
         """
         Loads and Parses a Nexus File
 
         :param filename: filename of a nexus file
+        :param skip: Names of blocks which are not parsed, e.g. `['trees']`, to stream the \
+        trees with `TreeStream` instead. Handlers of skipped blocks are empty, but unless \
+        modified, the blocks are still written verbatim from the source.
+        :param lazy: If `True`, blocks without specific handler are not read into memory, but \
+        read from the file when accessed - which fails if the file has been changed or removed \
+        in the meantime.
         :raises IOError: If file reading fails.
         :return: `NexusReader` object.
         """
         res = cls()
-        res._set_blocks(NexusReader._blocks_from_file(filename, encoding=encoding))
+        res._set_blocks(NexusReader._blocks_from_file(
+            filename, encoding=encoding, skip=skip, lazy=lazy))
         res.filename = filename
         res.short_filename = pathlib.Path(filename).name
         return res
@@ -72,10 +84,14 @@ class NexusReader(object):
 
     def _set_blocks(self, blocks):
         self.blocks = {}
-        for block, lines in (blocks.items() if isinstance(blocks, dict) else blocks):
+        if isinstance(blocks, dict):
+            blocks = ((block, lines, None) for block, lines in blocks.items())
+        for block, lines, source in blocks:
             if block in self.blocks:
                 raise NexusFormatException("Duplicate Block %s" % block)
             self.blocks[block] = HANDLERS.get(block, GenericHandler)(name=block, data=lines)
+            if source is not None:
+                self.blocks[block].set_source(source)
 
         if self.blocks.get('characters') and not self.blocks.get('data'):
             self.blocks['data'] = self.blocks['characters']
@@ -105,74 +121,204 @@ class NexusReader(object):
         return self
 
     @staticmethod
-    def _blocks_from_string(string):
-        return NexusReader._iter_blocks(io.StringIO(string).readlines())
+    def _blocks_from_string(string, eager=HANDLERS, skip=None):
+        for block, lines, span in NexusReader._iter_blocks(
+                NexusReader._iter_lines(io.StringIO(string)), eager=eager, skip=skip):
+            yield block, lines, SourceSpan(string, *span)
 
     @staticmethod
-    def _iter_blocks(iterlines):
-        block, lines = None, []
+    def _iter_lines(rawlines, encoding=None):
+        """
+        Yields `(line, start, end)` triples, where `start` and `end` are the offsets of the
+        line in the source.
+
+        :param rawlines: Iterable of `str` or - if `encoding` is given - `bytes` lines, split at \
+        `\n`.
+        """
+        offset = 0
+        for raw in rawlines:
+            # Like text mode, we also treat lone carriage returns as line breaks. Since `re.split`
+            # returns the separators, too, chunks and separators alternate in `parts`.
+            parts = (LONE_CR_BYTES if encoding else LONE_CR).split(raw)
+            for i in range(0, len(parts), 2):
+                chunk = parts[i] + (parts[i + 1] if i + 1 < len(parts) else parts[i][:0])
+                if chunk:
+                    start, offset = offset, offset + len(chunk)
+                    yield chunk.decode(encoding) if encoding else chunk, start, offset
+
+    @staticmethod
+    def _iter_blocks(iterlines, eager=None, skip=None, encoding=None):
+        """
+        Yields `(name, lines, span)` triples for the blocks read from `(line, start, end)` triples.
 
-        for line in iterlines:
-            line = line.strip()
+        `span` is the `(start, end)` range of the block in the source, starting at the `begin`
+        command.
+
+        :param eager: Names of blocks for which lines are collected, or `None` for all blocks. \
+        `lines` is `None` for other blocks - which can be read lazily from their span.
+        :param skip: Names of blocks for which lines are never collected.
+        :param encoding: If given, offsets are byte offsets in a source with this encoding.
+        """
+        skip = skip or []
+        if encoding:
+            # We compute offsets from the end of the line, thus must not count a BOM:
+            codec = 'utf8' if codecs.lookup(encoding).name == 'utf-8-sig' else encoding
+        block, lines, start_block, end_block = None, [], None, None
+
+        for raw, start, end in iterlines:
+            line = raw.strip()
             if not line:
                 continue
             elif line.startswith('[') and line.endswith(']'):
                 continue
 
-            start = BEGIN_PATTERN.findall(line)
-            if start:
-                if block and lines:
+            begin = BEGIN_PATTERN.findall(line)
+            if begin:
+                if block:
                     # "end" is optional!
-                    yield block, lines
-                block, lines = start[0][0].lower(), []
+                    yield block, lines, (start_block, end_block)
+                # The line may start with something else, e.g. "#NEXUS begin ...":
+                rest = raw[BEGIN_PATTERN.search(raw).start():]
+                block = begin[0][0].lower()
+                start_block = end - (len(rest.encode(codec)) if encoding else len(rest))
+                lines = [] if (eager is None or block in eager) and block not in skip else None
 
             if block:
-                lines.append(line)
+                end_block = end
+                if lines is not None:
+                    lines.append(line)
 
             if END_PATTERN.search(line):
                 if block:
-                    yield block, lines
+                    yield block, lines, (start_block, end_block)
                 block, lines = None, []
 
-        if block and lines:
+        if block:
             # "end" is optional. Whatever we have left is counted as belonging to the last block.
-            yield block, lines
+            yield block, lines, (start_block, end_block)
 
     @staticmethod
-    def _blocks_from_file(filename, encoding='utf-8-sig'):
+    def _blocks_from_file(filename, encoding='utf-8-sig', skip=None, lazy=False):
         filename = pathlib.Path(filename)
+        eager = list(HANDLERS) if lazy else None
 
         if not (filename.exists() and filename.is_file()):
             raise IOError("Unable To Read File %s" % filename)
 
-        if filename.suffix == '.gz':
-            handle = gzip.open(str(filename), 'rt', encoding=encoding)
-        else:
-            handle = filename.open('r', encoding=encoding)
-        res = NexusReader._iter_blocks(handle.readlines())
-        handle.close()
-        return res
+        with open_binary(filename) as handle:
+            try:
+                ascii_compatible = b'\r\n'.decode(encoding) == '\r\n'
+            except UnicodeDecodeError:  # pragma: no cover
+                ascii_compatible = False
+            if not ascii_compatible:
+                # We can't split lines (and compute byte ranges) for encodings like UTF-16.
+                return list(NexusReader._blocks_from_string(
+                    handle.read().decode(encoding), eager=eager, skip=skip))
+
+            blocks = []
+            for block, lines, span in NexusReader._iter_blocks(
+                    NexusReader._iter_lines(handle, encoding=encoding),
+                    eager=eager, skip=skip, encoding=encoding):
+                blocks.append((block, lines, SourceSpan(filename, *span, encoding=encoding)))
+        return blocks
 
-    def write(self, **kw):
+    def write(self, verbatim=False, **kw):
         """
         Generates a string containing a complete nexus from
         all the data.
 
+        :param verbatim: If `True`, blocks which have not been modified since reading are copied \
+        verbatim from the source, rather than regenerated.
         :return: String
         """
         out = ["#NEXUS\n"]
         for block in self.blocks:
-            out.append(self.blocks[block].write())
+            out.append(self.blocks[block].write(verbatim=verbatim))
             # empty line after block if needed
             if len(self.blocks) > 1:
                 out.append("\n")
         return "\n".join(out)
 
-    def write_to_file(self, filename):
+    def write_to_file(self, filename, **kw):
         """
         Writes the nexus to a file.
 
         :return: None
         """
-        with pathlib.Path(filename).open('w', encoding='utf8') as handle:
-            handle.writelines(self.write())
+        filename = pathlib.Path(filename)
+        if filename.exists():
+            # Blocks read from the very same file must be kept in memory, because their source
+            # is about to be overwritten:
+            for handler in self.blocks.values():
+                if isinstance(handler._source, SourceSpan) and handler._source.is_file(filename):
+                    handler._source = handler._source.detached()
+        # Note: We must generate the content before opening the file, because unmodified blocks
+        # may be copied from the very same file.
+        content = self.write(**kw)
+        with filename.open('w', encoding='utf8') as handle:
+            handle.write(content)
+
+
+class TreeStream(object):
+    """
+    Streams the trees of the (first) trees block of a nexus file, i.e. trees are read from the
+    file when iterating, rather than kept in memory.
+
+    `TreeStream` mimics the read-only parts of the `TreeHandler` API, thus can be passed to the
+    tree tools in `nexus.tools` instead of `NexusReader.trees`.
+    """
+    def __init__(self, filename, encoding='utf-8-sig'):
+        self.filename = pathlib.Path(filename)
+        if not (self.filename.exists() and self.filename.is_file()):
+            raise IOError("Unable To Read File %s" % self.filename)
+        self.encoding = encoding
+        self._been_detranslated = False
+        self._ntrees = None
+
+        # Read the block up to the first tree, to get the translate block:
+        parser = TreeBlockParser()
+        trees = self._iter_trees(parser)
+        next(trees, None)
+        trees.close()
+        self.translators = parser.translators
+        self.attributes = parser.attributes
+        self.was_translated = parser.was_translated
+
+    def __repr__(self):
+        return "<TreeStream: %s>" % self.filename
+
+    def _iter_trees(self, parser):
+        with io.TextIOWrapper(open_binary(self.filename), encoding=self.encoding) as handle:
+            in_block = False
+            for line in handle:
+                line = line.strip()
+                if (not line) or (line.startswith('[') and line.endswith(']')):
+                    continue
+                if not in_block:
+                    begin = BEGIN_PATTERN.findall(line)
+                    in_block = bool(begin) and begin[0][0].lower() == 'trees'
+                if in_block:
+                    tree = parser.feed(line)
+                    if tree is not None:
+                        yield tree
+                    if END_PATTERN.search(line):
+                        break
+
+    def __iter__(self):
+        return self._iter_trees(TreeBlockParser())
+
+    @property
+    def trees(self):
+        return self
+
+    @property
+    def ntrees(self):
+        """
+        The number of trees - computed in a pass over the file.
+        """
+        if self._ntrees is None:
+            self._ntrees = sum(1 for _ in self)
+        return self._ntrees
+
+    taxon_index = TreeHandler.taxon_index
+    iter_header_lines = TreeHandler.iter_header_lines
@@ -9,6 +9,15 @@ from nexus.tools.sites import new_nexus_without_sites
 from nexus.tools.sites import tally_by_site
 from nexus.tools.sites import tally_by_taxon
 from nexus.tools.sites import count_binary_set_size
+from nexus.tools.splits import count_splits, SplitTable
+from nexus.tools.consensus import consensus
+from nexus.tools.mcc import mcc_tree
+from nexus.tools.distances import rf_matrix, mean_patristic_matrix
+from nexus.tools.convergence import asdsf
+from nexus.tools.topology import topology_counts
+from nexus.tools.annotations import iter_annotations
+from nexus.tools.heights import summarise_heights
+from nexus.tools.ltt import ltt_curves
 
 __all__ = [
     "binarise",
@@ -24,4 +33,15 @@ __all__ = [
     "count_binary_set_size",
     "check_zeros",
     "remove_zeros",
+    "count_splits",
+    "SplitTable",
+    "consensus",
+    "mcc_tree",
+    "rf_matrix",
+    "mean_patristic_matrix",
+    "asdsf",
+    "topology_counts",
+    "iter_annotations",
+    "summarise_heights",
+    "ltt_curves",
 ]
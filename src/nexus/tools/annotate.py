@@ -0,0 +1,103 @@
+"""
+Tools to annotate a target tree with clade support and node heights from a sample of trees -
+similar to BEAST's TreeAnnotator, but for a given target tree.
+"""
+import math
+import array
+import functools
+
+from nexus.compact_tree import CompactTree, format_length
+from nexus.exceptions import NexusFormatException
+from nexus.handlers.tree import Tree
+from nexus.util import map_chunks
+from nexus.tools.splits import clades, get_taxon_index, get_taxon_names
+from nexus.tools.heights import Reservoir, node_heights
+
+
+def _clade_heights(trees, taxon_index, targets):
+    res = []
+    for tree in trees:
+        tree = CompactTree.from_newick(Tree(tree).newick_string, taxon_index, extend=False)
+        heights = node_heights(tree)
+        res.append({
+            split: heights[node] for node, split in enumerate(clades(tree)) if split in targets})
+    return res
+
+
+def _format(value):
+    return format_length(round(value, 6))
+
+
+def annotate_tree(
+        target, trees, heights='keep', size=1000, rng=None, workers=1, chunksize=100):
+    """
+    Annotates the nodes of a target tree with the frequency of their clades in a sample of trees
+    and with the distribution of the clade heights.
+
+    Nodes are annotated with BEAST-style comments, e.g.
+    `[&posterior=0.9,height=1.2,height_median=1.1,height_95%_HPD={0.8,1.7}]`, replacing existing
+    comments. Nodes whose clade is not in any tree of the sample get `posterior=0` only.
+
+    The trees of the sample are streamed, keeping only the height distributions of the clades of
+    the target tree in memory.
+
+    The target tree may contain more taxa than the sample - e.g. a reference tree of a language
+    family - in which case it is restricted to the taxa of the sample first, see
+    `CompactTree.prune`.
+
+    :param target: The target tree, as newick string or `CompactTree` labeled with taxon names.
+    :param trees: A `TreeHandler` (or `TreeStream`) instance.
+    :param heights: `'keep'` to keep the branch lengths of the target tree, `'mean'` or \
+    `'median'` to set branch lengths such that node heights are the mean or median heights of \
+    the clades.
+    :param size: Maximal number of heights per clade kept to estimate medians and HPD intervals.
+    :param rng: A `random.Random` instance to use for reservoir sampling.
+    :param workers: Number of worker processes.
+    :raises NexusFormatException: If taxa of the sample are missing from the target tree.
+    :return: The annotated (restricted) target tree as new `CompactTree`.
+    """
+    if heights not in ('keep', 'mean', 'median'):
+        raise ValueError('Invalid heights: %s' % heights)
+    taxon_index = get_taxon_index(trees)
+    names = get_taxon_names(trees, taxon_index)
+    if isinstance(target, CompactTree):
+        target = target.to_newick()
+    target = CompactTree.from_newick(target, {name: i for i, name in enumerate(names)})
+    if not set(range(len(names))) <= set(target.tips[node] for node in target.iter_tips()):
+        raise NexusFormatException('Taxa of the trees are missing from the target tree')
+    if len(target.taxon_index) > len(names):
+        target = target.prune(set(range(len(names), len(target.taxon_index))))
+
+    splits = clades(target)
+    targets = set(splits)
+    counts, reservoirs, ntrees = {}, {split: Reservoir(size, rng) for split in targets}, 0
+    for chunk in map_chunks(
+            functools.partial(_clade_heights, taxon_index=taxon_index, targets=targets),
+            trees.trees,
+            workers=workers,
+            chunksize=chunksize):
+        for clade_heights in chunk:
+            ntrees += 1
+            for split, height in clade_heights.items():
+                counts[split] = counts.get(split, 0) + 1
+                reservoirs[split].add(height)
+
+    comments, summary = [], array.array('d', target.lengths)
+    for node, split in enumerate(splits):
+        reservoir = reservoirs[split]
+        comment = 'posterior=%s' % _format(counts.get(split, 0) / ntrees if ntrees else 0.0)
+        if reservoir.n:
+            comment += ',height=%s,height_median=%s,height_95%%_HPD={%s}' % (
+                _format(reservoir.mean),
+                _format(reservoir.median),
+                ','.join(_format(v) for v in reservoir.hpd()))
+        comments.append('&' + comment)
+        summary[node] = reservoir.mean if heights == 'mean' else reservoir.median
+
+    lengths = target.lengths
+    if heights != 'keep':
+        lengths = array.array('d', [math.nan])
+        lengths.extend(
+            summary[target.parents[node]] - summary[node] for node in range(1, len(target)))
+    return CompactTree(
+        target.parents, lengths, target.tips, target.labels, comments, target.taxon_index)
@@ -0,0 +1,159 @@
+"""
+Tools to parse node annotations - i.e. BEAST-style comments like `[&rate=0.1,height_95%_HPD={1,2}]`
+- into columnar arrays aligned with the nodes of a `CompactTree`.
+"""
+import math
+import array
+import functools
+
+from nexus.compact_tree import CompactTree
+from nexus.handlers.tree import Tree
+from nexus.util import map_chunks
+from nexus.tools.splits import get_taxon_index
+
+
+def _split_top_level(string, sep=','):
+    """
+    Splits `string` at occurrences of `sep` which are neither within braces nor within quotes.
+    """
+    res, depth, quote, start = [], 0, None, 0
+    for i, char in enumerate(string):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+        elif char == sep and depth == 0:
+            res.append(string[start:i])
+            start = i + 1
+    res.append(string[start:])
+    return res
+
+
+def parse_value(value):
+    """
+    Parses the value of an annotation.
+
+    >>> parse_value('1.5E-3')
+    0.0015
+    >>> parse_value('{1,2}')
+    (1.0, 2.0)
+    >>> parse_value('"A B"')
+    'A B'
+    """
+    value = value.strip()
+    if value.startswith('{') and value.endswith('}'):
+        return tuple(parse_value(v) for v in _split_top_level(value[1:-1]) if v.strip())
+    if len(value) > 1 and value[0] in '"\'' and value[-1] == value[0]:
+        return value[1:-1]
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def parse_annotation(comment):
+    """
+    Parses a node comment into a `dict` of annotations.
+
+    The leading `&` of BEAST annotations is optional. Multiple comments of one node - as stored
+    by `CompactTree`, i.e. joined with `][` - are merged. Keys without value are mapped to
+    `True`.
+
+    :param comment: The comment without enclosing brackets, e.g. `&rate=0.1,height=2`.
+    :return: `dict` mapping keys to `float`, `str`, `True` or `tuple` values.
+    """
+    res = {}
+    if not comment:
+        return res
+    for part in comment.split(']['):
+        for item in _split_top_level(part.lstrip('&')):
+            key, sep, value = item.partition('=')
+            key = key.strip()
+            if key:
+                res[key] = parse_value(value) if sep else True
+    return res
+
+
+def _is_number(value):
+    return isinstance(value, float)
+
+
+def _is_numeric_tuple(value):
+    return isinstance(value, tuple) and all(_is_number(v) for v in value)
+
+
+def annotation_columns(tree, keys=None):
+    """
+    Extracts the annotations of all nodes of a tree into columns.
+
+    Columns are typed according to the values of a key:
+
+    - numbers are stored in an `array` of `float`s, with `nan` for nodes without the key,
+    - tuples of numbers - like HPD intervals - are stored as `tuple` of such arrays, one for \
+      each component,
+    - other values are stored in a `list`, with `None` for nodes without the key.
+
+    :param tree: A `CompactTree`.
+    :param keys: Optional container of the keys to extract - all keys if `None`.
+    :return: `dict` mapping keys to columns, indexed by node.
+    """
+    values = {}
+    for node, comment in enumerate(tree.comments):
+        if comment is None:
+            continue
+        for key, value in parse_annotation(comment).items():
+            if keys is None or key in keys:
+                values.setdefault(key, {})[node] = value
+
+    res, n = {}, len(tree)
+    for key, nodes in values.items():
+        if all(_is_number(v) for v in nodes.values()):
+            column = array.array('d', [math.nan]) * n
+            for node, value in nodes.items():
+                column[node] = value
+        elif all(_is_numeric_tuple(v) for v in nodes.values()) and \
+                len(set(len(v) for v in nodes.values())) == 1:
+            column = tuple(
+                array.array('d', [math.nan]) * n for _ in range(len(next(iter(nodes.values())))))
+            for node, value in nodes.items():
+                for component, v in zip(column, value):
+                    component[node] = v
+        else:
+            column = [None] * n
+            for node, value in nodes.items():
+                column[node] = value
+        res[key] = column
+    return res
+
+
+def _annotated_trees(trees, taxon_index, keys):
+    res = []
+    for tree in trees:
+        tree = CompactTree.from_newick(Tree(tree).newick_string, taxon_index, extend=False)
+        res.append((tree, annotation_columns(tree, keys=keys)))
+    return res
+
+
+def iter_annotations(trees, keys=None, workers=1, chunksize=100):
+    """
+    Streams the trees of a trees block, parsing each into a `CompactTree` and its annotation
+    columns (see `annotation_columns`).
+
+    :param trees: A `TreeHandler` (or `TreeStream`) instance.
+    :param keys: Optional container of the keys to extract - all keys if `None`.
+    :param workers: Number of worker processes.
+    :return: Generator of `(CompactTree, columns)` pairs, in the order of the trees.
+    """
+    for chunk in map_chunks(
+            functools.partial(
+                _annotated_trees, taxon_index=get_taxon_index(trees), keys=keys),
+            trees.trees,
+            workers=workers,
+            chunksize=chunksize):
+        for item in chunk:
+            yield item
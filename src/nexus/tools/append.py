@@ -0,0 +1,183 @@
+"""
+Tools to append trees to the trees block of an existing nexus file - without rewriting the file.
+"""
+import codecs
+import pathlib
+
+from nexus.reader import NexusReader, TreeStream
+from nexus.handlers import BEGIN_PATTERN, END_PATTERN
+from nexus.handlers.tree import Tree, TreeHandler
+from nexus.exceptions import NexusFormatException
+from nexus.tools.repair import TREE_START_PATTERN
+
+TAIL_SIZE = 65536
+
+
+def _is_begin_trees(line):
+    begin = BEGIN_PATTERN.findall(line)
+    return bool(begin) and begin[0][0].lower() == 'trees'
+
+
+def _end_index(line):
+    """
+    Finds the `end;` of a block in a line, e.g. in `tree a = (a,b); end;`.
+
+    :return: Index of `end;` in `line` - or `None`.
+    """
+    for match in END_PATTERN.finditer(line):
+        before = line[:match.start()]
+        if (not before or not before[-1].isalnum()) and \
+                (not before.strip() or before.rstrip().endswith(';')):
+            return match.start()
+    return None
+
+
+def _newline(data):
+    """
+    Detects the line break used in `data`.
+    """
+    index = data.find(b'\n')
+    if index > 0 and data[index - 1:index] == b'\r':
+        return b'\r\n'
+    if index < 0 and b'\r' in data:
+        return b'\r'
+    return b'\n'
+
+
+def _tail_scan(handle, size):
+    """
+    Looks for the `end;` of a trees block in the last lines of a file.
+
+    The tail of the file is read in growing windows, until it contains at least two complete
+    lines - which may be longer than `TAIL_SIZE` for big trees.
+
+    :return: Offset of the `end;` line - or `None` if the file does not (recognizably) end \
+    with a trees block.
+    """
+    window = TAIL_SIZE
+    while True:
+        start = max(size - window, 0)
+        handle.seek(start)
+        lines, offset = [], start
+        for line in handle.read().splitlines(True):
+            lines.append((line.strip(), offset))
+            offset += len(line)
+        if start:  # The first line may be incomplete.
+            lines = lines[1:]
+        lines = [
+            (line.decode('utf8', errors='replace'), offset) for line, offset in lines
+            if line and not (line.startswith(b'[') and line.endswith(b']'))]
+        if len(lines) >= 2 or not start:
+            break
+        window *= 2
+    if len(lines) < 2:
+        return None
+    # If the tail contains the start of the last block, it must be a trees block:
+    begins = [line for line, _ in lines if BEGIN_PATTERN.search(line)]
+    if begins and not _is_begin_trees(begins[-1]):
+        return None
+    (previous, _), (last, offset) = lines[-2:]
+    if END_PATTERN.fullmatch(last) and \
+            (TREE_START_PATTERN.match(previous) or _is_begin_trees(previous)):
+        return offset
+    return None
+
+
+def _full_scan(handle, encoding):
+    """
+    Looks for the `end;` of the first trees block of a file, reading the file line by line.
+
+    :return: Offset of the `end;` - or of the end of the last line of a trees block without \
+    `end;` - or `None` if there is no trees block.
+    """
+    handle.seek(0)
+    # Offsets are computed from the end of lines, thus must not account for a BOM:
+    codec = 'utf8' if codecs.lookup(encoding).name == 'utf-8-sig' else encoding
+    res = None
+    for line, start, end in NexusReader._iter_lines(handle, encoding=encoding):
+        stripped = line.strip()
+        if res is None:
+            if not _is_begin_trees(stripped):
+                continue
+            res = end
+        elif BEGIN_PATTERN.search(stripped):
+            break
+        index = _end_index(line)
+        if index is not None:
+            return end - len(line[index:].encode(codec))
+        if stripped:
+            res = end
+    return res
+
+
+def _translate(trees, stream):
+    """
+    Translates the tip labels of `trees` to the IDs of the translate block of `stream`.
+
+    :raises NexusFormatException: If a tip label is neither an ID nor a taxon name of the \
+    translate block.
+    """
+    table = {name: str(taxon_id) for taxon_id, name in stream.translators.items()}
+    table.update((str(taxon_id), str(taxon_id)) for taxon_id in stream.translators)
+    known = len(table)
+    res = []
+    for tree in trees:
+        tree = TreeHandler._translate_tree(tree, table)
+        if len(table) > known:
+            raise NexusFormatException('Taxa %s not in translate block' % ', '.join(
+                taxon for taxon in list(table)[known:]))
+        res.append(tree)
+    return res
+
+
+def append_trees(filename, trees, encoding='utf-8-sig'):
+    """
+    Appends trees to the (first) trees block of a nexus file, by inserting them before the
+    `end;` of the block. If the file has no trees block, a trees block is appended.
+
+    Only the part of the file after the insertion point is rewritten. The insertion point is
+    found by scanning the end of the file - and only if the trees block is not the last block,
+    by scanning the whole file.
+
+    If the trees block has a translate block, tip labels of the new trees may be IDs or names
+    of taxa in the translate block; names are translated to IDs.
+
+    :param trees: Iterable of trees, i.e. `Tree`s or strings like `tree name = (a,b);`.
+    :raises NexusFormatException: If a tree is invalid or contains taxa which are not in the \
+    translate block.
+    :return: The number of trees appended.
+    """
+    filename = pathlib.Path(filename)
+    if filename.suffix == '.gz':
+        raise ValueError('Cannot append to gzipped file %s' % filename)
+    trees = [str(tree).strip() for tree in trees]
+    for tree in trees:
+        if not TreeHandler.is_tree.search(tree):
+            raise NexusFormatException('Invalid tree: %s' % tree[:50])
+
+    stream = TreeStream(filename, encoding=encoding)
+    if stream.was_translated:
+        trees = _translate(trees, stream)
+
+    with filename.open('r+b') as handle:
+        size = handle.seek(0, 2)
+        handle.seek(max(size - TAIL_SIZE, 0))
+        newline = _newline(handle.read())
+        content = b''.join(
+            b'\t' + str(Tree(tree)).encode('utf8') + newline for tree in trees)
+        offset = _tail_scan(handle, size)
+        if offset is None:
+            offset = _full_scan(handle, encoding)
+        if offset is None:
+            offset = size
+            content = newline + b'begin trees;' + newline + content + b'end;' + newline
+        handle.seek(offset)
+        rest = handle.read()
+        if offset and not content.startswith(newline):
+            # Make sure we start on a new line:
+            handle.seek(offset - 1)
+            if handle.read(1) not in b'\r\n':
+                content = newline + content
+        handle.seek(offset)
+        handle.write(content + rest)
+    return len(trees)
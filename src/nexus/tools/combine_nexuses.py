@@ -1,6 +1,12 @@
 import os
+import pathlib
 
 from nexus.writer import NexusWriter
+from nexus.reader import TreeStream
+from nexus.handlers.tree import TreeHandler, NEWICK_PREFIX_PATTERN
+from nexus.compact_tree import quote, relabel_tips
+from nexus.tools.splits import get_taxon_index, get_taxon_names
+from nexus.tools.sampling import skip_burnin, thin
 
 
 def combine_nexuses(nexuslist):
@@ -29,10 +35,81 @@ def combine_nexuses(nexuslist):
 
 def combine_treeblocks(out, nexuslist):
     for nex in nexuslist:
-        out.trees.extend(nex.trees.trees)
+        if nex.trees.was_translated and not nex.trees._been_detranslated:
+            # Each nexus has its own translate block, so we must resolve the taxon IDs.
+            out.trees.extend(
+                TreeHandler._detranslate_tree(tree, nex.trees.translators)
+                for tree in nex.trees.trees)
+        else:
+            out.trees.extend(nex.trees.trees)
     return out
 
 
+def combine_tree_files(filenames, output, burnin=0, resample=1):
+    """
+    Combines the trees of several nexus files - e.g. of independent MCMC runs - into a single
+    trees block with one translate block.
+
+    The trees are streamed from the input files and written to the output one at a time, and
+    the taxon IDs of each tree are renumbered in a single pass. Since trees may have different
+    sets of tips, the taxa are collected from all trees in an extra pass over each file.
+
+    :param filenames: Paths of the nexus files.
+    :param output: Path of the file to write - or a file-like object.
+    :param burnin: Number - or fraction, if `burnin` is a `float` < 1 - of trees to discard from \
+    the start of each file.
+    :param resample: Only keep every Nth tree of each file (after discarding the burn-in).
+    :return: The number of trees written.
+    """
+    # Compute the combined translate block, numbering taxa in order of appearance:
+    streams, translate = [], {}
+    for filename in filenames:
+        stream = TreeStream(filename)
+        taxon_index = _collect_taxa(stream, get_taxon_index(stream))
+        taxa = get_taxon_names(stream, taxon_index)
+        for name in taxa:
+            translate.setdefault(name, str(len(translate) + 1))
+        streams.append((stream, {
+            label: translate[taxa[index]] for label, index in taxon_index.items()}))
+
+    if hasattr(output, 'write'):
+        return _write_combined_trees(output, streams, translate, burnin, resample)
+    with pathlib.Path(output).open('w', encoding='utf8') as handle:
+        return _write_combined_trees(handle, streams, translate, burnin, resample)
+
+
+def _collect_taxa(stream, taxon_index):
+    """
+    Extends a taxon index with the tip labels of all trees of a stream.
+    """
+    taxon_index = dict(taxon_index)
+
+    def add(label):
+        taxon_index.setdefault(label, len(taxon_index))
+
+    for tree in stream.trees:
+        prefix = NEWICK_PREFIX_PATTERN.match(tree).group(0)
+        relabel_tips(tree[len(prefix):], add)
+    return taxon_index
+
+
+def _write_combined_trees(handle, streams, translate, burnin, resample):
+    handle.write('#NEXUS\n\nbegin trees;\n\ttranslate\n')
+    handle.write(',\n'.join(
+        '\t%s %s' % (i, quote(name))
+        for name, i in sorted(translate.items(), key=lambda item: int(item[1]))))
+    handle.write('\n;\n')
+    ntrees = 0
+    for stream, renumber in streams:
+        trees = skip_burnin(stream, burnin, ntrees=stream.ntrees if (
+            isinstance(burnin, float) and burnin < 1) else None)
+        for tree in thin(trees, resample):
+            handle.write('\t%s\n' % TreeHandler._detranslate_tree(tree, renumber))
+            ntrees += 1
+    handle.write('end;\n')
+    return ntrees
+
+
 def combine_datablocks(out, nexuslist):
     charpos = 0
     for nex_id, nex in enumerate(nexuslist, 1):
@@ -0,0 +1,125 @@
+"""
+Tools to compute consensus trees from split tables.
+"""
+import math
+import array
+
+from nexus.compact_tree import CompactTree, format_length
+from nexus.tools.splits import count_splits, iter_taxa
+
+
+def _compatible(split, other):
+    common = split & other
+    return (not common) or common == split or common == other
+
+
+def select_splits(table, threshold=0.5, greedy=False):
+    """
+    Selects the splits to include in a consensus tree.
+
+    :param table: A `SplitTable` instance.
+    :param threshold: Splits in a majority-rule consensus tree must have a frequency above \
+    `threshold` - or be present in all trees. Since the threshold is exclusive, splits of the \
+    default majority-rule consensus tree are in more than half of the trees, thus compatible.
+    :param greedy: Flag signaling whether to add all splits which are compatible with the splits \
+    selected so far, in order of decreasing frequency, i.e. splits below `threshold` as well.
+    :return: `list` of `(split, frequency)` pairs.
+    """
+    res = []
+    for split, frequency in table.iter_frequencies():
+        if not (greedy or frequency > threshold or frequency == 1.0):
+            break
+        if all(_compatible(split, other) for other, _ in res):
+            res.append((split, frequency))
+    return res
+
+
+def consensus_tree(table, threshold=0.5, greedy=False):
+    """
+    Builds a consensus tree from a `SplitTable`.
+
+    Internal nodes are labeled with the frequency of their split (i.e. the support) and branch
+    lengths are the mean lengths of the splits in the trees containing them. For unrooted split
+    tables, the tree is rooted at the taxon with the lowest index.
+
+    :param table: A `SplitTable` instance.
+    :param threshold: Frequency which splits in a majority-rule consensus tree must exceed, see \
+    `select_splits`.
+    :param greedy: Flag signaling whether to compute a greedy consensus tree.
+    :return: A `CompactTree` with tips indexed like `table.taxa`.
+    """
+    root = (1 << len(table.taxa)) - 1
+    lowest = root & -root
+    selected = {
+        split: frequency for split, frequency in select_splits(table, threshold, greedy)
+        if split != root and (table.rooted or split != root ^ lowest)}
+    for index in range(len(table.taxa)):
+        # Tips are always included - even if they didn't appear in the table.
+        selected.setdefault(1 << index, 1.0)
+
+    # Insert the clades into a hierarchy, larger clades first:
+    children = {root: []}
+    for split in sorted(selected, key=lambda s: bin(s).count('1'), reverse=True):
+        parent = root
+        while True:
+            for child in children[parent]:
+                if child & split == split:
+                    parent = child
+                    break
+            else:
+                break
+        children[parent].append(split)
+        children[split] = []
+
+    # Serialize the hierarchy in preorder:
+    parents, lengths, tips, labels = [], [], [], []
+    stack = [(root, -1)]
+    while stack:
+        split, parent = stack.pop()
+        node = len(parents)
+        parents.append(parent)
+        if split == root:
+            lengths.append(math.nan)
+            labels.append(None)
+        else:
+            length = table.mean_length(split)
+            if (not table.rooted) and split == lowest:
+                length = table.mean_length(root ^ lowest)
+            lengths.append(length)
+            labels.append(
+                format_length(round(selected[split], 4)) if children[split] else None)
+        if children[split]:
+            tips.append(-1)
+            # Push children in reversed order, to serialize them in order of their lowest taxon.
+            for child in sorted(children[split], key=lambda s: s & -s, reverse=True):
+                stack.append((child, node))
+        else:
+            tips.append(next(iter_taxa(split)))
+
+    return CompactTree(
+        array.array('l', parents),
+        array.array('d', lengths),
+        array.array('l', tips),
+        labels,
+        [None] * len(parents),
+        {taxon: index for index, taxon in enumerate(table.taxa)})
+
+
+def consensus(trees, threshold=0.5, greedy=False, rooted=True, workers=1):
+    """
+    Computes a consensus tree for the trees of a trees block.
+
+    Splits are counted while streaming through the trees, i.e. parsed trees are not kept in
+    memory.
+
+    :param trees: A `TreeHandler` instance.
+    :param threshold: Frequency which splits in a majority-rule consensus tree must exceed, see \
+    `select_splits`.
+    :param greedy: Flag signaling whether to compute a greedy consensus tree, i.e. resolve the \
+    majority-rule consensus tree further with compatible splits of lower frequency.
+    :param rooted: Flag signaling whether to treat the trees as rooted.
+    :param workers: Number of worker processes used to count splits.
+    :return: A `CompactTree` instance.
+    """
+    return consensus_tree(
+        count_splits(trees, rooted=rooted, workers=workers), threshold=threshold, greedy=greedy)
@@ -0,0 +1,136 @@
+"""
+Tools to diagnose convergence of independent MCMC runs.
+"""
+import math
+import itertools
+import functools
+
+from nexus.compact_tree import CompactTree
+from nexus.exceptions import NexusFormatException
+from nexus.handlers.tree import Tree
+from nexus.reader import TreeStream
+from nexus.util import map_chunks
+from nexus.tools.splits import SplitTable, get_taxon_index, get_taxon_names
+
+
+def burnin_count(burnin, ntrees):
+    """
+    Computes the number of trees to discard as burn-in.
+
+    :param burnin: Number of trees - or fraction of the trees, if `burnin` is a `float` < 1.
+    :param ntrees: Total number of trees.
+
+    >>> burnin_count(0.25, 100)
+    25
+    >>> burnin_count(10, 100)
+    10
+    """
+    if isinstance(burnin, float) and burnin < 1:
+        return int(ntrees * burnin)
+    return int(burnin)
+
+
+def _window_tables(runs, burnin, window, rooted):
+    return [_run_window_tables(stream, taxon_index, burnin, window, rooted)
+            for stream, taxon_index in runs]
+
+
+def _run_window_tables(stream, taxon_index, burnin, window, rooted):
+    """
+    :return: `list` of `SplitTable`s of successive windows of `window` trees after burn-in.
+    """
+    res, table = [], SplitTable(rooted=rooted)
+    if isinstance(burnin, float) and burnin < 1:
+        # We need a first pass to count the trees.
+        burnin = burnin_count(burnin, stream.ntrees)
+    for tree in itertools.islice(stream, burnin, None):
+        table.add_tree(CompactTree.from_newick(
+            Tree(tree).newick_string, taxon_index, extend=False))
+        if window and table.ntrees == window:
+            res.append(table)
+            table = SplitTable(rooted=rooted)
+    if table.ntrees or not res:
+        res.append(table)
+    return res
+
+
+def average_sdsf(tables, min_frequency=0.1):
+    """
+    Computes the average standard deviation of split frequencies (ASDSF) across runs.
+
+    Trivial splits - i.e. of single taxa or of all taxa (but the one at the root of unrooted
+    splits) - are ignored, as are splits with a frequency below `min_frequency` in all runs.
+
+    :param tables: `list` of `SplitTable`s, one per run.
+    :return: `float` - or `nan` if no split qualifies.
+    """
+    taxa = 0
+    for table in tables:
+        for split in table.counts:
+            taxa |= split
+    splits = set()
+    for table in tables:
+        splits.update(
+            split for split, frequency in table.iter_frequencies(min_frequency=min_frequency)
+            if (split & (split - 1)) and split != taxa)
+    if not splits:
+        return math.nan
+    total = 0.0
+    for split in splits:
+        frequencies = [table.frequency(split) for table in tables]
+        mean = sum(frequencies) / len(frequencies)
+        total += math.sqrt(
+            sum((f - mean) ** 2 for f in frequencies) / (len(frequencies) - 1))
+    return total / len(splits)
+
+
+def asdsf(filenames, burnin=0.25, window=None, min_frequency=0.1, rooted=False, workers=1):
+    """
+    Computes the average standard deviation of split frequencies of independent runs.
+
+    The tree files are streamed - in parallel if `workers > 1` - without reading them into
+    memory. Tip labels are matched by taxon name, thus the runs may use different translate
+    blocks.
+
+    :param filenames: Paths of (at least two) nexus files with the trees of one run each.
+    :param burnin: Number - or fraction, if `burnin` is a `float` < 1 - of trees to discard from \
+    the start of each run.
+    :param window: If not `None`, ASDSF is computed after each `window` trees per run, i.e. \
+    over an increasing number of samples.
+    :param min_frequency: Minimal frequency of a split in any run to be included.
+    :param rooted: Flag signaling whether to compare clades of rooted trees or unrooted splits.
+    :param workers: Number of worker processes, each streaming one file at a time.
+    :return: `list` of `(ntrees, asdsf)` pairs, where `ntrees` is the number of trees per run \
+    after burn-in.
+    """
+    if len(filenames) < 2:
+        raise ValueError('ASDSF requires at least two runs')
+
+    # Taxa are indexed by name, in sorted order, to have consistent splits across runs:
+    streams, names = [], None
+    for filename in filenames:
+        stream = TreeStream(filename)
+        taxon_index = get_taxon_index(stream)
+        taxa = get_taxon_names(stream, taxon_index)
+        labels = {taxa[index]: label for label, index in taxon_index.items()}
+        if names is None:
+            names = sorted(labels)
+        elif sorted(labels) != names:
+            raise NexusFormatException('Taxa in %s differ from taxa in %s' % (
+                filename, filenames[0]))
+        streams.append((stream, {labels[name]: i for i, name in enumerate(names)}))
+
+    runs = []
+    for tables in map_chunks(
+            functools.partial(_window_tables, burnin=burnin, window=window, rooted=rooted),
+            streams,
+            workers=workers,
+            chunksize=1):
+        runs.extend(tables)
+
+    res, totals = [], [SplitTable(rooted=rooted) for _ in runs]
+    for i in range(min(len(tables) for tables in runs)):
+        for total, tables in zip(totals, runs):
+            total.update(tables[i])
+        res.append((min(t.ntrees for t in totals), average_sdsf(totals, min_frequency)))
+    return res
@@ -0,0 +1,268 @@
+"""
+Tools to compute distances between trees.
+"""
+import math
+import operator
+import functools
+import collections
+
+from nexus.compact_tree import CompactTree
+from nexus.handlers.tree import Tree
+from nexus.util import map_chunks
+from nexus.tools.splits import get_taxon_index, get_taxon_names, tree_splits
+
+
+def nontrivial_splits(tree, rooted=False):
+    """
+    :param tree: A `CompactTree`.
+    :return: `frozenset` of the splits of the tree, excluding splits of single taxa and of all \
+    taxa.
+    """
+    splits = tree_splits(tree, rooted=rooted)
+    taxa = 0
+    for split in splits:
+        taxa |= split
+    return frozenset(s for s in splits if (s & (s - 1)) and s != taxa)
+
+
+def _splitsets(trees, taxon_index, rooted, extend=False):
+    return [
+        nontrivial_splits(
+            CompactTree.from_newick(Tree(tree).newick_string, taxon_index, extend=extend),
+            rooted=rooted)
+        for tree in trees]
+
+
+def splitsets(trees, rooted=False, workers=1, chunksize=100):
+    """
+    Computes the sets of non-trivial splits of the trees of a trees block.
+
+    :param trees: A `TreeHandler` instance.
+    :param rooted: Flag signaling whether to compare clades of rooted trees or unrooted splits.
+    :return: `list` of `frozenset`s of splits, one per tree.
+    """
+    res = []
+    for chunk in map_chunks(
+            functools.partial(
+                _splitsets,
+                taxon_index=get_taxon_index(trees),
+                rooted=rooted,
+                extend=workers <= 1),
+            trees.trees,
+            workers=workers,
+            chunksize=chunksize):
+        res.extend(chunk)
+    return res
+
+
+def rf_distance(splits1, splits2, normalise=False):
+    """
+    Computes the Robinson-Foulds distance between two trees, i.e. the number of splits which are
+    found in only one of the trees.
+
+    :param splits1: `frozenset` of the splits of the first tree.
+    :param splits2: `frozenset` of the splits of the second tree.
+    :param normalise: Flag signaling whether to divide the distance by the total number of \
+    splits in both trees.
+    """
+    res = len(splits1 ^ splits2)
+    if normalise:
+        total = len(splits1) + len(splits2)
+        return res / total if total else 0.0
+    return res
+
+
+def _rf_rows(rows, splitsets, normalise):
+    return [
+        [rf_distance(splitsets[i], splitsets[j], normalise) for j in range(i + 1, len(splitsets))]
+        for i in rows]
+
+
+def iter_rf_blocks(splitsets, block_size=100, normalise=False, workers=1):
+    """
+    Computes the upper triangle of the Robinson-Foulds distance matrix in blocks of rows.
+
+    The split sets are sent to each worker process only once.
+
+    :param splitsets: `list` of split sets as returned by `splitsets`.
+    :param block_size: Number of rows per block.
+    :param workers: Number of worker processes computing blocks.
+    :return: Generator of `(offset, rows)` pairs, where `rows` is a `list` of the upper \
+    triangle parts of matrix rows, starting with row `offset`, i.e. row `i` lists the \
+    distances to the trees `i + 1, i + 2, ...`.
+    """
+    offset = 0
+    for rows in map_chunks(
+            _rf_rows,
+            range(len(splitsets)),
+            workers=workers,
+            chunksize=block_size,
+            shared=dict(splitsets=splitsets, normalise=normalise)):
+        yield offset, rows
+        offset += len(rows)
+
+
+def rf_matrix(trees, rooted=False, normalise=False, workers=1, block_size=100):
+    """
+    Computes the matrix of pairwise Robinson-Foulds distances between the trees of a trees block.
+
+    Each tree is converted to its set of splits only once, and only the upper triangle of the
+    symmetric matrix is computed.
+
+    :param trees: A `TreeHandler` instance.
+    :param rooted: Flag signaling whether to compare clades of rooted trees or unrooted splits.
+    :param normalise: Flag signaling whether to normalise distances to the range [0, 1].
+    :param workers: Number of worker processes.
+    :param block_size: Number of rows of the matrix computed per worker task.
+    :return: `list` of `list`s of distances.
+    """
+    sets = splitsets(trees, rooted=rooted, workers=workers, chunksize=block_size)
+    res = [[0.0 if normalise else 0] * len(sets) for _ in sets]
+    for offset, rows in iter_rf_blocks(sets, block_size, normalise=normalise, workers=workers):
+        for i, row in enumerate(rows, start=offset):
+            for j, distance in enumerate(row, start=i + 1):
+                res[i][j] = res[j][i] = distance
+    return res
+
+
+def _add_patristic_distances(tree, matrix):
+    """
+    Adds the patristic distances between the tips of a tree to `matrix` - in-place, so that
+    summing over trees requires no extra pass. The distance of each pair of tips is added to only
+    one of the two symmetric cells, see `_symmetrize`.
+
+    Tips are merged bottom-up, such that each pair of tips is visited once - at their lowest
+    common ancestor - i.e. in O(n²) time for n tips.
+
+    :return: `set` of the taxon indices of the tips of the tree.
+    """
+    lengths, tips = tree.lengths, tree.tips
+    # For each node, the `list` of `(taxon, distance)` pairs of the tips in its subtree:
+    subtrees = [None] * len(tree)
+    for node in reversed(range(len(tree))):
+        children = tree.children(node)
+        if children:
+            members = []
+            for child in children:
+                length = lengths[child]
+                shifted = [(taxon, dist + length) for taxon, dist in subtrees[child]]
+                subtrees[child] = None
+                for taxon1, dist1 in members:
+                    row = matrix[taxon1]
+                    for taxon2, dist2 in shifted:
+                        row[taxon2] += dist1 + dist2
+                members.extend(shifted)
+        else:
+            members = [(tips[node], 0.0)] if tips[node] >= 0 else []
+        subtrees[node] = members
+    return {taxon for taxon, _ in subtrees[0]}
+
+
+def _symmetrize(matrix):
+    for i, row in enumerate(matrix):
+        for j in range(i):
+            row[j] = matrix[j][i] = row[j] + matrix[j][i]
+    return matrix
+
+
+def _mask_missing(matrix, present):
+    for i, row in enumerate(matrix):
+        for j in range(len(row)):
+            if i not in present or j not in present:
+                row[j] = math.nan
+    return matrix
+
+
+def patristic_matrix(tree, ntaxa=None):
+    """
+    Computes the patristic distances between the tips of a tree, i.e. the lengths of the paths
+    connecting them.
+
+    :param tree: A `CompactTree`.
+    :param ntaxa: Size of the matrix - defaults to the size of the taxon index of the tree.
+    :return: `list` of `list`s of distances, indexed by taxon index - `nan` for taxa which are \
+    not in the tree and for paths with missing branch lengths.
+    """
+    ntaxa = len(tree.taxon_index) if ntaxa is None else ntaxa
+    res = [[0.0] * ntaxa for _ in range(ntaxa)]
+    present = _add_patristic_distances(tree, res)
+    _symmetrize(res)
+    if len(present) < ntaxa:
+        _mask_missing(res, present)
+    return res
+
+
+def _patristic_matrices(trees, taxon_index):
+    return [
+        patristic_matrix(
+            CompactTree.from_newick(Tree(tree).newick_string, taxon_index, extend=False),
+            ntaxa=len(taxon_index))
+        for tree in trees]
+
+
+def iter_patristic_matrices(trees, workers=1, chunksize=100):
+    """
+    Computes the patristic distance matrices of the trees of a trees block.
+
+    :param trees: A `TreeHandler` (or `TreeStream`) instance.
+    :param workers: Number of worker processes.
+    :return: Generator of matrices as returned by `patristic_matrix`, indexed by the taxon \
+    indices of `get_taxon_index(trees)`, in the order of the trees.
+    """
+    for chunk in map_chunks(
+            functools.partial(_patristic_matrices, taxon_index=get_taxon_index(trees)),
+            trees.trees,
+            workers=workers,
+            chunksize=chunksize):
+        for matrix in chunk:
+            yield matrix
+
+
+def _summed_patristic_matrix(trees, taxon_index):
+    """
+    :return: `tuple` `(ntrees, matrix, counts)` where `counts` maps taxon indices to the number \
+    of trees containing the taxon.
+    """
+    matrix = [[0.0] * len(taxon_index) for _ in range(len(taxon_index))]
+    counts = collections.Counter()
+    for tree in trees:
+        counts.update(_add_patristic_distances(
+            CompactTree.from_newick(Tree(tree).newick_string, taxon_index, extend=False),
+            matrix))
+    return len(trees), matrix, counts
+
+
+def mean_patristic_matrix(trees, workers=1, chunksize=100):
+    """
+    Computes the mean patristic distances between taxa over the trees of a trees block.
+
+    Trees are streamed, and distances are summed in-place, so only one matrix is kept in memory
+    per process - plus one per chunk returned from a worker.
+
+    :param trees: A `TreeHandler` (or `TreeStream`) instance.
+    :param workers: Number of worker processes.
+    :return: `tuple` `(taxa, matrix)` of the `list` of taxon names and the `list` of `list`s of \
+    mean distances, indexed like `taxa`. Distances involving taxa missing from any tree are `nan`.
+    """
+    taxon_index = get_taxon_index(trees)
+    ntrees, total, counts = 0, None, collections.Counter()
+    for n, matrix, chunk_counts in map_chunks(
+            functools.partial(_summed_patristic_matrix, taxon_index=taxon_index),
+            trees.trees,
+            workers=workers,
+            chunksize=chunksize):
+        ntrees += n
+        counts.update(chunk_counts)
+        if total is None:
+            total = matrix
+        else:
+            for i, row in enumerate(matrix):
+                total[i] = list(map(operator.add, total[i], row))
+    taxa = get_taxon_names(trees, taxon_index)
+    if not ntrees:
+        return taxa, [[math.nan] * len(taxa) for _ in taxa]
+    total = [[d / ntrees for d in row] for row in _symmetrize(total)]
+    present = {taxon for taxon, count in counts.items() if count == ntrees}
+    if len(present) < len(taxa):
+        _mask_missing(total, present)
+    return taxa, total
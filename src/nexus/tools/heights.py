@@ -0,0 +1,207 @@
+"""
+Tools to summarise node heights (ages) and tree lengths in samples of trees.
+"""
+import math
+import array
+import random
+import functools
+
+from nexus.compact_tree import CompactTree
+from nexus.handlers.tree import Tree
+from nexus.util import map_chunks
+from nexus.tools.splits import clades, get_taxon_index, get_taxon_names, iter_taxa
+
+
+def node_heights(tree):
+    """
+    Computes the heights of all nodes of a tree, i.e. the distance to the tip farthest from the
+    root minus the distance from the root - for ultrametric trees, the node ages.
+
+    :param tree: A `CompactTree`.
+    :return: `array` of heights, indexed by node - `nan` if branch lengths are missing.
+    """
+    depths = array.array('d', [0.0]) * len(tree)
+    parents, lengths = tree.parents, tree.lengths
+    for node in range(1, len(tree)):
+        depths[node] = depths[parents[node]] + lengths[node]
+    tip_depths = [depths[node] for node in tree.iter_tips()]
+    # Note: `max` would ignore `nan` values, unless they come first.
+    root_height = math.nan if any(math.isnan(d) for d in tip_depths) else max(tip_depths)
+    return array.array('d', [root_height - depth for depth in depths])
+
+
+def tree_length(tree):
+    """
+    Computes the sum of the branch lengths of a tree, excluding the length of the root.
+
+    :return: `float` - `nan` if branch lengths are missing.
+    """
+    return math.fsum(tree.lengths[1:])
+
+
+def hpd(values, mass=0.95):
+    """
+    Computes the highest posterior density interval, i.e. the shortest interval containing
+    a fraction `mass` of the values.
+
+    >>> hpd([1, 2, 3, 4, 10], mass=0.8)
+    (1, 4)
+    """
+    values = sorted(values)
+    if not values:
+        return math.nan, math.nan
+    width = max(int(math.ceil(mass * len(values))) - 1, 0)
+    start = min(
+        range(len(values) - width), key=lambda i: values[i + width] - values[i])
+    return values[start], values[start + width]
+
+
+class Reservoir(object):
+    """
+    Summary of a stream of values: The mean is computed exactly, quantiles are estimated from
+    a uniform random sample of at most `size` values (reservoir sampling).
+
+    `nan` values are ignored.
+
+    :ivar n: Number of values added.
+    :ivar sample: `array` of sampled values.
+    """
+    __slots__ = ('n', 'total', 'sample', 'size', 'rng')
+
+    def __init__(self, size=1000, rng=None):
+        self.n = 0
+        self.total = 0.0
+        self.sample = array.array('d')
+        self.size = size
+        self.rng = rng or random
+
+    def add(self, value):
+        if math.isnan(value):
+            return
+        self.total += value
+        if self.n < self.size:
+            self.sample.append(value)
+        else:
+            j = self.rng.randint(0, self.n)
+            if j < self.size:
+                self.sample[j] = value
+        self.n += 1
+
+    @property
+    def mean(self):
+        return self.total / self.n if self.n else math.nan
+
+    @property
+    def median(self):
+        if not self.sample:
+            return math.nan
+        values = sorted(self.sample)
+        mid = len(values) // 2
+        return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+
+    def hpd(self, mass=0.95):
+        return hpd(self.sample, mass=mass)
+
+
+class HeightSummary(object):
+    """
+    Distributions of root heights, tree lengths and clade heights in a sample of trees.
+
+    :ivar ntrees: Number of trees in the sample.
+    :ivar root_height: `Reservoir` of root heights.
+    :ivar tree_length: `Reservoir` of tree lengths.
+    :ivar clades: `dict` mapping (rooted) splits of internal nodes to `Reservoir`s of their \
+    heights.
+    :ivar counts: `dict` mapping splits of internal nodes to the number of trees containing them.
+    :ivar taxa: `list` of taxon names, indexed by taxon index.
+    """
+    def __init__(self, taxa=None, size=1000, rng=None):
+        self.ntrees = 0
+        self.size = size
+        self.rng = rng
+        self.root_height = Reservoir(size, rng)
+        self.tree_length = Reservoir(size, rng)
+        self.clades = {}
+        self.counts = {}
+        self.taxa = taxa or []
+
+    def add(self, root_height, length, heights):
+        """
+        Adds the summary of one tree, as computed by `tree_heights`.
+        """
+        self.ntrees += 1
+        self.root_height.add(root_height)
+        self.tree_length.add(length)
+        for split, height in heights.items():
+            if split not in self.clades:
+                self.clades[split] = Reservoir(self.size, self.rng)
+            self.clades[split].add(height)
+            self.counts[split] = self.counts.get(split, 0) + 1
+
+    def frequency(self, split):
+        return self.counts.get(split, 0) / self.ntrees if self.ntrees else 0.0
+
+    def split_taxa(self, split):
+        """
+        :return: `list` of the names of the taxa in `split`.
+        """
+        return [self.taxa[i] for i in iter_taxa(split)]
+
+    def iter_clades(self, min_frequency=0.0):
+        """
+        Yields `(split, frequency, reservoir)` triples, ordered by descending frequency.
+        """
+        for split, count in sorted(self.counts.items(), key=lambda item: item[1], reverse=True):
+            frequency = count / self.ntrees
+            if frequency < min_frequency:
+                break
+            yield split, frequency, self.clades[split]
+
+
+def tree_heights(tree):
+    """
+    :param tree: A `CompactTree`.
+    :return: `tuple` `(root_height, tree_length, heights)`, where `heights` is a `dict` mapping \
+    the splits of internal nodes to their heights.
+    """
+    heights = node_heights(tree)
+    splits = clades(tree)
+    return (
+        heights[0],
+        tree_length(tree),
+        {splits[node]: heights[node] for node in range(len(tree))
+         if splits[node] and not tree.is_tip(node)})
+
+
+def _tree_heights(trees, taxon_index):
+    return [
+        tree_heights(
+            CompactTree.from_newick(Tree(tree).newick_string, taxon_index, extend=False))
+        for tree in trees]
+
+
+def summarise_heights(trees, size=1000, rng=None, workers=1, chunksize=100):
+    """
+    Summarises root heights, tree lengths and clade heights of the trees of a trees block.
+
+    Trees are streamed, i.e. only the summary - with at most `size` sampled values per
+    distribution - is kept in memory.
+
+    :param trees: A `TreeHandler` (or `TreeStream`) instance.
+    :param size: Maximal number of values per distribution kept to estimate medians and HPD \
+    intervals. Estimates are exact if there are no more than `size` trees.
+    :param rng: A `random.Random` instance to use for reservoir sampling.
+    :param workers: Number of worker processes.
+    :return: A `HeightSummary` instance.
+    """
+    taxon_index = get_taxon_index(trees)
+    res = HeightSummary(size=size, rng=rng)
+    for chunk in map_chunks(
+            functools.partial(_tree_heights, taxon_index=taxon_index),
+            trees.trees,
+            workers=workers,
+            chunksize=chunksize):
+        for item in chunk:
+            res.add(*item)
+    res.taxa = get_taxon_names(trees, taxon_index)
+    return res
@@ -0,0 +1,114 @@
+"""
+Tools to compute lineages-through-time (LTT) curves of trees.
+
+Time is measured as node height, i.e. backwards from the tip farthest from the root.
+"""
+import bisect
+import functools
+import collections
+
+from nexus.compact_tree import CompactTree
+from nexus.handlers.tree import Tree
+from nexus.util import map_chunks
+from nexus.tools.splits import get_taxon_index
+from nexus.tools.heights import hpd, node_heights
+
+
+def ltt(tree):
+    """
+    Computes the lineages-through-time step function of a tree.
+
+    :param tree: A `CompactTree` with branch lengths.
+    :return: `list` of `(height, lineages)` pairs, ordered by height, where `lineages` is the \
+    number of lineages at heights in `[height, next height)`. Beyond the root height, there \
+    are no lineages.
+    """
+    heights = node_heights(tree)
+    # Heights of tips of ultrametric trees may be off by rounding errors:
+    tolerance = 1e-9 * abs(heights[0])
+    deltas = collections.Counter()
+    for node in range(1, len(tree)):
+        height = heights[node]
+        deltas[height if height > tolerance else 0.0] += 1
+        deltas[heights[tree.parents[node]]] -= 1
+    res, lineages = [], 0
+    for height in sorted(deltas):
+        if deltas[height]:
+            lineages += deltas[height]
+            res.append((height, lineages))
+    return res
+
+
+def lineages_at(steps, height):
+    """
+    Evaluates an LTT step function.
+
+    :param steps: LTT step function as returned by `ltt`.
+    """
+    i = bisect.bisect_right(steps, (height, float('inf')))
+    return steps[i - 1][1] if i else 0
+
+
+def _ltt_counts(trees, taxon_index, grid):
+    res = []
+    for tree in trees:
+        steps = ltt(CompactTree.from_newick(Tree(tree).newick_string, taxon_index, extend=False))
+        res.append([lineages_at(steps, height) for height in grid])
+    return res
+
+
+def _root_heights(trees, taxon_index):
+    return [
+        node_heights(
+            CompactTree.from_newick(Tree(tree).newick_string, taxon_index, extend=False))[0]
+        for tree in trees]
+
+
+def ltt_curves(trees, grid=None, npoints=100, mass=0.95, workers=1, chunksize=100):
+    """
+    Computes the mean and HPD interval of the number of lineages of the trees of a trees block,
+    at the heights of a common grid.
+
+    Trees are streamed; only a histogram of lineage counts per grid point is kept in memory. If
+    no grid is given, an extra pass over the trees determines the maximal root height.
+
+    :param trees: A `TreeHandler` (or `TreeStream`) instance.
+    :param grid: Sequence of heights at which to evaluate the LTT curves.
+    :param npoints: Number of evenly spaced points of the default grid, from `0` to the maximal \
+    root height.
+    :param mass: Probability mass of the HPD intervals.
+    :param workers: Number of worker processes.
+    :return: `list` of `(height, mean, lower, upper)` tuples, one per grid point.
+    """
+    taxon_index = get_taxon_index(trees)
+    if grid is None:
+        root_height = 0.0
+        for heights in map_chunks(
+                functools.partial(_root_heights, taxon_index=taxon_index),
+                trees.trees,
+                workers=workers,
+                chunksize=chunksize):
+            root_height = max([root_height] + heights)
+        grid = [root_height * i / (npoints - 1) for i in range(npoints)] if npoints > 1 \
+            else [0.0]
+
+    ntrees, histograms = 0, [collections.Counter() for _ in grid]
+    for chunk in map_chunks(
+            functools.partial(_ltt_counts, taxon_index=taxon_index, grid=grid),
+            trees.trees,
+            workers=workers,
+            chunksize=chunksize):
+        for counts in chunk:
+            ntrees += 1
+            for histogram, count in zip(histograms, counts):
+                histogram[count] += 1
+
+    res = []
+    for height, histogram in zip(grid, histograms):
+        if ntrees:
+            mean = sum(count * n for count, n in histogram.items()) / ntrees
+            lower, upper = hpd(list(histogram.elements()), mass=mass)
+        else:
+            mean = lower = upper = float('nan')
+        res.append((height, mean, lower, upper))
+    return res
@@ -0,0 +1,72 @@
+"""
+Tools to select the maximum clade credibility (MCC) tree from a sample of trees.
+"""
+import math
+
+from nexus.compact_tree import CompactTree
+from nexus.handlers.tree import Tree
+from nexus.util import map_chunks
+from nexus.tools.splits import count_splits, get_taxon_index, tree_splits
+
+
+def clade_credibility(tree, log_frequencies):
+    """
+    Computes the log clade credibility of a tree, i.e. the sum of the log frequencies of its
+    clades.
+
+    :param tree: A `CompactTree`.
+    :param log_frequencies: `dict` mapping splits to log frequencies.
+    """
+    return sum(log_frequencies.get(split, -math.inf) for split in tree_splits(tree))
+
+
+def _score_trees(trees, taxon_index, log_frequencies):
+    """
+    :return: `tuple` `(n, index, score, tree)` of the number of trees in the chunk and index, \
+    score and tree of the (first) tree with maximal score.
+    """
+    best, best_score, best_tree = None, -math.inf, None
+    for index, tree in enumerate(trees):
+        score = clade_credibility(
+            CompactTree.from_newick(Tree(tree).newick_string, taxon_index, extend=False),
+            log_frequencies)
+        if best is None or score > best_score:
+            best, best_score, best_tree = index, score, tree
+    return len(trees), best, best_score, best_tree
+
+
+def mcc_tree(trees, workers=1, chunksize=100):
+    """
+    Selects the maximum clade credibility tree from the trees of a trees block.
+
+    This requires two passes over the trees: The first pass counts the clade frequencies, the
+    second one scores each tree by the sum of the log frequencies of its clades. In both passes,
+    trees are parsed one at a time (or in chunks, when using worker processes), and only the
+    best tree seen so far is kept.
+
+    :param trees: A `TreeHandler` (or `TreeStream`) instance.
+    :param workers: Number of worker processes.
+    :return: `tuple` `(index, tree, score)` of the 0-based index of the MCC tree in the trees \
+    block, the tree and its log clade credibility. If several trees have the maximal score, \
+    the first one is returned. For an empty trees block, `None` is returned.
+    """
+    # The taxon index is completed while counting, so we can use it for scoring as well.
+    taxon_index = get_taxon_index(trees)
+    table = count_splits(
+        trees, rooted=True, workers=workers, chunksize=chunksize, taxon_index=taxon_index)
+    if not table.ntrees:
+        return None
+    log_frequencies = {
+        split: math.log(count / table.ntrees) for split, count in table.counts.items()}
+
+    best, offset = None, 0
+    for n, index, score, tree in map_chunks(
+            _score_trees,
+            trees.trees,
+            workers=workers,
+            chunksize=chunksize,
+            shared=dict(taxon_index=taxon_index, log_frequencies=log_frequencies)):
+        if best is None or score > best[2]:
+            best = (offset + index, Tree(tree), score)
+        offset += n
+    return best
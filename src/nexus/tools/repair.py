@@ -0,0 +1,159 @@
+"""
+Tools to repair tree files of crashed (MCMC) runs, i.e. with truncated trees and missing `end;`.
+"""
+import re
+import zlib
+import codecs
+import pathlib
+
+from nexus.handlers import BEGIN_PATTERN, END_PATTERN
+
+TREE_START_PATTERN = re.compile(r"""^u?tree\b""", re.IGNORECASE)
+TRANSLATE_PATTERN = re.compile(r"""^translate\b""", re.IGNORECASE)
+# Comments and quoted labels may contain parentheses:
+SKIP_PATTERN = re.compile(r"""\[[^\]]*\]|'(?:[^']|'')*'""")
+
+
+def tree_error(tree):
+    """
+    Checks whether a tree command is complete, i.e. has balanced parentheses, brackets and quotes
+    and is terminated by a semicolon.
+
+    >>> tree_error('tree a = ((a,b),c);') is None
+    True
+    >>> tree_error('tree a = ((a,b),c')
+    'Missing semicolon'
+
+    :return: Description of the problem - or `None` if the tree is complete.
+    """
+    name, sep, newick = tree.partition('=')
+    if not sep:
+        return 'Missing "="'
+    newick = SKIP_PATTERN.sub('', newick).strip()
+    if '[' in newick or ']' in newick or "'" in newick:
+        return 'Unbalanced brackets or quotes'
+    if not newick.endswith(';'):
+        return 'Missing semicolon'
+    depth = 0
+    for char in newick:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth < 0:
+                break
+    if depth:
+        return 'Unbalanced parentheses'
+    return None
+
+
+def iter_repaired_lines(lines, dropped=None):
+    """
+    Repairs the trees blocks of a nexus file, line by line:
+
+    - Invalid trees (see `tree_error`) are dropped.
+    - Incomplete commands - and an incomplete last item of a translate block - are dropped.
+    - Missing `;` of a translate block and missing `end;` of a trees block are added.
+
+    Other lines are passed through unchanged.
+
+    :param lines: Iterable of lines of a nexus file.
+    :param dropped: Optional `list` to which `(line number, problem)` pairs for each dropped \
+    line are appended.
+    :return: Generator of lines, each terminated by a newline.
+    """
+    dropped = [] if dropped is None else dropped
+    in_trees, in_translate, pending = False, False, None
+    for lineno, line in enumerate(lines, start=1):
+        if pending is not None:
+            yield pending
+            pending = None
+        stripped = line.strip()
+        line = line.rstrip('\r\n') + '\n'
+        if not in_trees:
+            begin = BEGIN_PATTERN.findall(stripped)
+            in_trees = bool(begin) and begin[0][0].lower() == 'trees'
+            yield line
+            continue
+        if TREE_START_PATTERN.match(stripped):
+            in_translate = False
+            error = tree_error(stripped)
+            if error:
+                dropped.append((lineno, error))
+                continue
+        elif END_PATTERN.search(stripped):
+            in_trees = False
+        elif TRANSLATE_PATTERN.match(stripped):
+            in_translate = not stripped.endswith(';')
+        elif in_translate:
+            if stripped.endswith(';'):
+                in_translate = False
+            elif stripped and not stripped.endswith(','):
+                # Only valid as last item of the translate block, so we postpone the decision.
+                pending = line
+                continue
+        elif stripped and not stripped.endswith(';') and \
+                not (stripped.startswith('[') and stripped.endswith(']')):
+            dropped.append((lineno, 'Incomplete line'))
+            continue
+        yield line
+
+    if pending is not None:
+        dropped.append((lineno, 'Incomplete line'))
+    if in_translate:
+        yield ';\n'
+    if in_trees:
+        yield 'end;\n'
+
+
+def _iter_blocks(filename, size=65536):
+    """
+    Reads a - possibly gzipped - file in blocks of bytes.
+
+    Unlike `gzip.open`, which discards the data of a truncated gzip stream read in the failing
+    call, we keep everything that can be decompressed.
+    """
+    with pathlib.Path(filename).open('rb') as handle:
+        if pathlib.Path(filename).suffix != '.gz':
+            for block in iter(lambda: handle.read(size), b''):
+                yield block
+            return
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        for block in iter(lambda: handle.read(size), b''):
+            while block:
+                yield decompressor.decompress(block)
+                block = b''
+                if decompressor.eof:  # Concatenated gzip members:
+                    block = decompressor.unused_data
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        yield decompressor.flush()
+
+
+def _iter_lines(filename, encoding):
+    decoder, rest = codecs.getincrementaldecoder(encoding)(errors='replace'), ''
+    for block in _iter_blocks(filename):
+        lines = (rest + decoder.decode(block)).splitlines(True)
+        rest = lines.pop() if lines and not lines[-1].endswith('\n') else ''
+        for line in lines:
+            yield line
+    rest += decoder.decode(b'', final=True)
+    if rest:
+        yield rest
+
+
+def repair_trees(filename, output, encoding='utf-8-sig'):
+    """
+    Repairs the trees blocks of a - possibly gzipped and truncated - nexus file, streaming the
+    input and writing the repaired lines to `output`.
+
+    :param output: Path of the file to write - or a file-like object.
+    :return: `list` of `(line number, problem)` pairs for the dropped lines.
+    """
+    dropped = []
+    lines = iter_repaired_lines(_iter_lines(filename, encoding), dropped)
+    if hasattr(output, 'write'):
+        output.writelines(lines)
+    else:
+        with pathlib.Path(output).open('w', encoding='utf8') as out:
+            out.writelines(lines)
+    return dropped
@@ -0,0 +1,88 @@
+"""
+Tools to subsample sequences of trees, e.g. streamed from a `TreeStream`.
+
+All functions operate on iterables and return generators, so they can be chained as stages of
+a pipeline which only keeps the retained trees in memory.
+"""
+import random
+
+from nexus.exceptions import NexusFormatException
+from nexus.handlers.tree import Tree
+from nexus.tools.convergence import burnin_count
+
+
+def delete_trees(trees, delitems):
+    """
+    Removes trees specified by 1-based index.
+
+    :param delitems: Container of 1-based indices of the trees to remove.
+    """
+    for index, tree in enumerate(trees, 1):
+        if index not in delitems:
+            yield tree
+
+
+def skip_burnin(trees, burnin, ntrees=None):
+    """
+    Discards the burn-in from the start of a sequence of trees.
+
+    :param burnin: Number of trees - or fraction of the trees, if `burnin` is a `float` < 1.
+    :param ntrees: Total number of trees - required if `burnin` is a fraction.
+    """
+    if isinstance(burnin, float) and burnin < 1:
+        if ntrees is None:
+            raise ValueError('Number of trees required to compute burn-in from fraction')
+    burnin = burnin_count(burnin, ntrees)
+    for index, tree in enumerate(trees):
+        if index >= burnin:
+            yield tree
+
+
+def filter_generations(trees, start=None, end=None):
+    """
+    Retains the trees with MCMC generation (see `Tree.generation`) in the range [start, end].
+
+    Burn-in by state can be discarded by passing the first state to keep as `start`.
+
+    :raises NexusFormatException: If the generation of a tree is unknown.
+    """
+    for tree in trees:
+        generation = (tree if isinstance(tree, Tree) else Tree(tree)).generation
+        if generation is None:
+            raise NexusFormatException("No generation number in tree %s" % tree[:50])
+        if (start is None or generation >= start) and (end is None or generation <= end):
+            yield tree
+
+
+def thin(trees, every):
+    """
+    Retains every `every`-th tree, i.e. the trees with 1-based index divisible by `every`.
+    """
+    for index, tree in enumerate(trees, 1):
+        if index % every == 0:
+            yield tree
+
+
+def reservoir_sample(trees, size, rng=None):
+    """
+    Samples `size` trees uniformly at random in one pass, using reservoir sampling - i.e.
+    without knowing the number of trees in advance and only keeping `size` trees in memory.
+
+    :param rng: A `random.Random` instance to use as source of randomness.
+    :return: Generator of the sampled trees, in their original order.
+    :raises ValueError: If there are less than `size` trees.
+    """
+    rng = rng or random
+    reservoir, ntrees = [], 0
+    for index, tree in enumerate(trees):
+        ntrees += 1
+        if index < size:
+            reservoir.append((index, tree))
+        else:
+            j = rng.randint(0, index)
+            if j < size:
+                reservoir[j] = (index, tree)
+    if ntrees < size:
+        raise ValueError("Treefile only has %d trees in it." % ntrees)
+    for _, tree in sorted(reservoir, key=lambda item: item[0]):
+        yield tree
@@ -0,0 +1,66 @@
+"""
+Tools to split the trees of a nexus file into several files - e.g. to process them in parallel.
+"""
+import pathlib
+import contextlib
+
+from nexus.reader import TreeStream
+
+
+def shard_filenames(filename, nshards, outdir=None):
+    """
+    Computes the paths of the shards of a file, e.g. `run_1.trees`, `run_2.trees`, ...
+
+    :param outdir: Directory for the shards - defaults to the directory of `filename`.
+    """
+    filename = pathlib.Path(filename)
+    name = pathlib.Path(filename.stem) if filename.suffix == '.gz' else filename
+    outdir = pathlib.Path(outdir) if outdir else filename.parent
+    width = len(str(nshards))
+    return [
+        outdir / ('%s_%0*d%s' % (name.stem, width, i, name.suffix or '.trees'))
+        for i in range(1, nshards + 1)]
+
+
+def shard_trees(filename, nshards, outdir=None, contiguous=False):
+    """
+    Splits the trees of a nexus file into `nshards` nexus files, each with the translate block
+    of the input.
+
+    Trees are streamed from the input and written to the shards one at a time.
+
+    :param nshards: Number of shards.
+    :param outdir: Directory for the shards, see `shard_filenames` - created if it does not \
+    exist.
+    :param contiguous: If `True`, each shard gets a contiguous range of trees - which requires \
+    an extra pass to count the trees. Otherwise trees are distributed round-robin.
+    :return: `list` of the paths of the shards.
+    """
+    if nshards < 1:
+        raise ValueError('Number of shards must be positive')
+    stream = TreeStream(filename)
+    res = shard_filenames(filename, nshards, outdir=outdir)
+    if contiguous:
+        ntrees = stream.ntrees
+        bounds = [ntrees * (i + 1) // nshards for i in range(nshards)]
+    res[0].parent.mkdir(parents=True, exist_ok=True)
+
+    with contextlib.ExitStack() as stack:
+        handles = [stack.enter_context(p.open('w', encoding='utf8')) for p in res]
+        for handle in handles:
+            handle.write('#NEXUS\nbegin trees;\n')
+            for line in stream.iter_header_lines():
+                handle.write(line + '\n')
+
+        shard = 0
+        for index, tree in enumerate(stream):
+            if contiguous:
+                while index >= bounds[shard]:
+                    shard += 1
+            else:
+                shard = index % nshards
+            handles[shard].write('\t%s\n' % tree)
+
+        for handle in handles:
+            handle.write('end;\n')
+    return res
@@ -0,0 +1,224 @@
+"""
+Tools to count splits (i.e. clades) in samples of trees.
+
+Splits are encoded as integer bitsets over taxon indices, i.e. bit `i` of a split is set if the
+taxon with index `i` is in the clade.
+"""
+import math
+import functools
+
+from nexus.compact_tree import CompactTree
+from nexus.handlers.tree import Tree
+from nexus.util import map_chunks
+
+
+def clades(tree):
+    """
+    Computes the clades of all nodes of a `CompactTree`.
+
+    :return: `list` of splits, indexed by node.
+    """
+    splits = [0] * len(tree)
+    parents, tips = tree.parents, tree.tips
+    for node in range(len(tree) - 1, 0, -1):
+        if tips[node] >= 0:
+            splits[node] |= 1 << tips[node]
+        splits[parents[node]] |= splits[node]
+    if tips[0] >= 0:  # A tree consisting of a single tip.
+        splits[0] = 1 << tips[0]
+    return splits
+
+
+def tree_splits(tree, rooted=True):
+    """
+    Computes the splits induced by the branches of a tree.
+
+    :param tree: A `CompactTree`.
+    :param rooted: If `False`, splits are treated as unrooted bipartitions, i.e. normalised to \
+    the side not containing the taxon with the lowest index.
+    :return: `dict` mapping splits to branch lengths (`nan` if missing). The root and branches \
+    without labeled tips are excluded.
+    """
+    splits, lengths = clades(tree), tree.lengths
+    res = {splits[node]: lengths[node] for node in range(1, len(splits)) if splits[node]}
+    if rooted:
+        return res
+
+    unrooted, root = {}, splits[0]
+    lowest = root & -root
+    for split, length in res.items():
+        if split & lowest:
+            split = root ^ split
+        if not split:
+            continue
+        if split in unrooted:
+            # The two branches below a bifurcating root form a single unrooted branch.
+            length = unrooted[split] + length
+        unrooted[split] = length
+    return unrooted
+
+
+def iter_taxa(split):
+    """
+    Yields the taxon indices in a split.
+
+    >>> list(iter_taxa(0b1010))
+    [1, 3]
+    """
+    index = 0
+    while split:
+        if split & 1:
+            yield index
+        split >>= 1
+        index += 1
+
+
+class SplitTable(object):
+    """
+    Frequencies and summed branch lengths of the splits in a sample of trees.
+
+    :ivar ntrees: Number of trees added to the table.
+    :ivar counts: `dict` mapping splits to the number of trees containing them.
+    :ivar lengths: `dict` mapping splits to the sum of their branch lengths.
+    :ivar taxa: `list` of taxon names, indexed by taxon index.
+    """
+    def __init__(self, taxa=None, rooted=True):
+        self.ntrees = 0
+        # Note: We use plain dicts of numbers, which - unlike containers of lists - need not be
+        # tracked by the garbage collector.
+        self.counts = {}
+        self.lengths = {}
+        self.taxa = taxa or []
+        self.rooted = rooted
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __contains__(self, split):
+        return split in self.counts
+
+    def add_tree(self, tree):
+        """
+        Adds the splits of a `CompactTree` to the table.
+
+        Note: Missing branch lengths are `nan`, thus the summed length of a split is `nan` if
+        any tree lacks the length of its branch.
+        """
+        counts, lengths = self.counts, self.lengths
+        for split, length in tree_splits(tree, rooted=self.rooted).items():
+            counts[split] = counts.get(split, 0) + 1
+            lengths[split] = lengths.get(split, 0.0) + length
+        self.ntrees += 1
+
+    def update(self, other):
+        """
+        Merges the counts of another `SplitTable` into this one.
+        """
+        self.ntrees += other.ntrees
+        for split, count in other.counts.items():
+            self.counts[split] = self.counts.get(split, 0) + count
+            self.lengths[split] = self.lengths.get(split, 0.0) + other.lengths[split]
+
+    def count(self, split):
+        return self.counts.get(split, 0)
+
+    def frequency(self, split):
+        return self.counts.get(split, 0) / self.ntrees if self.ntrees else 0.0
+
+    def mean_length(self, split):
+        if split in self.counts:
+            return self.lengths[split] / self.counts[split]
+        return math.nan
+
+    def split_taxa(self, split):
+        """
+        :return: `list` of the names of the taxa in `split`.
+        """
+        return [self.taxa[i] for i in iter_taxa(split)]
+
+    def iter_frequencies(self, min_frequency=0.0):
+        """
+        Yields `(split, frequency)` pairs, ordered by descending frequency.
+
+        :param min_frequency: Minimal frequency of splits to yield (inclusive).
+        """
+        for split, count in sorted(self.counts.items(), key=lambda item: item[1], reverse=True):
+            frequency = count / self.ntrees
+            if frequency < min_frequency:
+                break
+            yield split, frequency
+
+    def clade_probabilities(self, min_frequency=0.0, tips=False):
+        """
+        :param tips: Flag signaling whether to include the trivial clades of single taxa.
+        :return: `list` of `(taxa, frequency)` pairs, where `taxa` is a `tuple` of taxon names.
+        """
+        return [
+            (tuple(self.split_taxa(split)), frequency)
+            for split, frequency in self.iter_frequencies(min_frequency=min_frequency)
+            if tips or (split & (split - 1))]
+
+
+def get_taxon_index(trees):
+    """
+    Computes a complete taxon index for a `TreeHandler`, i.e. including tip labels of the first
+    tree which are missing from the translate block.
+
+    Note: For trees without translate block, the taxa guessed by `TreeBlockParser` are only
+    used if there are no trees, because they may include internal node labels - otherwise the
+    tip labels of the first tree are indexed in order of appearance.
+    """
+    taxon_index = trees.taxon_index
+    for tree in trees.trees:
+        if not trees.was_translated:
+            taxon_index = {}
+        CompactTree.from_newick(Tree(tree).newick_string, taxon_index)
+        break
+    return taxon_index
+
+
+def get_taxon_names(trees, taxon_index):
+    """
+    :return: `list` of taxon names of a `TreeHandler`, indexed by taxon index.
+    """
+    translate = trees.translators if (trees.was_translated and not trees._been_detranslated) \
+        else {}
+    res = [None] * len(taxon_index)
+    for label, index in taxon_index.items():
+        res[index] = translate.get(label, label)
+    return res
+
+
+def _count_splits(trees, taxon_index, rooted, extend=False):
+    res = SplitTable(rooted=rooted)
+    for tree in trees:
+        res.add_tree(CompactTree.from_newick(
+            Tree(tree).newick_string, taxon_index, extend=extend))
+    return res
+
+
+def count_splits(trees, rooted=True, workers=1, chunksize=100, taxon_index=None):
+    """
+    Counts the splits in the trees of a trees block.
+
+    Trees are parsed one at a time (or in chunks, when using worker processes), so only the
+    split table is kept in memory.
+
+    :param trees: A `TreeHandler` instance.
+    :param rooted: Flag signaling whether to count clades of rooted trees or unrooted splits.
+    :param workers: Number of worker processes.
+    :param taxon_index: Mapping of tip labels to taxon indices - defaults to the index computed \
+    by `get_taxon_index`. When counting serially, unknown tip labels are added to the index.
+    :return: A `SplitTable` instance.
+    """
+    taxon_index = get_taxon_index(trees) if taxon_index is None else taxon_index
+    res = SplitTable(rooted=rooted)
+    for table in map_chunks(
+            functools.partial(
+                _count_splits, taxon_index=taxon_index, rooted=rooted, extend=workers <= 1),
+            trees.trees,
+            workers=workers,
+            chunksize=chunksize):
+        res.update(table)
+    res.taxa = get_taxon_names(trees, taxon_index)
+    return res
@@ -0,0 +1,97 @@
+"""
+Tools to identify and count the distinct topologies in a sample of trees.
+"""
+import functools
+
+from nexus.compact_tree import CompactTree, quote
+from nexus.handlers.tree import Tree
+from nexus.util import map_chunks
+from nexus.tools.splits import get_taxon_index, get_taxon_names
+from nexus.tools.distances import nontrivial_splits
+
+
+def canonical_newick(tree, taxa=None):
+    """
+    Serializes the topology of a tree in canonical form, i.e. without branch lengths, comments
+    and labels of internal nodes, and with the children of each node sorted.
+
+    :param tree: A `CompactTree`.
+    :param taxa: Optional list of tip labels, indexed by taxon index, e.g. to resolve taxon IDs \
+    of translated trees.
+    """
+    taxa = taxa or tree.taxa
+    subtrees = [None] * len(tree)
+    for node in reversed(range(len(tree))):
+        children = tree.children(node)
+        if children:
+            subtrees[node] = '(%s)' % ','.join(sorted(subtrees[child] for child in children))
+            for child in children:
+                subtrees[child] = None
+        else:
+            tip = tree.tips[node]
+            subtrees[node] = quote(taxa[tip]) if tip >= 0 else ''
+    return subtrees[0] + ';'
+
+
+def topology_key(tree, rooted=True):
+    """
+    Computes a hashable key identifying the topology of a tree, i.e. the `frozenset` of its
+    non-trivial splits.
+
+    Since splits are `int`s, keys - and their hashes - are consistent across processes.
+    """
+    return nontrivial_splits(tree, rooted=rooted)
+
+
+def _topology_keys(trees, taxon_index, taxa, rooted):
+    keys, newicks = [], {}
+    for tree in trees:
+        tree = CompactTree.from_newick(Tree(tree).newick_string, taxon_index, extend=False)
+        key = topology_key(tree, rooted=rooted)
+        if key not in newicks:
+            newicks[key] = canonical_newick(tree, taxa=taxa)
+        keys.append(key)
+    return keys, newicks
+
+
+def topology_counts(trees, rooted=True, credible=0.95, workers=1, chunksize=100):
+    """
+    Counts the distinct topologies in the trees of a trees block.
+
+    Trees are streamed, i.e. only one key per distinct topology is kept in memory.
+
+    :param trees: A `TreeHandler` (or `TreeStream`) instance.
+    :param rooted: Flag signaling whether to distinguish rooted topologies or unrooted ones.
+    :param credible: Probability mass of the credible set of topologies.
+    :param workers: Number of worker processes.
+    :raises NexusFormatException: If a tree contains a taxon which is neither in the translate \
+    block nor in the first tree.
+    :return: `list` of `(newick, count, frequency, credible)` tuples, ordered by descending \
+    count, where `newick` is the canonical newick of the first tree with the topology (with \
+    taxon names resolved through the translate block) and `credible` signals membership in \
+    the smallest set of most frequent topologies with cumulative frequency >= `credible`.
+    """
+    taxon_index = get_taxon_index(trees)
+    taxa = get_taxon_names(trees, taxon_index)
+    counts, newicks, ntrees = {}, {}, 0
+    for keys, new in map_chunks(
+            functools.partial(
+                _topology_keys,
+                taxon_index=taxon_index,
+                taxa=taxa,
+                rooted=rooted),
+            trees.trees,
+            workers=workers,
+            chunksize=chunksize):
+        for key in keys:
+            counts[key] = counts.get(key, 0) + 1
+        for key, newick in new.items():
+            newicks.setdefault(key, newick)
+        ntrees += len(keys)
+
+    res, cumulated = [], 0.0
+    for key, count in sorted(counts.items(), key=lambda item: item[1], reverse=True):
+        frequency = count / ntrees
+        res.append((newicks[key], count, frequency, cumulated < credible))
+        cumulated += frequency
+    return res
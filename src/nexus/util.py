@@ -1,4 +1,7 @@
+import gzip
 import pathlib
+import collections
+import multiprocessing
 
 
 class FileWriterMixin(object):
@@ -11,3 +14,125 @@ class FileWriterMixin(object):
         res = pathlib.Path(filename_)
         res.write_text(self.write(**kw), encoding=encoding)
         return res
+
+
+def open_binary(filename):
+    """
+    Opens a - possibly gzipped - file for reading bytes.
+    """
+    filename = pathlib.Path(filename)
+    if filename.suffix == '.gz':
+        return gzip.open(str(filename), 'rb')
+    return filename.open('rb')
+
+
+class SourceSpan(object):
+    """
+    A range of a nexus source, i.e. a slice of a string or a byte range of a file.
+
+    Byte ranges of gzipped files refer to the uncompressed content.
+    """
+    def __init__(self, source, start, end, encoding='utf-8-sig'):
+        self.source = source
+        self.start = start
+        self.end = end
+        self.encoding = encoding
+        self._stat = None
+        if not isinstance(source, str):
+            self.source = pathlib.Path(source)
+            self._stat = self._get_stat()
+
+    def _get_stat(self):
+        try:
+            stat = self.source.stat()
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime
+
+    def is_file(self, filename):
+        """
+        Checks whether the span is a byte range of the file `filename`.
+        """
+        try:
+            return not isinstance(self.source, str) and self.source.samefile(filename)
+        except OSError:
+            return False
+
+    def detached(self):
+        """
+        :return: A `SourceSpan` over the content of the span, read into memory - or the span \
+        itself, if the source has been changed or removed since reading.
+        """
+        text = self.read()
+        return self if text is None else SourceSpan(text, 0, len(text))
+
+    def read(self):
+        """
+        Reads the content of the span.
+
+        :return: `str` or `None`, if the source file has been changed or removed since reading.
+        """
+        if isinstance(self.source, str):
+            return self.source[self.start:self.end]
+        if self._stat is None or self._get_stat() != self._stat:
+            return None
+        with open_binary(self.source) as handle:
+            handle.seek(self.start)
+            return handle.read(self.end - self.start).decode(self.encoding)
+
+
+def iter_chunks(items, size):
+    """
+    Splits an iterable into lists of (at most) `size` items.
+    """
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Keyword arguments shared by all chunks processed in a worker process, see `map_chunks`:
+_SHARED = {}
+
+
+def _init_worker(shared):
+    _SHARED.clear()
+    _SHARED.update(shared)
+
+
+def _apply_shared(func, chunk):
+    return func(chunk, **_SHARED)
+
+
+def map_chunks(func, items, workers=1, chunksize=100, shared=None):
+    """
+    Applies `func` to chunks of `items`, yielding the results in order.
+
+    :param func: A callable accepting a list of items. To run in worker processes, `func` must \
+    be picklable, i.e. a module-level function or a `functools.partial` of one.
+    :param workers: Number of worker processes. With `workers <= 1` chunks are processed serially.
+    :param chunksize: Number of items passed to each call of `func`.
+    :param shared: `dict` of keyword arguments passed to each call of `func`. Unlike arguments \
+    bound with `functools.partial`, these are sent to each worker process only once - rather \
+    than with each chunk - so this is the place for big lookup tables.
+    """
+    shared = shared or {}
+    chunks = iter_chunks(items, chunksize)
+    if workers <= 1:
+        for chunk in chunks:
+            yield func(chunk, **shared)
+        return
+
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(shared,)) as pool:
+        # We only keep a limited number of chunks in flight, to not exhaust `items` up front.
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(_apply_shared, (func, chunk)))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
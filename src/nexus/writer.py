@@ -4,6 +4,8 @@ Tools for writing a nexus file
 import collections
 
 from nexus.util import FileWriterMixin
+from nexus.handlers.tree import TreeHandler
+from nexus.compact_tree import quote
 
 TEMPLATE = """
 #NEXUS
@@ -104,8 +106,20 @@ class NexusWriter(FileWriterMixin):
                     s.append(value)
                 yield "%s %s" % (t.ljust(max_taxon_size), ''.join(s))
 
-    def make_treeblock(self):
-        return "\n".join(["    %s" % t.lstrip().strip() for t in self.trees])
+    def make_treeblock(self, translate=False):
+        trees = [t.lstrip().strip() for t in self.trees]
+        lines = []
+        if translate:
+            table = {}
+            trees = [TreeHandler._translate_tree(t, table) for t in trees]
+            lines.append("    TRANSLATE")
+            lines.extend(
+                "    %s %s%s" % (i, quote(name), ',' if n < len(table) else '')
+                for n, (name, i) in enumerate(
+                    sorted(table.items(), key=lambda item: int(item[1])), start=1))
+            lines.append("    ;")
+        lines.extend("    %s" % t for t in trees)
+        return "\n".join(lines)
 
     def _make_comments(self):
         """Generates a comments block"""
@@ -138,17 +152,18 @@ class NexusWriter(FileWriterMixin):
         """Removes a given `character` from the nexus file"""
         del(self.data[character])
 
-    def write(self, interleave=False, charblock=False, **kw):
+    def write(self, interleave=False, charblock=False, translate=False, **kw):
         """
         Generates a string representation of the nexus
         (basically a wrapper around make_nexus)
 
         :param interleave: Generate interleaved matrix or not
         :param charblock: Include a characters block or not
+        :param translate: Replace taxon names in trees with IDs from a translate block or not
 
         :return: String
         """
-        return self.make_nexus(interleave, charblock)
+        return self.make_nexus(interleave, charblock, translate)
 
     def _is_valid(self):
         """Checks the nexus is valid to write (i.e. not empty)"""
@@ -158,7 +173,7 @@ class NexusWriter(FileWriterMixin):
             return True
         return False
 
-    def make_nexus(self, interleave=False, charblock=False):
+    def make_nexus(self, interleave=False, charblock=False, translate=False):
         """
         Generates a string representation of the nexus
 
@@ -166,6 +181,8 @@ class NexusWriter(FileWriterMixin):
         :type interleave: Boolean
         :param charblock: Include a characters block or not
         :type charblock: Boolean
+        :param translate: Replace taxon names in trees with IDs from a translate block or not
+        :type translate: Boolean
 
         :return: String
         """
@@ -188,7 +205,8 @@ class NexusWriter(FileWriterMixin):
         else:
             datablock = ""
 
-        treeblock = TREE_TEMPLATE % {'trees': self.make_treeblock()} if self.ntrees else ""
+        treeblock = TREE_TEMPLATE % {
+            'trees': self.make_treeblock(translate=translate)} if self.ntrees else ""
         return TEMPLATE % {'datablock': datablock, 'treeblock': treeblock}
 
     def write_as_table(self):
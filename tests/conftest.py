@@ -50,3 +50,18 @@ def trees_translated(make_reader):
 @pytest.fixture
 def trees_beast(make_reader):
     return make_reader('example-beast.trees')
+
+
+@pytest.fixture
+def trees_ultrametric():
+    return NexusReader.from_string("""#NEXUS
+begin trees;
+    translate
+        1 A,
+        2 B,
+        3 C;
+    tree a = ((1:1,2:1):1,3:2);
+    tree b = ((1:2,2:2):2,3:4);
+    tree c = ((1:1,3:1):3,2:4);
+    tree d = ((1:1,2:1):5,3:6);
+end;""").trees
@@ -1,9 +1,11 @@
+import io
 import re
 import pathlib
 
 import pytest
 
 from nexus.__main__ import main
+from nexus import NexusReader
 
 
 def _make_nexus(tmpdir, block):
@@ -115,10 +117,26 @@ End;""")
                 ['tree1', 'tree2', 'tree3'],
                 ['-n', '2'],
                 lambda o: len(re.findall('tree[0-9]', o)) == 2),
+        (
+                ['tree1', 'tree2', 'tree3'],
+                ['--burnin', '2'],
+                lambda o: ('tree1' not in o) and ('tree2' not in o) and ('tree3' in o)),
+        (
+                ['tree1', 'tree2', 'tree3', 'tree4'],
+                ['--burnin', '0.5', '-r', '2', '-d', '1'],
+                lambda o: ('tree3' not in o) and ('tree4' in o)),
+        (
+                ['STATE_1', 'STATE_2', 'STATE_3'],
+                ['--burnin-state', '2', '--states', '0-2'],
+                lambda o: ('STATE_1' not in o) and ('STATE_2' in o) and ('STATE_3' not in o)),
         (
                 ['tree1', 'tree2', 'tree3'],
                 ['-c', '-t'],
                 lambda o: '[comment]' not in o),
+        (
+                ['tree1', 'tree2', 'tree3'],
+                ['-c', '-t', '-j', '2'],
+                lambda o: ('[comment]' not in o) and o.index('tree1') < o.index('tree3')),
     ]
 )
 def test_trees(trees, options, check, capsys, tmpdir):
@@ -129,6 +147,185 @@ def test_trees(trees, options, check, capsys, tmpdir):
     assert check(out)
 
 
+@pytest.mark.parametrize(
+    'options,check',
+    [
+        (['--consensus'], lambda o: 'tree consensus = ' in o and '(Timothy,Henry)1' in o),
+        (['--consensus', 'greedy', '-j', '2'], lambda o: '(Andrew,Michael)0.3333' in o),
+        (['--consensus', '--threshold', '1.0', '--unrooted'], lambda o: '(Timothy,Henry)1' in o),
+        (['--mcc'], lambda o: 'tree.10000.874.808756' in o and 'tree.0.1065' not in o),
+    ]
+)
+def test_trees_consensus(options, check, capsys, examples):
+    main(['trees', str(examples / 'example-translated.trees')] + options)
+    out, _ = capsys.readouterr()
+    assert check(re.sub(r':[0-9.e-]+', '', out))
+
+
+def test_trees_prune(capsys, examples):
+    main(['trees', '--prune', 'Tom,David', '-j', '2', str(examples / 'example-translated.trees')])
+    out, _ = capsys.readouterr()
+    assert 'Tom' not in out and 'David' not in out and '11 Henry' in out
+    assert '(0:' not in out and ',0:' not in out
+
+
+def test_trees_translate(capsys, examples):
+    main(['trees', '--translate', str(examples / 'example.trees')])
+    out, _ = capsys.readouterr()
+    assert '4 Henry' in out and 'Henry:' not in out
+
+    main(['trees', '--translate', '--consensus', 'majority', str(examples / 'example.trees')])
+    out, _ = capsys.readouterr()
+    assert 'TRANSLATE' in out and 'Henry:' not in out
+
+
+def test_trees_summary(capsys, examples):
+    main(['trees', '--summary', '--threshold', '0.9', str(examples / 'example.trees')])
+    out, _ = capsys.readouterr()
+    lines = out.strip().split('\n')
+    assert lines[0].startswith('clade\tfrequency')
+    assert lines[1].startswith('root_height\t1.0000\t5.46473')
+    assert len(lines) == 6 and 'Henry,Timothy\t1.0000' in out
+
+
+def test_trees_annotate(capsys, tmp_path, examples):
+    target = tmp_path / 'target.nwk'
+    target.write_text(NexusReader.from_file(examples / 'example.trees').trees[0].newick_string)
+    main(['trees', '--annotate', str(target), '--heights', 'median',
+          str(examples / 'example-translated.trees')])
+    out, _ = capsys.readouterr()
+    assert 'tree annotated = [&R] (((((((Chris[&posterior=1,height=' in out
+
+    main(['trees', '--annotate', str(examples / 'example.trees'), '--burnin', '1',
+          str(examples / 'example-translated.trees')])
+    out, _ = capsys.readouterr()
+    assert out.count('[&posterior=') == 25
+
+    with pytest.raises(SystemExit):
+        main(['trees', '--annotate', str(examples / 'example.nex'),
+              str(examples / 'example.trees')])
+
+
+def test_trees_restrict(capsys, examples):
+    main(['trees', '--restrict', 'Tom,David', str(examples / 'example-translated.trees')])
+    out, _ = capsys.readouterr()
+    assert 'Henry' not in out and '0 Tom,' in out and '12 David' in out
+
+
+@pytest.mark.parametrize('options,error', [
+    (['--restrict', 'NOPE'], 'Taxa NOPE not found'),
+    (['--prune', 'Tom,NOPE'], 'Taxa NOPE not found'),
+])
+def test_trees_prune_errors(capsys, examples, options, error):
+    with pytest.raises(SystemExit):
+        main(['trees'] + options + [str(examples / 'example-translated.trees')])
+    out, _ = capsys.readouterr()
+    assert error in out
+
+
+def test_trees_restrict_no_taxa_left(capsys, tmp_path):
+    src = tmp_path / 'test.trees'
+    src.write_text("#NEXUS\nbegin trees;\ntree a = (A,B);\ntree b = (A,C);\nend;", encoding='utf8')
+    with pytest.raises(SystemExit):
+        main(['trees', '--restrict', 'B', str(src)])
+    out, _ = capsys.readouterr()
+    assert 'No taxa left in tree b' in out
+
+
+def test_trees_ltt(capsys, examples):
+    main(['trees', '--ltt', '3', str(examples / 'example.trees')])
+    out, _ = capsys.readouterr()
+    assert out.split('\n')[:2] == ['height\tmean\thpd95_lower\thpd95_upper', '0\t1.0000\t1\t1']
+
+
+def test_trees_split(capsys, tmp_path, examples):
+    main(['trees', '--split', '2', '--contiguous', '--outdir', str(tmp_path / 'shards'),
+          str(examples / 'example.trees')])
+    out, _ = capsys.readouterr()
+    assert 'example_2.trees' in out
+    assert NexusReader.from_file(tmp_path / 'shards' / 'example_2.trees').trees.ntrees == 2
+
+    with pytest.raises(SystemExit):
+        main(['trees', '--split', '2', '-'])
+
+
+@pytest.mark.parametrize('options', [
+    ['--burnin', '2', '--prune', 'Tom'],
+    ['--output', 'shards.trees'],
+])
+def test_trees_split_conflicts(capsys, tmp_path, examples, options):
+    with pytest.raises(SystemExit):
+        main(['trees', '--split', '2', '--outdir', str(tmp_path)]
+             + options
+             + [str(examples / 'example.trees')])
+    out, _ = capsys.readouterr()
+    assert '--split cannot be combined with ' + options[0] in out
+    assert not list(tmp_path.iterdir())
+
+
+def test_trees_append(capsys, tmp_path, examples):
+    target = tmp_path / 'target.trees'
+    target.write_text(
+        (examples / 'example-translated.trees').read_text(encoding='utf8'), encoding='utf8')
+    main(['trees', '--append', str(target), '--burnin', '2', str(examples / 'example.trees')])
+    out, _ = capsys.readouterr()
+    assert '1 trees appended' in out
+    trees = NexusReader.from_file(target).trees
+    assert trees.ntrees == 4 and trees[3].name == 'tree.20000.883.396049'
+
+    main(['trees', '--append', str(target), '--consensus', 'majority',
+          str(examples / 'example.trees')])
+    assert NexusReader.from_file(target).trees[4].name == 'consensus'
+
+
+def test_trees_burnin_state_mrbayes(capsys, regression):
+    main(['trees', '--burnin-state', '2500000', str(regression / 'mrbayes.trees')])
+    out, _ = capsys.readouterr()
+    assert 'tree.2500000.34524.300436' in out
+    main(['trees', '--burnin-state', '2500001', str(regression / 'mrbayes.trees')])
+    out, _ = capsys.readouterr()
+    assert 'tree.2500000' not in out
+
+
+def test_trees_stdin(capsys, monkeypatch):
+    monkeypatch.setattr('sys.stdin', io.StringIO(
+        '#NEXUS\nbegin trees;\ntree t1 = (a,b);\ntree t2 = (a,b);\ntree t3 = (a,b);\nend;'))
+    main(['trees', '-', '--burnin', '0.4', '-r', '2'])
+    out, _ = capsys.readouterr()
+    assert ('t1' not in out) and ('t2' not in out) and ('t3' in out)
+
+    monkeypatch.setattr('sys.stdin', io.StringIO(
+        '#NEXUS\nbegin trees;\ntree STATE_0 = (a,b);\ntree STATE_10 = (a,b);\nend;'))
+    main(['trees', '-', '--burnin-state', '10'])
+    out, _ = capsys.readouterr()
+    assert ('STATE_0 ' not in out) and ('STATE_10' in out)
+
+    monkeypatch.setattr('sys.stdin', io.StringIO(
+        '#NEXUS\nbegin trees;\ntree t1 = (a,b);\ntree t2 = (a,b);\ntree t3 = (a,b);\nend;'))
+    main(['trees', '-', '-d', '1', '-n', '1'])
+    out, _ = capsys.readouterr()
+    assert ('t1' not in out) and out.count('tree ') == 1
+
+
+def test_trees_stream_translated(capsys, examples):
+    main(['trees', '--burnin', '1', str(examples / 'example-translated.trees')])
+    out, _ = capsys.readouterr()
+    assert '11 Henry' in out and 'tree.0.1065' not in out and 'tree.20000' in out
+
+
+def test_trees_asdsf(capsys, examples):
+    main([
+        'trees', '--asdsf', '--burnin', '1', '--window', '1',
+        str(examples / 'example.trees'), str(examples / 'example-translated.trees')])
+    out, _ = capsys.readouterr()
+    assert out.split() == ['ntrees', 'asdsf', '1', '0.000000', '2', '0.000000']
+
+    with pytest.raises(SystemExit):
+        main(['trees', '--asdsf', str(examples / 'example.trees')])
+    with pytest.raises(SystemExit):
+        main(['trees', str(examples / 'example.trees'), str(examples / 'example.trees')])
+
+
 def test_combine(capsys, tmpdir, examples):
     o = tmpdir.join('out.nex')
     main(['combine', '-o', str(o), str(examples / 'example.nex')])
@@ -136,6 +333,41 @@ def test_combine(capsys, tmpdir, examples):
     assert 'out.nex' in out
 
 
+def test_combine_trees(capsys, tmpdir, examples):
+    main(['combine', '--trees', '--burnin', '1',
+          str(examples / 'example.trees'), str(examples / 'example-translated.trees')])
+    out, _ = capsys.readouterr()
+    assert out.count('tree ') == 4 and 'translate' in out
+
+    o = tmpdir.join('out.trees')
+    main(['combine', '--trees', '-r', '2', '-o', str(o), str(examples / 'example.trees')])
+    out, _ = capsys.readouterr()
+    assert '1 trees written' in out
+
+    with pytest.raises(SystemExit):
+        main(['combine', '--trees', '-'])
+
+
+def test_repair(capsys, monkeypatch, tmp_path, examples):
+    mocker_log = []
+
+    class Log:
+        def warning(self, msg):
+            mocker_log.append(msg)
+
+    target = tmp_path / 'repaired.trees'
+    main(['repair', '-o', str(target), str(examples / 'example-translated.trees')], log=Log())
+    assert NexusReader.from_file(target).trees.ntrees == 3
+    assert not mocker_log
+
+    monkeypatch.setattr('sys.stdin', io.StringIO(
+        '#NEXUS\nbegin trees;\ntree t1 = (a,b);\ntree t2 = (a,'))
+    main(['repair', '-'], log=Log())
+    out, _ = capsys.readouterr()
+    assert out.endswith('tree t1 = (a,b);\nend;\n')
+    assert mocker_log == ['Dropped line 4: Missing semicolon']
+
+
 def test_randomise(capsys, examples):
     main(['randomise', '-n', '10', str(examples / 'example.nex')])
     out, _ = capsys.readouterr()
@@ -4,7 +4,7 @@ import argparse
 import pytest
 from clldutils.clilib import ParserError
 
-from nexus.cli_util import list_of_ranges, get_reader
+from nexus.cli_util import list_of_ranges, get_reader, burnin, generation_range
 
 
 def test_get_reader(monkeypatch):
@@ -38,3 +38,18 @@ def test_list_of_ranges(in_, out_):
 def test_error(in_):
     with pytest.raises(argparse.ArgumentTypeError):
         list_of_ranges(in_)
+
+
+def test_burnin():
+    assert burnin('10') == 10
+    assert burnin('0.25') == 0.25
+    for in_ in ['x', '-1']:
+        with pytest.raises(argparse.ArgumentTypeError):
+            burnin(in_)
+
+
+def test_generation_range():
+    assert generation_range('1000-2000') == (1000, 2000)
+    assert generation_range('1000:') == (1000, None)
+    with pytest.raises(argparse.ArgumentTypeError):
+        generation_range('1000')
@@ -0,0 +1,121 @@
+"""Tests for CompactTree"""
+import math
+
+import pytest
+import newick
+
+from nexus.compact_tree import CompactTree
+from nexus.exceptions import NexusFormatException
+from nexus.handlers.tree import Tree
+
+
+def test_from_newick():
+    tree = CompactTree.from_newick("[&R] ((A:0.1,'B c'[&x=1]:0.2)90:0.3,C:1e-3)[&y][&z];")
+    assert len(tree) == 5
+    assert tree.ntips == 3
+    assert list(tree.parents) == [-1, 0, 1, 1, 0]
+    assert list(tree.children(0)) == [1, 4]
+    assert list(tree.children(1)) == [2, 3]
+    assert tree.is_tip(2) and not tree.is_tip(1)
+    assert list(tree.iter_tips()) == [2, 3, 4]
+    assert tree.taxon_index == {'A': 0, 'B c': 1, 'C': 2}
+    assert tree.taxa == ['A', 'B c', 'C']
+    assert list(tree.tips) == [-1, -1, 0, 1, 2]
+    assert tree.labels[1] == '90'
+    assert math.isnan(tree.lengths[0])
+    assert list(tree.lengths)[1:] == [0.3, 0.1, 0.2, 0.001]
+    assert tree.comments[0] == '&R][&y][&z'
+    assert tree.comments[3] == '&x=1'
+    assert repr(tree) == '<CompactTree: 5 nodes, 3 tips>'
+    assert tree.to_newick() == "((A:0.1,'B c'[&x=1]:0.2)90:0.3,C:0.001)[&R][&y][&z];"
+    assert tree.to_newick(lengths=False, comments=False) == "((A,'B c')90,C);"
+    assert tree.to_newick(taxa=['a', 'b', 'c']).startswith("((a:0.1,b[&x=1]")
+
+
+def test_from_newick_taxon_index():
+    index = {'2': 0, '1': 1}
+    tree = CompactTree.from_newick('(1:1,(2:1,3:2.5):1);', index)
+    assert list(tree.tips) == [-1, 1, -1, 0, 2]
+    assert index == {'2': 0, '1': 1, '3': 2}
+    assert tree.to_newick() == '(1:1,(2:1,3:2.5):1);'
+    with pytest.raises(NexusFormatException):
+        CompactTree.from_newick('(1,4);', index, extend=False)
+    # Unlabeled tips are not indexed:
+    assert list(CompactTree.from_newick('(1,);', index).tips) == [-1, 1, -1]
+
+
+@pytest.mark.parametrize(
+    'newick_string',
+    ['(A,B));', 'A,B;', '((A,B);', '(A:x,B);'])
+def test_from_newick_invalid(newick_string):
+    with pytest.raises(NexusFormatException):
+        CompactTree.from_newick(newick_string)
+
+
+def test_node_conversion(trees_beast):
+    node = trees_beast.trees[0].newick_tree
+    tree = CompactTree.from_node(node)
+    assert len(tree) == len(list(node.walk()))
+    assert [n.name for n in tree.to_node().get_leaves()] == [n.name for n in node.get_leaves()]
+    assert tree.to_node().newick == newick.loads(tree.to_newick())[0].newick
+
+
+def test_tree_compact_tree(trees):
+    tree = trees.trees[0]
+    assert tree.compact_tree is tree.compact_tree
+    assert tree.compact_tree.ntips == 13
+    assert Tree('tree a = [&U] (A,B);').compact_tree.taxa == ['A', 'B']
+
+
+def test_iter_compact_trees(trees_translated):
+    trees = list(trees_translated.trees.iter_compact_trees())
+    assert len(trees) == 3
+    # Tips are indexed by position in the translate block, ordered by ID:
+    assert trees[0].taxon_index is trees[1].taxon_index
+    assert trees[0].taxa == list(trees_translated.trees.translators)
+    trees_translated.trees.detranslate()
+    tree = next(trees_translated.trees.iter_compact_trees())
+    assert tree.taxa == list(trees_translated.trees.translators.values())
+
+    # The index does not depend on the order of the translators dict:
+    translators = trees_translated.trees.translators
+    trees_translated.trees.translators = dict(reversed(list(translators.items())))
+    tree = next(trees_translated.trees.iter_compact_trees())
+    assert tree.taxa == list(translators.values())
+
+
+@pytest.mark.parametrize(
+    'taxa,expected',
+    [
+        ('A', '((B:5,C:4):5,(D:1,E:1):2);'),
+        ('AB', '(C:9,(D:1,E:1):2);'),
+        ('ABC', '(D:1,E:1);'),
+        ('DE', '((A:1,B:2)x[&c]:3,C:4);'),
+        ('ABCD', 'E;'),
+        ('', '(((A:1,B:2)x[&c]:3,C:4):5,(D:1,E:1):2);'),
+    ]
+)
+def test_prune(taxa, expected):
+    tree = CompactTree.from_newick('(((A:1,B:2)x[&c]:3,C:4):5,(D:1,E:1):2);')
+    pruned = tree.prune({tree.taxon_index[t] for t in taxa})
+    assert pruned.to_newick() == expected
+    assert pruned.taxon_index is tree.taxon_index
+
+
+def test_prune_length_tokens():
+    newick = '((A:0.0268282443,B:1.50):0.1,(C:0.2,D:1e-05):0.10);'
+    tree = CompactTree.from_newick(newick, keep_tokens=True)
+    assert tree.to_newick() == newick
+    # Untouched branch lengths are kept as read, summed lengths don't have float noise:
+    assert tree.prune({tree.taxon_index['D']}).to_newick() == \
+        '((A:0.0268282443,B:1.50):0.1,C:0.3);'
+    assert tree.prune({tree.taxon_index['B'], tree.taxon_index['D']}).to_newick() == \
+        '(A:0.1268282443,C:0.3);'
+    assert CompactTree.from_newick(newick).prune({3}).to_newick() == \
+        '((A:0.0268282443,B:1.5):0.1,C:0.3);'
+
+
+def test_prune_all():
+    tree = CompactTree.from_newick('(A,B);')
+    with pytest.raises(ValueError):
+        tree.prune({0, 1})
@@ -1,5 +1,11 @@
 """Tests for GenericHandler"""
+import pathlib
+
+import pytest
+
 from nexus.reader import NexusReader, GenericHandler
+from nexus.handlers import TrackedAttribute
+from nexus.handlers.tree import TreeHandler
 
 
 def test_remove_comments():
@@ -27,3 +33,64 @@ def test_write_produces_end():
         end;
     """)
     assert "end;" in nex.write()
+
+
+def test_tracked_attributes():
+    assert isinstance(GenericHandler.block, TrackedAttribute)
+    handler = GenericHandler(data=['A = 1;'])
+    handler.set_source(None)
+    assert not handler.modified
+    assert handler.block
+    assert handler.modified
+    del handler.__dict__['block']
+    assert handler.block == []
+    handler = TreeHandler()
+    del handler.__dict__['trees']
+    with pytest.raises(AttributeError):
+        _ = handler.trees
+
+
+def test_lazy_block(tmpdir):
+    nexus = pathlib.Path(str(tmpdir.join('f.nex')))
+    nexus.write_text(
+        "#NEXUS\nbegin sets;\n  A = 1;\n  [comment]\n\n  B = [x] 2;\nend;\n", encoding='utf8')
+    nex = NexusReader.from_file(nexus, lazy=True)
+    assert 'block' not in nex.sets.__dict__
+    assert nex.sets.block == ['begin sets;', 'A = 1;', 'B = [x] 2;', 'end;']
+    assert nex.sets.comments == []
+    assert GenericHandler(data=['[x]', 'A']).comments == ['[x]']
+
+    nex = NexusReader.from_file(nexus, lazy=True)
+    nexus.write_text("#NEXUS\n", encoding='utf8')
+    with pytest.raises(IOError):
+        _ = nex.sets.block
+
+
+def test_eager_block(tmpdir):
+    nexus = pathlib.Path(str(tmpdir.join('f.nex')))
+    nexus.write_text("#NEXUS\nbegin sets;\n  A = 1;\nend;\n", encoding='utf8')
+    nex = NexusReader.from_file(nexus)
+    nexus.unlink()
+    assert nex.sets.block == ['begin sets;', 'A = 1;', 'end;']
+
+
+def test_lazy_block_write_to_source(tmpdir):
+    nexus = pathlib.Path(str(tmpdir.join('f.nex')))
+    nexus.write_text("#NEXUS\nbegin sets;\n  A = 1;\nend;\n", encoding='utf8')
+    nex = NexusReader.from_file(nexus, lazy=True)
+    nex.write_to_file(nexus, verbatim=True)
+    nex.write_to_file(nexus, verbatim=True)
+    nex.write_to_file(nexus)
+    assert nex.sets.block == ['begin sets;', 'A = 1;', 'end;']
+    assert NexusReader.from_file(nexus).sets.block == ['begin sets;', 'A = 1;', 'end;']
+    # Writing to another file does not detach the source:
+    nex = NexusReader.from_file(nexus, lazy=True)
+    nex.write_to_file(pathlib.Path(str(tmpdir.join('g.nex'))))
+    assert nex.sets._source.source == nexus
+
+
+def test_lazy_block_utf16(tmpdir):
+    nexus = pathlib.Path(str(tmpdir.join('f.nex')))
+    nexus.write_text("#NEXUS\r\nbegin sets;\r\n  A = 1;\r\nend;\r\n", encoding='utf16')
+    nex = NexusReader.from_file(nexus, encoding='utf16', lazy=True)
+    assert nex.sets.block == ['begin sets;', 'A = 1;', 'end;']
@@ -1,4 +1,6 @@
 """Tests for TreeHandler"""
+import timeit
+
 import pytest
 
 from nexus.reader import NexusReader
@@ -273,6 +275,19 @@ def test_read_BEAST_format(trees_beast):
     assert 'F38' in set(n.name for n in trees_beast.trees[0].newick_tree.walk())
 
 
+def test_generations(trees, trees_beast):
+    assert trees.trees.generations == [0, 10000, 20000]
+    assert trees_beast.trees.generations == [201000]
+    assert trees_beast.trees[0].generation == 201000
+    handler = TreeHandler(data=[
+        'tree rep.100 = (a,b);', 'tree [&c] gen.200 [&R] = (a,b);', 'tree a = (a,b);'])
+    assert handler.generations == [100, 200, None]
+    assert handler[1].name == 'gen.200'
+    handler = TreeHandler(data=["TREE 'rep.100' = (a,b);", "tree 'it''s' = (a,b);"])
+    assert handler.generations == [100, None]
+    assert handler[1].name == "it's"
+
+
 def test_block_findb(trees_beast):
     # did we get a tree block?
     assert 'trees' in trees_beast.blocks
@@ -498,3 +513,170 @@ def test_BEAST_format():
     trans = TreeHandler()._detranslate_tree(oldtree, translatetable)
     assert trans == newtree, \
         "Unable to correctly detranslate a BEAST tree"
+
+
+def test_detranslate_skips_comments():
+    translatetable = {'1': 'Chris', '2': 'Bruce'}
+    oldtree = "tree a = (1[&x={1,2}]:0.1,2:0.2)[&h={(1,2)}];"
+    newtree = "tree a = (Chris[&x={1,2}]:0.1,Bruce:0.2)[&h={(1,2)}];"
+    assert TreeHandler()._detranslate_tree(oldtree, translatetable) == newtree
+
+
+def _caterpillar(ntips):
+    tree, expected = '1:0.1', 'T1:0.1'
+    for i in range(2, ntips + 1):
+        tree = '(%s,%d:0.1):0.1' % (tree, i)
+        expected = '(%s,T%d:0.1):0.1' % (expected, i)
+    return 'tree a = %s;' % tree, 'tree a = %s;' % expected, {
+        str(i): 'T%d' % i for i in range(1, ntips + 1)}
+
+
+def test_detranslate_large_tree():
+    # A caterpillar tree with 5000 tips - detranslation must be linear in tree size.
+    tree, expected, translatetable = _caterpillar(5000)
+    assert TreeHandler._detranslate_tree(tree, translatetable) == expected
+
+    def duration(ntips):
+        tree, _, translatetable = _caterpillar(ntips)
+        return min(
+            timeit.repeat(lambda: TreeHandler._detranslate_tree(tree, translatetable),
+                          number=1, repeat=5))
+
+    # Ten times the tips must not take a hundred times as long - with a generous margin:
+    assert duration(5000) < 30 * duration(500)
+
+
+def test_detranslate_parallel(trees_translated, examples):
+    trees_translated.trees.trees = trees_translated.trees.trees * 100
+    trees_translated.trees.detranslate(workers=2)
+    expected = NexusReader(str(examples / 'example.trees')).trees.trees
+    assert trees_translated.trees.trees == expected * 100
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_prune(trees_translated, workers):
+    trees_translated.trees.prune(['Tom', '12'], workers=workers)
+    assert '0' not in trees_translated.trees.translators
+    assert '12' not in trees_translated.trees.translators
+    assert len(trees_translated.trees.translators) == 11
+    for tree in trees_translated.trees:
+        assert tree.name.startswith('tree.')
+        labels = {tree.compact_tree.taxa[i] for i in tree.compact_tree.tips if i >= 0}
+        assert labels == set(trees_translated.trees.translators)
+    assert 'translate' in trees_translated.write()
+    # Branch lengths are kept as is - or summed without float noise:
+    assert '(8:0.0668822155,2:0.0173144449):0.0268282443' in trees_translated.trees[0]
+
+
+def test_prune_untranslated(trees):
+    trees.trees.prune(['Tom'])
+    assert 'Tom' not in trees.trees.translators.values()
+    assert all('Tom' not in tree for tree in trees.trees)
+    trees.trees.detranslate()
+    trees.trees.prune(['Simon'])
+    assert all('Simon' not in tree for tree in trees.trees)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_restrict_to(trees_translated, workers):
+    trees_translated.trees.restrict_to(['Tom', '12', 'Simon'], workers=workers)
+    assert trees_translated.trees.translators == {'0': 'Tom', '1': 'Simon', '12': 'David'}
+    for tree in trees_translated.trees:
+        assert tree.compact_tree.ntips == 3
+    trees_translated.trees.detranslate()
+    assert 'David' in trees_translated.trees[0] and 'Henry' not in trees_translated.trees[0]
+
+
+def test_restrict_to_untranslated(trees):
+    expected = NexusReader.from_file(trees.filename)
+    expected.trees.prune(set(trees.trees.translators.values()) - {'Tom', 'Simon'})
+    trees.trees.restrict_to(['Tom', 'Simon'])
+    assert trees.trees.trees == expected.trees.trees
+    assert sorted(trees.trees.translators.values()) == ['Simon', 'Tom']
+
+    with pytest.raises(NexusFormatException, match='Taxa Unknown not found'):
+        trees.trees.restrict_to(['Tom', 'Unknown'])
+
+
+def test_restrict_to_no_taxa_left():
+    nex = NexusReader.from_string(
+        "#NEXUS\nbegin trees;\ntree a = ((A,B),C);\ntree b = ((A,B),D);\nend;")
+    with pytest.raises(ValueError, match='No taxa left in tree b'):
+        nex.trees.restrict_to(['C'])
+
+
+@pytest.mark.parametrize('translated', [False, True])
+def test_prune_unknown_taxa(trees, trees_translated, translated):
+    trees = trees_translated if translated else trees
+    with pytest.raises(NexusFormatException, match='Taxa NOPE, Nope not found'):
+        trees.trees.prune(['Tom', 'Nope', 'NOPE'])
+    # Tip labels of untranslated trees are found, even if they are missing from the taxa
+    # guessed from the first tree:
+    nex = NexusReader.from_string(
+        "#NEXUS\nbegin trees;\ntree a = ((A,B),C);\ntree b = ((A,B),(C,D));\nend;")
+    nex.trees.prune(['D'])
+    assert nex.trees[1] == 'tree b = ((A,B),C);'
+
+
+def test_translate(trees, trees_translated):
+    trees.trees.translate()
+    assert trees.trees.was_translated
+    assert trees.trees.translators['4'] == 'Henry'
+    assert 'Henry:' not in trees.trees[0]
+    assert '\t4 Henry,' in trees.write()
+    # Translating again is a no-op:
+    tree = trees.trees[0]
+    trees.trees.translate()
+    assert trees.trees[0] == tree
+
+    trees.trees.detranslate()
+    trees_translated.trees.detranslate()
+    assert trees.trees[0] == trees_translated.trees[0]
+
+
+def test_translate_roundtrip(trees_translated):
+    expected = trees_translated.trees[1]
+    trees_translated.trees.detranslate()
+    trees_translated.trees.translate()
+    assert trees_translated.trees[1] == expected
+    assert not trees_translated.trees._been_detranslated
+
+
+@pytest.mark.parametrize('tree,translated,table', [
+    (
+        "tree a = ((Bokmål:1,Nynorsk:1):1,Dansk:2);",
+        "tree a = ((1:1,2:1):1,3:2);",
+        {'Bokmål': '1', 'Nynorsk': '2', 'Dansk': '3'}),
+    (
+        "tree a = [&R] (('a b'[&x=(1,2)]:1,'it''s'),c)x;",
+        "tree a = [&R] ((1[&x=(1,2)]:1,2),3)x;",
+        {'a b': '1', "it's": '2', 'c': '3'}),
+])
+def test_translate_tree_labels(tree, translated, table):
+    translatetable = {}
+    assert TreeHandler._translate_tree(tree, translatetable) == translated
+    assert translatetable == table
+    assert TreeHandler._detranslate_tree(
+        translated, {v: k for k, v in translatetable.items()}) == tree
+
+
+def test_translate_labels():
+    nex = NexusReader.from_string("""#NEXUS
+begin trees;
+    tree a = ((Bokmål:1,'Nynorsk x':1)nordic:1,Dansk:2);
+end;""")
+    nex.trees.translate()
+    # Internal node labels are not taxa:
+    assert nex.trees.translators == {'1': 'Bokmål', '2': 'Nynorsk x', '3': 'Dansk'}
+    assert nex.trees[0] == "tree a = ((1:1,2:1)nordic:1,3:2);"
+    nex = NexusReader.from_string(nex.write())
+    assert nex.trees.translators['2'] == 'Nynorsk x'
+    nex.trees.detranslate()
+    assert nex.trees[0] == "tree a = ((Bokmål:1,'Nynorsk x':1)nordic:1,Dansk:2);"
+
+
+def test_translate_tree():
+    table = {'Chris': '1'}
+    tree = TreeHandler._translate_tree("tree a = ((Bruce[&x=1]:0.1,Chris)0.9,Tom:1);", table)
+    assert tree == "tree a = ((2[&x=1]:0.1,1)0.9,3:1);"
+    assert table == {'Chris': '1', 'Bruce': '2', 'Tom': '3'}
@@ -5,7 +5,7 @@ import warnings
 
 import pytest
 
-from nexus.reader import NexusReader
+from nexus.reader import NexusReader, TreeStream
 from nexus.exceptions import NexusFormatException
 
 
@@ -101,3 +101,91 @@ def test_error_on_duplicate_block():
             Matrix
             Harry              1
             """)
+
+
+def test_write_verbatim(examples, tmpdir):
+    src = pathlib.Path(str(tmpdir.join('f.nex')))
+    src.write_text(
+        examples.joinpath('example.nex').read_text(encoding='utf8') +  # noqa: W504
+        examples.joinpath('example.trees').read_text(encoding='utf8').replace('#NEXUS', ''),
+        encoding='utf8')
+    nex = NexusReader(src)
+    assert not nex.blocks['data'].modified
+    nex.trees.trees = nex.trees.trees[1:]
+    assert nex.blocks['trees'].modified
+    written = nex.write(verbatim=True)
+    assert 'Begin data;\nDimensions ntax=4 nchar=2;' in written
+    assert 'tree.0.1065.603220' not in written
+
+    # Writing to the source file itself must work - repeatedly:
+    nex.write_to_file(src, verbatim=True)
+    nex.write_to_file(src, verbatim=True)
+    nex = NexusReader(src)
+    assert nex.data.ntaxa == 4 and nex.trees.ntrees == 2
+
+    # Accessing tracked attributes marks the block as modified:
+    assert nex.data.matrix['Simon'] == ['0', '1']
+    assert 'begin data;' in nex.write(verbatim=True)
+
+
+def test_write_verbatim_changed_source(examples, tmpdir):
+    src = pathlib.Path(str(tmpdir.join('f.nex')))
+    src.write_text(examples.joinpath('example.nex').read_text(encoding='utf8'), encoding='utf8')
+    nex = NexusReader(src)
+    src.unlink()
+    # The source is gone, so the block is regenerated:
+    assert 'begin data;' in nex.write(verbatim=True)
+
+
+def test_write_verbatim_gzip(nex_string, tmpdir):
+    with gzip.open(str(tmpdir.join('f.gz')), 'wb') as h:
+        h.write(nex_string.encode('utf8'))
+    nex = NexusReader(str(tmpdir.join('f.gz')))
+    assert 'Begin data;' in nex.write(verbatim=True)
+
+
+def test_write_verbatim_from_string():
+    nex = NexusReader.from_string("#NEXUS\nbegin sets;\n  A = 1;\nEND;")
+    assert nex.write(verbatim=True) == "#NEXUS\n\nbegin sets;\n  A = 1;\nEND;\n"
+    # "end" is added to blocks without:
+    nex = NexusReader.from_string("#NEXUS\nbegin sets;\n  A = 1;\n[c]\nbegin trees;\n")
+    assert nex.write(verbatim=True).startswith("#NEXUS\n\nbegin sets;\n  A = 1;\nend;\n")
+    # Old Mac line breaks are supported, too:
+    nex = NexusReader.from_string("#NEXUS\rbegin sets;\r  A = 1;\rEND;\r")
+    assert nex.write(verbatim=True) == "#NEXUS\n\nbegin sets;\r  A = 1;\rEND;\r\n"
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_write_verbatim_begin_not_at_line_start(tmpdir, lazy):
+    nex = NexusReader.from_string("#NEXUS begin sets; A = 1; end;")
+    assert nex.write(verbatim=True) == "#NEXUS\n\nbegin sets; A = 1; end;\n"
+    src = pathlib.Path(str(tmpdir.join('f.nex')))
+    src.write_bytes("#NEXUS [ä] begin sets; [ö] A = 1; end;".encode('utf-8-sig'))
+    nex = NexusReader.from_file(src, lazy=lazy)
+    assert nex.write(verbatim=True) == "#NEXUS\n\nbegin sets; [ö] A = 1; end;\n"
+
+
+def test_TreeStream(examples, trees_translated):
+    stream = TreeStream(examples / 'example-translated.trees')
+    assert repr(stream).startswith('<TreeStream')
+    assert stream.translators == trees_translated.trees.translators
+    assert stream.was_translated
+    assert stream.taxon_index == trees_translated.trees.taxon_index
+    assert stream.ntrees == 3
+    # Streams can be iterated repeatedly:
+    assert list(stream) == list(stream.trees) == trees_translated.trees.trees
+
+
+def test_TreeStream_multiple_blocks(tmpdir):
+    src = pathlib.Path(str(tmpdir.join('f.nex.gz')))
+    with gzip.open(str(src), 'wt', encoding='utf8') as h:
+        h.write("#NEXUS\r[c]\rbegin taxa;\rend;\r\rbegin trees;\rtree a = (A,B);\rend;\r"
+                "begin trees;\rtree b = (A,B);\rend;\r")
+    stream = TreeStream(src)
+    assert not stream.was_translated
+    assert [tree.name for tree in stream] == ['a']
+
+
+def test_TreeStream_missing_file(tmpdir):
+    with pytest.raises(IOError):
+        TreeStream(str(tmpdir.join('f.nex')))
@@ -359,3 +359,6 @@ def test_TreeHandler_MrBayes(regression):
     """
     nex = NexusReader(regression / 'mrbayes.trees')
     assert len(nex.trees.trees) == 1
+    # Tree names are parsed case-insensitively and unquoted:
+    assert nex.trees[0].name == 'tree.2500000.34524.300436'
+    assert nex.trees.generations == [2500000]
@@ -0,0 +1,57 @@
+import pytest
+
+from nexus import NexusReader
+from nexus.compact_tree import CompactTree
+from nexus.exceptions import NexusFormatException
+from nexus.tools.annotate import annotate_tree
+from nexus.tools.annotations import annotation_columns
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_annotate_tree(trees_ultrametric, workers):
+    tree = annotate_tree(
+        "((A:1,B:1)x:1,C:2)[&old];", trees_ultrametric, workers=workers, chunksize=1)
+    columns = annotation_columns(tree)
+    assert columns['posterior'].tolist() == [1.0, 0.75, 1.0, 1.0, 1.0]
+    assert columns['height'].tolist()[:2] == [4.0, 1.333333]
+    assert columns['height_median'][1] == 1.0
+    assert [c[1] for c in columns['height_95%_HPD']] == [1.0, 2.0]
+    assert 'old' not in columns
+    assert tree.labels[1] == 'x'
+    assert tree.to_newick().startswith('((A[&posterior=1')
+    assert tree.lengths.tolist() == [pytest.approx(v, nan_ok=True) for v in [
+        float('nan'), 1.0, 1.0, 1.0, 2.0]]
+
+
+def test_annotate_tree_heights(trees_ultrametric):
+    tree = annotate_tree(
+        CompactTree.from_newick("((A,C),B);"), trees_ultrametric, heights='median')
+    columns = annotation_columns(tree)
+    assert columns['posterior'].tolist()[:2] == [1.0, 0.25]
+    assert tree.lengths.tolist()[1:] == [3.0, 1.0, 1.0, 4.0]
+
+    tree = annotate_tree("((A,C),B);", trees_ultrametric, heights='mean')
+    assert tree.lengths[1] == 3.0
+
+    # A clade which is not in the sample:
+    tree = annotate_tree("((B,C),A);", NexusReader.from_string(
+        "#NEXUS\nbegin trees;\ntree a = ((A:1,B:1):1,C:2);\nend;").trees, heights='mean')
+    assert tree.comments[1] == '&posterior=0'
+    assert tree.to_newick().startswith('((B[&posterior=1,height=0')
+
+
+def test_annotate_tree_superset(trees_ultrametric):
+    # The target tree is restricted to the taxa of the sample:
+    tree = annotate_tree("(((A:1,D:1):0.5,B:1.5)x:1,(C:1,E:1):1);", trees_ultrametric)
+    assert tree.ntips == 3 and tree.labels[1] == 'x'
+    assert tree.to_newick(comments=False) == '((A:1.5,B:1.5)x:1,C:2);'
+    assert annotation_columns(tree)['posterior'].tolist() == [1.0, 0.75, 1.0, 1.0, 1.0]
+
+
+def test_annotate_tree_errors(trees_ultrametric):
+    with pytest.raises(ValueError):
+        annotate_tree("((A,C),B);", trees_ultrametric, heights='x')
+    with pytest.raises(NexusFormatException):
+        annotate_tree("((A,D),B);", trees_ultrametric)
+    with pytest.raises(NexusFormatException):
+        annotate_tree("(A,B);", trees_ultrametric)
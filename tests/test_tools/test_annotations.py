@@ -0,0 +1,79 @@
+import math
+
+import pytest
+
+from nexus import NexusReader, TreeStream
+from nexus.compact_tree import CompactTree
+from nexus.tools.annotations import (
+    parse_value, parse_annotation, annotation_columns, iter_annotations,
+)
+
+
+@pytest.mark.parametrize(
+    'value,expected',
+    [
+        ('1', 1.0),
+        (' 9.3E-5', 9.3e-05),
+        ('{1,2.5}', (1.0, 2.5)),
+        ('{A,"B,C"}', ('A', 'B,C')),
+        ('{{1,2},{3}}', ((1.0, 2.0), (3.0,))),
+        ("'x y'", 'x y'),
+        ('#ff0000', '#ff0000'),
+    ]
+)
+def test_parse_value(value, expected):
+    assert parse_value(value) == expected
+
+
+def test_parse_annotation():
+    assert parse_annotation(None) == {}
+    assert parse_annotation('&rate=0.5,height_95%_HPD={1,2},set={A,B},!color=red,flag') == {
+        'rate': 0.5,
+        'height_95%_HPD': (1.0, 2.0),
+        'set': ('A', 'B'),
+        '!color': 'red',
+        'flag': True,
+    }
+    assert parse_annotation('&a=1][&b=2') == {'a': 1.0, 'b': 2.0}
+
+
+def test_annotation_columns():
+    tree = CompactTree.from_newick(
+        "((A[&rate=1,h={1,2},c=x]:1,B[&rate=2,h={3,4}]:1)[&rate=3,c={1}]:1,C:2)[&h={5}];")
+    columns = annotation_columns(tree)
+    assert set(columns) == {'rate', 'h', 'c'}
+    assert columns['rate'].tolist()[1:4] == [3.0, 1.0, 2.0]
+    assert math.isnan(columns['rate'][0]) and math.isnan(columns['rate'][4])
+    # Tuples of varying length are not split into components:
+    assert columns['h'][0] == (5.0,) and columns['h'][4] is None
+    assert columns['c'] == [None, (1.0,), 'x', None, None]
+
+    lower, upper = annotation_columns(
+        CompactTree.from_newick("(A[&h={1,2}],B[&h={3,4}]);"))['h']
+    assert lower.tolist()[1:] == [1.0, 3.0] and upper.tolist()[1:] == [2.0, 4.0]
+
+    assert set(annotation_columns(tree, keys={'rate'})) == {'rate'}
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_iter_annotations(workers):
+    trees = NexusReader.from_string("""#NEXUS
+begin trees;
+    translate
+        1 A,
+        2 B;
+    tree a = (1[&rate=1]:1,2[&rate=2]:1);
+    tree b = (2[&rate=3]:1,1:1);
+end;""").trees
+    res = list(iter_annotations(trees, workers=workers, chunksize=1))
+    assert len(res) == 2
+    tree, columns = res[1]
+    assert tree.tips[1] == tree.taxon_index['2']
+    assert columns['rate'][1] == 3.0
+
+
+def test_iter_annotations_stream(examples):
+    trees = TreeStream(examples / 'example-beast.trees')
+    tree, columns = next(iter_annotations(trees, keys=['rate']))
+    assert len(columns['rate']) == len(tree)
+    assert columns['rate'][1] == pytest.approx(9.363171791537587e-05)
@@ -0,0 +1,120 @@
+import shutil
+
+import pytest
+
+from nexus import NexusReader
+from nexus.exceptions import NexusFormatException
+from nexus.tools import append
+from nexus.tools.append import append_trees
+
+
+@pytest.fixture
+def translated(tmp_path, examples):
+    res = tmp_path / 'translated.trees'
+    shutil.copy(str(examples / 'example-translated.trees'), str(res))
+    return res
+
+
+def test_append_trees_translated(translated):
+    assert append_trees(translated, [
+        'tree a = ((Tom,Simon),(Bruce,(Roger,Fred,Kevin,Timothy,Andrew,Chris,Michael,Mark,'
+        'Henry,David)));',
+        'tree b = (0,1,2);']) == 2
+    trees = NexusReader.from_file(translated).trees
+    assert trees.ntrees == 5
+    assert trees[3] == 'tree a = ((0,1),(2,(3,4,5,6,7,8,9,10,11,12)));'
+    assert trees[4].name == 'b'
+    assert translated.read_text(encoding='utf8').endswith('\ttree b = (0,1,2);\nend;')
+
+    with pytest.raises(NexusFormatException):
+        append_trees(translated, ['tree x = (Foo,Tom);'])
+    with pytest.raises(NexusFormatException):
+        append_trees(translated, ['(Simon,Tom);'])
+    assert NexusReader.from_file(translated).trees.ntrees == 5
+
+
+@pytest.mark.parametrize(
+    'content,expected',
+    [
+        # Not the last block:
+        ("#NEXUS\nbegin trees;\ntree a = (a,b);\nEND;\nbegin paup;\nend;\n",
+         "#NEXUS\nbegin trees;\ntree a = (a,b);\n\ttree b = (b,a);\nEND;\nbegin paup;\nend;\n"),
+        # Empty trees block:
+        ("#NEXUS\nbegin trees;\nend;",
+         "#NEXUS\nbegin trees;\n\ttree b = (b,a);\nend;"),
+        # Missing end:
+        ("#NEXUS\nbegin trees;\ntree a = (a,b);",
+         "#NEXUS\nbegin trees;\ntree a = (a,b);\n\ttree b = (b,a);\n"),
+        ("#NEXUS\nbegin trees;\ntree a = (a,b);\nbegin paup;\nend;\n",
+         "#NEXUS\nbegin trees;\ntree a = (a,b);\n\ttree b = (b,a);\nbegin paup;\nend;\n"),
+        # Trailing non-trees block with a tree-like command:
+        ("#NEXUS\nbegin trees;\ntree a = (a,b);\nend;\nbegin paup;\ncontree all / file=x.tre;\n"
+         "end;\n",
+         "#NEXUS\nbegin trees;\ntree a = (a,b);\n\ttree b = (b,a);\nend;\nbegin paup;\n"
+         "contree all / file=x.tre;\nend;\n"),
+        # Inline end:
+        ("#NEXUS\nbegin trees;\ntree a = (a,b); end;\n",
+         "#NEXUS\nbegin trees;\ntree a = (a,b); \n\ttree b = (b,a);\nend;\n"),
+        ("#NEXUS\nbegin trees; tree a = (a,b); END;",
+         "#NEXUS\nbegin trees; tree a = (a,b); \n\ttree b = (b,a);\nEND;"),
+        # No trees block:
+        ("#NEXUS\nbegin paup;\nend;\n",
+         "#NEXUS\nbegin paup;\nend;\n\nbegin trees;\n\ttree b = (b,a);\nend;\n"),
+    ]
+)
+def test_append_trees(tmp_path, content, expected):
+    target = tmp_path / 'test.nex'
+    target.write_text(content, encoding='utf8')
+    append_trees(target, ['tree b = (b,a);'])
+    assert target.read_text(encoding='utf8') == expected
+
+
+def test_append_trees_large(tmp_path, mocker):
+    mocker.patch.object(append, 'TAIL_SIZE', 20)
+    target = tmp_path / 'test.nex'
+    target.write_text("#NEXUS\nbegin trees;\ntree a = (a,b);\n[comment]\nend;\n", encoding='utf8')
+    append_trees(target, ['tree b = (b,a);'])
+    assert NexusReader.from_file(target).trees.ntrees == 2
+
+
+def test_append_trees_long_last_line(tmp_path, mocker):
+    mocker.patch.object(append, 'TAIL_SIZE', 20)
+    full_scan = mocker.spy(append, '_full_scan')
+    target = tmp_path / 'test.nex'
+    target.write_text(
+        "#NEXUS\nbegin trees;\ntree a = ({0});\nend;\n".format(
+            ','.join('t%s' % i for i in range(100))),
+        encoding='utf8')
+    append_trees(target, ['tree b = (t1,t0);'])
+    assert NexusReader.from_file(target).trees[1] == 'tree b = (t1,t0);'
+    assert not full_scan.called
+
+
+def test_append_trees_gzipped(tmp_path):
+    with pytest.raises(ValueError):
+        append_trees(tmp_path / 'test.trees.gz', [])
+
+
+@pytest.mark.parametrize('newline', ['\r\n', '\r'])
+def test_append_trees_newline(tmp_path, newline):
+    target = tmp_path / 'test.nex'
+    for content in [
+        "#NEXUS\nbegin trees;\ntree a = (a,b);\nend;\n",
+        "#NEXUS\nbegin trees;\ntree a = (a,b);",
+        "#NEXUS\n",
+    ]:
+        target.write_bytes(content.replace('\n', newline).encode('utf8'))
+        append_trees(target, ['tree b = (b,a);'])
+        data = target.read_bytes().decode('utf8')
+        assert '\ttree b = (b,a);' + newline in data
+        assert data.replace('\r\n', '').count('\n') == 0
+        assert NexusReader.from_file(target).trees[-1].name == 'b'
+
+
+def test_append_trees_labels(tmp_path):
+    target = tmp_path / 'test.nex'
+    target.write_text(
+        "#NEXUS\nbegin trees;\ntranslate\n1 Bokmål,\n2 'Nynorsk x';\ntree a = (1,2);\nend;\n",
+        encoding='utf8')
+    append_trees(target, ["tree b = ('Nynorsk x',Bokmål);"])
+    assert NexusReader.from_file(target).trees[1] == 'tree b = (2,1);'
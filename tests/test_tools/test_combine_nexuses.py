@@ -1,9 +1,10 @@
+import io
 import re
 
 import pytest
 
 from nexus import NexusReader
-from nexus.tools.combine_nexuses import combine_nexuses
+from nexus.tools.combine_nexuses import combine_nexuses, combine_tree_files
 
 
 @pytest.fixture
@@ -153,3 +154,77 @@ def test_combine():
     assert newnex.trees[0] == "tree 1 = (a,b,c);"
     assert newnex.trees[1] == "tree 2 = (b,a,c);"
     assert newnex.trees[2] == "tree 3 = (b,c,a);"
+
+
+def test_combine_translated():
+    nex1 = NexusReader.from_string("""Begin trees;
+            translate
+            1 a,
+            2 b,
+            3 c;
+            tree 1 = (1,2,3);
+        end;""")
+    nex2 = NexusReader.from_string("""Begin trees;
+            translate
+            1 c,
+            2 b,
+            3 a;
+            tree 2 = (1,2,3);
+        end;""")
+    newnex = combine_nexuses([nex1, nex2])
+    assert newnex.trees == ["tree 1 = (a,b,c);", "tree 2 = (c,b,a);"]
+
+
+def test_combine_tree_files(tmp_path, examples):
+    out = tmp_path / 'combined.trees'
+    ntrees = combine_tree_files(
+        [examples / 'example.trees', examples / 'example-translated.trees'], out, burnin=1)
+    assert ntrees == 4
+    nex = NexusReader.from_file(out)
+    assert nex.trees.ntrees == 4
+    assert len(nex.trees.translators) == 13
+    assert nex.trees.translators['1'] == 'Chris'
+    # Both files have the same trees, thus renumbering must yield identical trees:
+    assert nex.trees[0] == nex.trees[2]
+    nex.trees.detranslate()
+    assert nex.trees[0] == NexusReader.from_file(examples / 'example.trees').trees[1]
+
+
+def test_combine_tree_files_sampling(examples):
+    out = io.StringIO()
+    assert combine_tree_files(
+        [examples / 'example.trees'] * 2, out, burnin=0.5, resample=2) == 2
+    assert out.getvalue().count('tree ') == 2
+    assert out.getvalue().endswith('end;\n')
+
+
+def test_combine_tree_files_labels(tmp_path):
+    for name, tree in [
+        ('a', "((Bokmål:1,Nynorsk:1)x:1,Dansk:2)"),
+        ('b', "(('Dansk':1,Føroyskt:1):1,'a b':2)"),
+    ]:
+        tmp_path.joinpath(name + '.trees').write_text(
+            '#NEXUS\nbegin trees;\ntree {0} = {1};\nend;\n'.format(name, tree),
+            encoding='utf8')
+    out = tmp_path / 'combined.trees'
+    combine_tree_files([tmp_path / 'a.trees', tmp_path / 'b.trees'], out)
+    nex = NexusReader.from_file(out)
+    assert nex.trees.translators == {
+        '1': 'Bokmål', '2': 'Nynorsk', '3': 'Dansk', '4': 'Føroyskt', '5': 'a b'}
+    assert nex.trees[0] == 'tree a = ((1:1,2:1)x:1,3:2);'
+    assert nex.trees[1] == 'tree b = ((3:1,4:1):1,5:2);'
+
+
+def test_combine_tree_files_taxa_of_all_trees(tmp_path):
+    tmp_path.joinpath('a.trees').write_text(
+        '#NEXUS\nbegin trees;\ntree a = ((A,B),C);\ntree b = ((A,B),(C,D));\nend;\n',
+        encoding='utf8')
+    tmp_path.joinpath('b.trees').write_text(
+        '#NEXUS\nbegin trees;\ntranslate\n1 A,\n2 B;\ntree c = (1,(2,E));\nend;\n',
+        encoding='utf8')
+    out = tmp_path / 'combined.trees'
+    combine_tree_files([tmp_path / 'a.trees', tmp_path / 'b.trees'], out)
+    nex = NexusReader.from_file(out)
+    assert nex.trees.translators == {'1': 'A', '2': 'B', '3': 'C', '4': 'D', '5': 'E'}
+    assert nex.trees[1] == 'tree b = ((1,2),(3,4));'
+    assert nex.trees[2] == 'tree c = (1,(2,5));'
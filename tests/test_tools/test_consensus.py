@@ -0,0 +1,81 @@
+import pytest
+
+from nexus import NexusReader
+from nexus.compact_tree import CompactTree
+from nexus.tools.splits import SplitTable
+from nexus.tools.consensus import select_splits, consensus_tree, consensus
+
+
+@pytest.fixture
+def table():
+    res = SplitTable(taxa=list('ABCD'))
+    taxon_index = {t: i for i, t in enumerate(res.taxa)}
+    for newick in [
+        '((A:1,B:1):2,(C:1,D:1):1);',
+        '((A:1,B:1):4,(C:1,D:1):1);',
+        '((A:1,C:1):1,(B:1,D:1):1);',
+    ]:
+        res.add_tree(CompactTree.from_newick(newick, taxon_index))
+    return res
+
+
+def test_select_splits(table):
+    assert [s for s, _ in select_splits(table) if s & (s - 1)] == [0b0011, 0b1100]
+    assert [s for s, _ in select_splits(table, threshold=1.0) if s & (s - 1)] == []
+    assert len(select_splits(table, greedy=True)) == 6
+
+
+def test_consensus_tree(table):
+    tree = consensus_tree(table)
+    assert tree.to_newick() == '((A:1,B:1)0.6667:3,(C:1,D:1)0.6667:1);'
+    assert tree.to_newick(lengths=False) == '((A,B)0.6667,(C,D)0.6667);'
+    assert consensus_tree(table, threshold=1.0).to_newick(lengths=False) == '(A,B,C,D);'
+
+
+def test_consensus_tree_unrooted():
+    table = SplitTable(taxa=list('ABCDE'), rooted=False)
+    taxon_index = {t: i for i, t in enumerate(table.taxa)}
+    for newick in ['(A:1,(B:1,C:1):1,(D:1,E:1):1);', '((A:1,E:1):1,(B:1,C:1):1,D:1);']:
+        table.add_tree(CompactTree.from_newick(newick, taxon_index))
+    # (D,E) and (A,E) are in half of the trees, i.e. have no majority:
+    assert consensus_tree(table).to_newick() == '(A:1,(B:1,C:1)1:1,D:1,E:1);'
+
+
+@pytest.mark.parametrize('newicks', [
+    ['((A,B),(C,D));', '((A,C),(B,D));'],
+    ['((A,C),(B,D));', '((A,B),(C,D));'],
+])
+def test_consensus_tree_tie(newicks):
+    table = SplitTable(taxa=list('ABCD'))
+    taxon_index = {t: i for i, t in enumerate(table.taxa)}
+    for newick in newicks:
+        table.add_tree(CompactTree.from_newick(newick, taxon_index))
+    assert consensus_tree(table).to_newick() == '(A,B,C,D);'
+    assert consensus_tree(table, threshold=0.4).to_newick(lengths=False).count('(') == 3
+
+
+def test_consensus_missing_taxa():
+    table = SplitTable(taxa=list('ABC'))
+    table.add_tree(CompactTree.from_newick('(A,B);', {'A': 0, 'B': 1}))
+    assert consensus_tree(table).to_newick() == '(A,B,C);'
+    assert consensus_tree(table, greedy=True).to_newick() == '(A,B,C);'
+
+
+@pytest.mark.parametrize('greedy,expected', [
+    (False, '((Tom,Simon,(Bruce,(Roger,(Timothy,Henry)1,Andrew,Chris,Michael,Mark)0.6667,'
+            'Fred)0.6667,Kevin)1,David);'),
+    (True, '((Tom,(Simon,((Bruce,(((Roger,(Andrew,Michael)0.3333,Chris,Mark)0.3333,'
+           '(Timothy,Henry)1)0.6667,Fred)0.3333)0.6667,Kevin)0.3333)0.3333)1,David);'),
+])
+def test_consensus(trees_translated, greedy, expected):
+    assert consensus(trees_translated.trees, greedy=greedy).to_newick(lengths=False) == expected
+
+
+def test_consensus_parallel(trees_translated):
+    assert consensus(trees_translated.trees, workers=2).to_newick() == \
+        consensus(trees_translated.trees).to_newick()
+
+
+def test_consensus_quoted_labels():
+    nex = NexusReader.from_string("#NEXUS\nbegin trees;\ntree a = ('A b',(C,D));\nend;")
+    assert consensus(nex.trees).to_newick() == "('A b',(C,D)1);"
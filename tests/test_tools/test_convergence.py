@@ -0,0 +1,63 @@
+import math
+import pathlib
+
+import pytest
+
+from nexus.exceptions import NexusFormatException
+from nexus.tools.splits import SplitTable
+from nexus.tools.convergence import burnin_count, average_sdsf, asdsf
+
+
+def _write_run(tmpdir, name, trees, translate=None):
+    res = pathlib.Path(str(tmpdir)) / name
+    lines = ['#NEXUS', 'begin trees;']
+    if translate:
+        lines.append('translate')
+        lines.append(',\n'.join('%s %s' % item for item in translate.items()) + ';')
+    lines.extend('tree t%d = %s' % (i, tree) for i, tree in enumerate(trees))
+    lines.append('end;')
+    res.write_text('\n'.join(lines), encoding='utf8')
+    return res
+
+
+def test_burnin_count():
+    assert burnin_count(0.1, 55) == 5
+    assert burnin_count(0, 55) == 0
+    assert burnin_count(1.0, 55) == 1
+
+
+def test_average_sdsf():
+    t1, t2 = SplitTable(), SplitTable()
+    t1.ntrees, t1.counts = 2, {0b011: 2, 0b001: 2}
+    t2.ntrees, t2.counts = 2, {0b110: 2, 0b001: 2}
+    assert average_sdsf([t1, t2]) == pytest.approx(math.sqrt(0.5))
+    assert math.isnan(average_sdsf([SplitTable(), SplitTable()]))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_asdsf(tmpdir, workers):
+    run1 = _write_run(
+        tmpdir, 'run1.trees', ['((A,B),(C,D),E);'] * 4 + ['((A,C),(B,D),E);'] * 4)
+    # The second run uses a translate block:
+    run2 = _write_run(
+        tmpdir,
+        'run2.trees',
+        ['((1,2),(3,4),5);'] * 8,
+        translate={1: 'A', 2: 'B', 3: 'C', 4: 'D', 5: 'E'})
+    assert asdsf([run1, run2], burnin=0, workers=workers) == [
+        (8, pytest.approx(math.sqrt(0.125)))]
+    # With burn-in, the first run only contains the conflicting trees:
+    assert asdsf([run1, run2], burnin=0.5) == [(4, pytest.approx(math.sqrt(0.5)))]
+    assert asdsf([run1, run2], burnin=2, window=3, workers=workers) == [
+        (3, pytest.approx(math.sqrt(2) / 6)),
+        (6, pytest.approx(math.sqrt(0.5) * 2 / 3)),
+    ]
+
+
+def test_asdsf_errors(tmpdir):
+    run1 = _write_run(tmpdir, 'run1.trees', ['((A,B),C);'])
+    run2 = _write_run(tmpdir, 'run2.trees', ['((A,B),D);'])
+    with pytest.raises(ValueError):
+        asdsf([run1])
+    with pytest.raises(NexusFormatException):
+        asdsf([run1, run2])
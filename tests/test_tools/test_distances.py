@@ -0,0 +1,88 @@
+import math
+
+import pytest
+
+from nexus import NexusReader
+from nexus.compact_tree import CompactTree
+from nexus.tools.distances import (
+    nontrivial_splits, splitsets, rf_distance, iter_rf_blocks, rf_matrix,
+    patristic_matrix, iter_patristic_matrices, mean_patristic_matrix,
+)
+
+
+@pytest.fixture
+def trees_rf():
+    return NexusReader.from_string("""#NEXUS
+begin trees;
+    tree a = ((A,B),(C,(D,E)));
+    tree b = ((A,B),(D,(C,E)));
+    tree c = ((A,C),(B,(D,E)));
+end;""").trees
+
+
+def test_nontrivial_splits():
+    tree = CompactTree.from_newick('((A,B),(C,(D,E)));')
+    assert nontrivial_splits(tree) == {0b11100, 0b11000}
+    assert nontrivial_splits(tree, rooted=True) == {0b00011, 0b11100, 0b11000}
+
+
+def test_rf_distance():
+    assert rf_distance(frozenset([1, 2]), frozenset([2, 3])) == 2
+    assert rf_distance(frozenset([1, 2]), frozenset([2, 3]), normalise=True) == 0.5
+    assert rf_distance(frozenset(), frozenset(), normalise=True) == 0.0
+
+
+def test_splitsets(trees_rf):
+    assert splitsets(trees_rf, workers=2, chunksize=1) == splitsets(trees_rf)
+
+
+def test_rf_matrix(trees_rf):
+    assert rf_matrix(trees_rf) == [[0, 2, 2], [2, 0, 4], [2, 4, 0]]
+    assert rf_matrix(trees_rf, rooted=True) == [[0, 2, 4], [2, 0, 6], [4, 6, 0]]
+    assert rf_matrix(trees_rf, normalise=True)[0] == [0.0, 0.5, 0.5]
+    assert rf_matrix(trees_rf, workers=2, block_size=2) == rf_matrix(trees_rf)
+
+
+def test_iter_rf_blocks(trees_rf):
+    blocks = list(iter_rf_blocks(splitsets(trees_rf), block_size=2))
+    assert [offset for offset, _ in blocks] == [0, 2]
+    assert blocks[0][1] == [[2, 2], [4]]
+    assert blocks[1][1] == [[]]
+
+
+def test_patristic_matrix():
+    tree = CompactTree.from_newick('((A:1,B:2):1,(C:1,(D:1,E:1):1):0.5);')
+    matrix = patristic_matrix(tree)
+    assert matrix[0] == [0.0, 3.0, 3.5, 4.5, 4.5]
+    assert matrix[3] == [4.5, 5.5, 3.0, 0.0, 2.0]
+    assert all(matrix[i][j] == matrix[j][i] for i in range(5) for j in range(5))
+
+    # Taxa missing from a tree and missing branch lengths yield nan:
+    matrix = patristic_matrix(CompactTree.from_newick('(A:1,(B,C:1):1);'), ntaxa=4)
+    assert matrix[0][2] == 3.0
+    assert math.isnan(matrix[0][1]) and math.isnan(matrix[3][0]) and math.isnan(matrix[3][3])
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_patristic_matrices(trees_ultrametric, workers):
+    matrices = list(iter_patristic_matrices(trees_ultrametric, workers=workers, chunksize=1))
+    assert matrices[0][0] == [0.0, 2.0, 4.0]
+    assert matrices[2][0] == [0.0, 8.0, 2.0]
+    taxa, matrix = mean_patristic_matrix(trees_ultrametric, workers=workers, chunksize=1)
+    assert taxa == ['A', 'B', 'C']
+    assert matrix == [[0.0, 4.0, 6.5], [4.0, 0.0, 8.0], [6.5, 8.0, 0.0]]
+
+
+def test_mean_patristic_matrix_missing_taxa():
+    trees = NexusReader.from_string("""#NEXUS
+begin trees;
+    tree a = ((A:1,B:1):1,C:2);
+    tree b = (A:1,B:1);
+end;""").trees
+    taxa, matrix = mean_patristic_matrix(trees)
+    assert matrix[0][1] == 2.0
+    assert math.isnan(matrix[0][2])
+
+    trees.trees = []
+    taxa, matrix = mean_patristic_matrix(trees)
+    assert math.isnan(matrix[0][0])
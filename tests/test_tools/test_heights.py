@@ -0,0 +1,73 @@
+import math
+import random
+
+import pytest
+
+from nexus import TreeStream
+from nexus.compact_tree import CompactTree
+from nexus.tools.heights import (
+    node_heights, tree_length, hpd, Reservoir, tree_heights, summarise_heights,
+)
+
+
+def test_node_heights():
+    tree = CompactTree.from_newick('((A:1,B:2):1,C:2);')
+    assert node_heights(tree).tolist() == [3.0, 2.0, 1.0, 0.0, 1.0]
+    assert tree_length(tree) == 6.0
+    assert math.isnan(tree_length(CompactTree.from_newick('((A:1,B):1,C:2);')))
+    # Missing branch lengths yield `nan` heights - regardless of the position of the tip:
+    for newick in ['((A:1,B):1,C:2);', '((B,A:1):1,C:2);']:
+        assert all(math.isnan(h) for h in node_heights(CompactTree.from_newick(newick)))
+
+
+def test_hpd():
+    assert all(math.isnan(v) for v in hpd([]))
+    assert hpd([5]) == (5, 5)
+    assert hpd(list(range(100)), mass=0.5) == (0, 49)
+    assert hpd([1, 2, 3, 4, 100]) == (1, 100)
+
+
+def test_Reservoir():
+    res = Reservoir(size=10, rng=random.Random(1))
+    assert math.isnan(res.mean) and math.isnan(res.median)
+    for i in range(1000):
+        res.add(float(i))
+    res.add(math.nan)
+    assert res.n == 1000 and len(res.sample) == 10
+    assert res.mean == pytest.approx(499.5)
+
+    res = Reservoir()
+    for v in [3.0, 1.0, 2.0, 10.0]:
+        res.add(v)
+    assert res.median == 2.5
+    assert res.hpd(mass=0.5) == (1.0, 2.0)
+
+
+def test_tree_heights():
+    root, length, heights = tree_heights(
+        CompactTree.from_newick('((A:1,B:1):1,C:2);', {'A': 0, 'B': 1, 'C': 2}))
+    assert (root, length) == (2.0, 5.0)
+    assert heights == {0b111: 2.0, 0b011: 1.0}
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_summarise_heights(trees_ultrametric, workers):
+    summary = summarise_heights(trees_ultrametric, workers=workers, chunksize=1)
+    assert summary.ntrees == 4
+    assert summary.root_height.mean == 4.0
+    assert summary.root_height.median == 4.0
+    assert summary.tree_length.mean == 9.25
+    clades = list(summary.iter_clades())
+    assert [(summary.split_taxa(s), f) for s, f, _ in clades] == [
+        (['A', 'B', 'C'], 1.0), (['A', 'B'], 0.75), (['A', 'C'], 0.25)]
+    assert clades[1][2].mean == pytest.approx(4 / 3)
+    assert clades[1][2].hpd() == (1.0, 2.0)
+    assert summary.frequency(0b011) == 0.75
+    assert len(list(summary.iter_clades(min_frequency=0.5))) == 2
+
+
+def test_summarise_heights_stream(examples):
+    summary = summarise_heights(TreeStream(examples / 'example-beast.trees'))
+    assert summary.ntrees == 1
+    assert summary.root_height.mean == pytest.approx(3048.591020914168)
+    assert summary.frequency(0) == 0.0
@@ -0,0 +1,40 @@
+import math
+
+import pytest
+
+from nexus import NexusReader, TreeStream
+from nexus.compact_tree import CompactTree
+from nexus.tools.ltt import ltt, lineages_at, ltt_curves
+
+
+def test_ltt():
+    steps = ltt(CompactTree.from_newick('((A:1,B:1):1,(C:0.5,D:0.5):1.5);'))
+    assert steps == [(0.0, 4), (0.5, 3), (1.0, 2), (2.0, 0)]
+    assert [lineages_at(steps, h) for h in [-1, 0, 0.7, 1, 1.9, 2, 3]] == [0, 4, 3, 2, 2, 0, 0]
+
+    # Rounding errors in the heights of tips are ignored:
+    steps = ltt(CompactTree.from_newick('((A:0.1,B:0.1):0.2,C:0.3);'))
+    assert steps[0] == (0.0, 3)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_ltt_curves(trees_ultrametric, workers):
+    res = ltt_curves(trees_ultrametric, npoints=7, workers=workers, chunksize=1)
+    assert [r[0] for r in res] == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+    assert res[0] == (0.0, 3.0, 3, 3)
+    assert res[1][1] == pytest.approx(9 / 4)
+    assert res[2] == (2.0, 1.5, 0, 2)
+    assert res[6] == (6.0, 0.0, 0, 0)
+
+    res = ltt_curves(trees_ultrametric, grid=[0.5], mass=0.5)
+    assert res == [(0.5, 3.0, 3, 3)]
+    assert ltt_curves(trees_ultrametric, npoints=1) == [(0.0, 3.0, 3, 3)]
+
+
+def test_ltt_curves_empty(examples):
+    trees = NexusReader.from_file(examples / 'example.trees').trees
+    trees.trees = []
+    height, mean, lower, upper = ltt_curves(trees, npoints=2)[0]
+    assert height == 0.0 and math.isnan(mean)
+
+    assert len(ltt_curves(TreeStream(examples / 'example.trees'), npoints=3)) == 3
@@ -0,0 +1,50 @@
+import math
+
+import pytest
+
+from nexus import NexusReader
+from nexus.reader import TreeStream
+from nexus.compact_tree import CompactTree
+from nexus.tools.mcc import clade_credibility, mcc_tree
+
+
+def test_clade_credibility():
+    tree = CompactTree.from_newick('((A,B),C);')
+    assert clade_credibility(tree, {0b011: math.log(0.5), 0b001: 0, 0b010: 0, 0b100: 0}) == \
+        pytest.approx(math.log(0.5))
+    assert clade_credibility(tree, {}) == -math.inf
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_mcc_tree(workers):
+    nex = NexusReader.from_string("""#NEXUS
+begin trees;
+    tree a = ((A,C),(B,D));
+    tree b = ((A,B),(C,D));
+    tree c = ((A,B),(C,D));
+    tree d = (((A,B),C),D);
+end;""")
+    index, tree, score = mcc_tree(nex.trees, workers=workers, chunksize=1)
+    assert index == 1
+    assert tree.name == 'b'
+    assert score == pytest.approx(math.log(0.75) + math.log(0.5))
+
+
+def test_mcc_tree_empty(tmp_path):
+    assert mcc_tree(NexusReader.from_string("#NEXUS\nbegin trees;\nend;").trees) is None
+    tmp_path.joinpath('empty.trees').write_text("#NEXUS\nbegin trees;\nend;", encoding='utf8')
+    assert mcc_tree(TreeStream(tmp_path / 'empty.trees')) is None
+
+
+def test_mcc_tree_translated(trees_translated):
+    index, tree, _ = mcc_tree(trees_translated.trees)
+    assert index == 1
+    assert tree == trees_translated.trees[1]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_mcc_tree_stream(examples, trees_translated, workers):
+    index, tree, _ = mcc_tree(
+        TreeStream(examples / 'example-translated.trees'), workers=workers, chunksize=2)
+    assert index == 1
+    assert tree == trees_translated.trees[1]
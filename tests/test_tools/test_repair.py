@@ -0,0 +1,86 @@
+import io
+import gzip
+
+import pytest
+
+from nexus import NexusReader
+from nexus.tools.repair import tree_error, iter_repaired_lines, repair_trees
+
+
+@pytest.mark.parametrize(
+    'tree,error',
+    [
+        ('tree a = ((a,b),c);', None),
+        ("tree a = [&R] (('a)',b)[&x={(1}],c);", None),
+        ('tree a = ((a,b),c', 'Missing semicolon'),
+        ('tree a = ((a,b),c;', 'Unbalanced parentheses'),
+        ('tree a = (a,b));', 'Unbalanced parentheses'),
+        ('tree a = ((a[&x=1,b', 'Unbalanced brackets or quotes'),
+        ('tree a', 'Missing "="'),
+    ]
+)
+def test_tree_error(tree, error):
+    assert tree_error(tree) == error
+
+
+def _repair(text):
+    dropped = []
+    return ''.join(iter_repaired_lines(io.StringIO(text), dropped)), dropped
+
+
+def test_iter_repaired_lines():
+    text = """#NEXUS
+begin taxa;
+end;
+begin trees;
+    translate
+        1 A,
+        2 B
+    ;
+    tree a = (1,2);
+    [comment]
+    tree b = (1,(2
+"""
+    out, dropped = _repair(text)
+    assert out == text.replace('    tree b = (1,(2\n', 'end;\n')
+    assert dropped == [(11, 'Missing semicolon')]
+
+    out, dropped = _repair(text.split('tree a')[0] + 'tr')
+    assert out.endswith('    ;\nend;\n')
+    assert dropped == [(9, 'Incomplete line')]
+
+    out, dropped = _repair(text.split('2 B')[0] + '2 ')
+    assert out.endswith('1 A,\n;\nend;\n')
+    assert dropped == [(7, 'Incomplete line')]
+    assert NexusReader.from_string(out).trees.translators == {'1': 'A'}
+
+    out, dropped = _repair('#NEXUS\nbegin trees;\ntranslate 1 A;\ntree a = (1);\nend;')
+    assert out == '#NEXUS\nbegin trees;\ntranslate 1 A;\ntree a = (1);\nend;\n'
+    assert not dropped
+
+
+def test_repair_trees(tmp_path, examples):
+    text = (examples / 'example-translated.trees').read_text(encoding='utf8')
+    with gzip.open(str(tmp_path / 'test.trees.gz'), 'wb') as f:
+        f.write(text[:-100].encode('utf8'))
+    # Truncate the gzip stream, too:
+    data = (tmp_path / 'test.trees.gz').read_bytes()
+    (tmp_path / 'test.trees.gz').write_bytes(data[:-10])
+
+    dropped = repair_trees(tmp_path / 'test.trees.gz', tmp_path / 'repaired.trees')
+    assert len(dropped) == 1
+    nex = NexusReader.from_file(tmp_path / 'repaired.trees')
+    assert nex.trees.ntrees == 2
+
+    out = io.StringIO()
+    assert repair_trees(examples / 'example-translated.trees', out) == []
+    assert NexusReader.from_string(out.getvalue()).trees.ntrees == 3
+
+
+def test_repair_trees_gzip_members(tmp_path):
+    data = gzip.compress(b'#NEXUS\nbegin trees;\r\ntree a = (a,b);\n') + \
+        gzip.compress('tree b = (a,b);\ntree \u00e4 = (a,'.encode('utf8'))
+    (tmp_path / 'test.trees.gz').write_bytes(data)
+    out = io.StringIO()
+    assert repair_trees(tmp_path / 'test.trees.gz', out) == [(5, 'Missing semicolon')]
+    assert out.getvalue().splitlines()[-2:] == ['tree b = (a,b);', 'end;']
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from nexus.exceptions import NexusFormatException
+from nexus.handlers.tree import Tree
+from nexus.tools.sampling import (
+    delete_trees, skip_burnin, filter_generations, thin, reservoir_sample,
+)
+
+
+def test_delete_trees():
+    assert list(delete_trees('abcde', {1, 3})) == list('bde')
+
+
+def test_skip_burnin():
+    assert list(skip_burnin('abcde', 2)) == list('cde')
+    assert list(skip_burnin('abcde', 0.5, ntrees=5)) == list('cde')
+    assert list(skip_burnin(iter('abcde'), 10)) == []
+    with pytest.raises(ValueError):
+        list(skip_burnin('abcde', 0.5))
+
+
+def test_filter_generations():
+    trees = ['tree STATE_%d = (a,b);' % i for i in range(0, 5000, 1000)]
+    assert len(list(filter_generations(trees, start=2000))) == 3
+    assert len(list(filter_generations(trees, end=2000))) == 3
+    assert [t.generation for t in filter_generations(map(Tree, trees), 1000, 2500)] == \
+        [1000, 2000]
+    with pytest.raises(NexusFormatException):
+        list(filter_generations(['tree a = (a,b);']))
+
+
+def test_thin():
+    assert list(thin(range(1, 11), 3)) == [3, 6, 9]
+
+
+def test_reservoir_sample():
+    sample = list(reservoir_sample(iter(range(100)), 10, rng=random.Random(1)))
+    assert len(sample) == 10
+    assert sample == sorted(sample)
+    assert list(reservoir_sample(range(5), 5)) == list(range(5))
+    with pytest.raises(ValueError):
+        list(reservoir_sample(range(5), 6))
+
+
+def test_reservoir_sample_uniform():
+    rng = random.Random(42)
+    counts = [0] * 10
+    for _ in range(2000):
+        for i in reservoir_sample(range(10), 3, rng=rng):
+            counts[i] += 1
+    assert all(500 < c < 700 for c in counts)
@@ -0,0 +1,43 @@
+import gzip
+import shutil
+
+import pytest
+
+from nexus import NexusReader
+from nexus.tools.shards import shard_filenames, shard_trees
+
+
+def test_shard_filenames(tmp_path):
+    assert [p.name for p in shard_filenames('a/run.t', 10)][::9] == ['run_01.t', 'run_10.t']
+    assert shard_filenames('a/run.trees.gz', 1)[0].as_posix() == 'a/run_1.trees'
+    assert shard_filenames('run', 1, outdir=tmp_path)[0] == tmp_path / 'run_1.trees'
+
+
+@pytest.mark.parametrize(
+    'contiguous,expected',
+    [
+        (False, [['tree.0.1065.603220', 'tree.20000.883.396049'], ['tree.10000.874.808756']]),
+        (True, [['tree.0.1065.603220'], ['tree.10000.874.808756', 'tree.20000.883.396049']]),
+    ]
+)
+def test_shard_trees(tmp_path, examples, contiguous, expected):
+    shards = shard_trees(
+        examples / 'example-translated.trees', 2, outdir=tmp_path, contiguous=contiguous)
+    assert len(shards) == 2
+    original = NexusReader.from_file(examples / 'example-translated.trees').trees
+    for shard, names in zip(shards, expected):
+        trees = NexusReader.from_file(shard).trees
+        assert [tree.name for tree in trees] == names
+        assert trees.translators == original.translators
+        assert all(tree in original.trees for tree in trees)
+
+
+def test_shard_trees_gzipped(tmp_path, examples):
+    with (examples / 'example.trees').open('rb') as src:
+        with gzip.open(str(tmp_path / 'example.trees.gz'), 'wb') as dest:
+            shutil.copyfileobj(src, dest)
+    shards = shard_trees(tmp_path / 'example.trees.gz', 5)
+    assert [NexusReader.from_file(p).trees.ntrees for p in shards] == [1, 1, 1, 0, 0]
+
+    with pytest.raises(ValueError):
+        shard_trees(examples / 'example.trees', 0)
@@ -0,0 +1,91 @@
+import math
+
+import pytest
+
+from nexus.compact_tree import CompactTree
+from nexus.tools.splits import clades, tree_splits, iter_taxa, SplitTable, count_splits
+
+
+@pytest.fixture
+def tree():
+    # Taxon indices: A=0, B=1, C=2, D=3
+    return CompactTree.from_newick('((A:1,B:2):3,(C:4,D:5):6);')
+
+
+def test_clades(tree):
+    assert clades(tree) == [0b1111, 0b0011, 0b0001, 0b0010, 0b1100, 0b0100, 0b1000]
+    assert clades(CompactTree.from_newick('A;')) == [1]
+
+
+def test_tree_splits_rooted(tree):
+    assert tree_splits(tree) == {
+        0b0011: 3, 0b0001: 1, 0b0010: 2, 0b1100: 6, 0b0100: 4, 0b1000: 5}
+
+
+def test_tree_splits_unrooted(tree):
+    splits = tree_splits(tree, rooted=False)
+    # The two root branches are merged:
+    assert splits[0b1100] == 9
+    assert 0b0011 not in splits
+    assert splits[0b1110] == 1
+    assert len(splits) == 5
+
+
+def test_tree_splits_unrooted_trivial():
+    # A unary root does not induce a split.
+    splits = tree_splits(CompactTree.from_newick('((A,B,C):1);'), rooted=False)
+    assert set(splits) == {0b110, 0b100, 0b010}
+
+
+def test_tree_splits_unlabeled():
+    assert set(tree_splits(CompactTree.from_newick('((A,B),());'))) == {0b11, 0b01, 0b10}
+
+
+def test_iter_taxa():
+    assert list(iter_taxa(0b1010)) == [1, 3]
+    assert list(iter_taxa(0)) == []
+
+
+def test_SplitTable(tree):
+    table = SplitTable(taxa=list('ABCD'))
+    assert table.frequency(0b11) == 0.0
+    table.add_tree(tree)
+    table.add_tree(CompactTree.from_newick('((A,C):1,(B:1,D):1);', tree.taxon_index))
+    assert len(table) == 8
+    assert 0b11 in table
+    assert table.ntrees == 2
+    assert table.count(0b0001) == 2
+    assert table.frequency(0b0011) == 0.5
+    assert table.mean_length(0b0011) == 3
+    assert table.mean_length(0b0010) == 1.5
+    assert math.isnan(table.mean_length(0b0001))
+    assert math.isnan(table.mean_length(0b0110))
+    assert table.split_taxa(0b0101) == ['A', 'C']
+    assert list(table.iter_frequencies(min_frequency=1.0)) == [
+        (0b0001, 1.0), (0b0010, 1.0), (0b0100, 1.0), (0b1000, 1.0)]
+    assert table.clade_probabilities() == [
+        (('A', 'B'), 0.5), (('C', 'D'), 0.5), (('A', 'C'), 0.5), (('B', 'D'), 0.5)]
+    assert len(table.clade_probabilities(tips=True)) == 8
+
+    other = SplitTable()
+    other.add_tree(tree)
+    table.update(other)
+    assert table.ntrees == 3
+    assert table.count(0b0011) == 2
+    assert table.mean_length(0b0011) == 3
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_count_splits(trees_translated, workers):
+    table = count_splits(trees_translated.trees, workers=workers, chunksize=1)
+    assert table.ntrees == 3
+    assert table.taxa[:3] == ['Tom', 'Simon', 'Bruce']
+    assert len(table.clade_probabilities(min_frequency=1.0, tips=True)) == 15
+    probs = dict(table.clade_probabilities())
+    assert probs[('Timothy', 'Henry')] == 1.0
+
+
+def test_count_splits_unrooted(trees):
+    table = count_splits(trees.trees, rooted=False)
+    assert table.ntrees == 3
+    assert all(not (split & 1) for split in table.counts)
@@ -0,0 +1,58 @@
+import pytest
+
+from nexus import NexusReader
+from nexus.compact_tree import CompactTree
+from nexus.exceptions import NexusFormatException
+from nexus.tools.topology import canonical_newick, topology_key, topology_counts
+
+
+@pytest.fixture
+def trees_topology():
+    return NexusReader.from_string("""#NEXUS
+begin trees;
+    translate
+        1 A,
+        2 B,
+        3 C,
+        4 D;
+    tree a = ((1:1,2:1):1,(3:1,4:1):1);
+    tree b = ((4,3),(2[&c],1)x);
+    tree c = ((1,3),(2,4));
+    tree d = (((1,2),3),4);
+end;""").trees
+
+
+def test_canonical_newick():
+    tree = CompactTree.from_newick("((D:1,'C c':2)x:1,(B,A[&c]));")
+    assert canonical_newick(tree) == "(('C c',D),(A,B));"
+    assert canonical_newick(CompactTree.from_newick('((a,b),());')) == '((),(a,b));'
+
+
+def test_topology_key():
+    t1 = CompactTree.from_newick('((A,B),(C,D));')
+    t2 = CompactTree.from_newick('((D,C),(B,A));', dict(t1.taxon_index))
+    t3 = CompactTree.from_newick('(A,(B,(C,D)));', dict(t1.taxon_index))
+    assert topology_key(t1) == topology_key(t2) != topology_key(t3)
+    assert topology_key(t1, rooted=False) == topology_key(t3, rooted=False)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_topology_counts(trees_topology, workers):
+    res = topology_counts(trees_topology, credible=0.7, workers=workers, chunksize=1)
+    assert res == [
+        ("((A,B),(C,D));", 2, 0.5, True),
+        ("((A,C),(B,D));", 1, 0.25, True),
+        ("(((A,B),C),D);", 1, 0.25, False),
+    ]
+
+
+def test_topology_counts_unrooted(trees_topology):
+    res = topology_counts(trees_topology, rooted=False)
+    assert [count for _, count, _, _ in res] == [3, 1]
+    assert all(credible for _, _, _, credible in res)
+
+
+def test_topology_counts_unknown_taxon():
+    nex = NexusReader.from_string("#NEXUS\nbegin trees;\ntree a = (A,B);\ntree b = (A,C);\nend;")
+    with pytest.raises(NexusFormatException):
+        topology_counts(nex.trees)
@@ -44,3 +44,10 @@ def test_run_randomise_sample_toobig(trees_translated, mocker):
     # raises ValueError, sample size too big (only 3 trees in this file)
     with pytest.raises(ValueError):
         run_random(10, trees_translated, mocker.Mock())
+
+
+def test_run_removecomments_parallel(trees_beast, mocker):
+    expected = run_removecomments(trees_beast, mocker.Mock()).trees.trees
+    trees_beast.trees.trees = trees_beast.trees.trees * 5
+    new_nex = run_removecomments(trees_beast, mocker.Mock(), workers=2)
+    assert new_nex.trees.trees == expected * 5
@@ -0,0 +1,42 @@
+"""Tests for nexus.util"""
+from nexus.util import iter_chunks, map_chunks, SourceSpan, _init_worker, _apply_shared
+
+
+def _double(items):
+    return [2 * i for i in items]
+
+
+def _multiply(items, factor=2):
+    return [factor * i for i in items]
+
+
+def test_iter_chunks():
+    assert list(iter_chunks(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_map_chunks():
+    expected = [[2 * i for i in range(j, min(j + 3, 20))] for j in range(0, 20, 3)]
+    assert list(map_chunks(_double, range(20), chunksize=3)) == expected
+    assert list(map_chunks(_double, range(20), workers=2, chunksize=3)) == expected
+    expected = [[3 * i for i in range(j, min(j + 3, 20))] for j in range(0, 20, 3)]
+    for workers in [1, 2]:
+        assert list(map_chunks(
+            _multiply, range(20), workers=workers, chunksize=3, shared=dict(factor=3))) == \
+            expected
+
+
+def test_shared():
+    _init_worker(dict(factor=5))
+    assert _apply_shared(_multiply, [1, 2]) == [5, 10]
+    _init_worker({})
+
+
+def test_SourceSpan(tmp_path):
+    src = tmp_path / 'test.nex'
+    src.write_text('#NEXUS\nbegin sets;\nend;\n', encoding='utf8')
+    span = SourceSpan(src, 7, 19)
+    assert span.is_file(src) and not span.is_file(tmp_path / 'other.nex')
+    detached = span.detached()
+    assert detached.read() == 'begin sets;\n' and not detached.is_file(src)
+    src.unlink()
+    assert span.read() is None and span.detached() is span
@@ -3,6 +3,7 @@ import pathlib
 
 import pytest
 
+from nexus.reader import NexusReader
 from nexus.writer import NexusWriter
 
 
@@ -229,3 +230,27 @@ def test_regression_format_string_has_datatype_first(writer):
     out = writer.make_nexus()
     assert "FORMAT DATATYPE=STANDARD" in out
     assert 'SYMBOLS="123456"' in out
+
+
+def test_write_translated():
+    writer = NexusWriter()
+    writer.trees = ["tree a = ((A:1,B:2):1,C);", "tree b = (C,(D,A));"]
+    out = writer.write(translate=True)
+    assert "TRANSLATE\n    1 A,\n    2 B,\n    3 C,\n    4 D\n    ;" in out
+    assert "tree a = ((1:1,2:2):1,3);" in out
+    assert "tree b = (3,(4,1));" in out
+    nex = NexusReader.from_string(out)
+    assert nex.trees.translators['4'] == 'D'
+    assert "tree a = ((A:1,B:2):1,C);" in writer.write()
+
+
+def test_write_translated_labels():
+    writer = NexusWriter()
+    writer.trees = ["tree a = ((Bokmål:1,'Nynorsk x':1)nordic:1,Dansk:2);"]
+    out = writer.write(translate=True)
+    assert "TRANSLATE\n    1 Bokmål,\n    2 'Nynorsk x',\n    3 Dansk\n    ;" in out
+    assert "tree a = ((1:1,2:1)nordic:1,3:2);" in out
+    nex = NexusReader.from_string(out)
+    assert nex.trees.translators == {'1': 'Bokmål', '2': 'Nynorsk x', '3': 'Dansk'}
+    nex.trees.detranslate()
+    assert nex.trees[0] == writer.trees[0]